@@ -1,6 +1,9 @@
 import streamlit as st
 
 from ui.controls import main_controls, selected_page
+from ui.diagnostics import diagnostics_panel
+from utils.assets import load_logo_index
+from utils.profiler import profile_rerun
 
 # define pages
 league_page = st.Page(page='ui/pages/league.py', title='League')
@@ -31,12 +34,20 @@ st.set_page_config(
 #     '''
 # )
 
-# main controls that will be used across pages
-main_controls()
+# load logos into memory once per server process
+load_logo_index()
 
-# dev info
-# st.write(selected_page())
-# st.write(st.session_state)
+# rerun is profiled only with ?profile query parameter, see utils.profiler
+with profile_rerun(page=pg.title):
+    # main controls that will be used across pages
+    main_controls()
 
-# run app
-pg.run()
\ No newline at end of file
+    # server diagnostics, shown only with ?diagnostics query parameter
+    diagnostics_panel()
+
+    # dev info
+    # st.write(selected_page())
+    # st.write(st.session_state)
+
+    # run app
+    pg.run()
\ No newline at end of file
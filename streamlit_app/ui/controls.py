@@ -1,7 +1,7 @@
 import streamlit as st
 from streamlit_javascript import st_javascript
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from utils.league import LEAGUE, format_league_options
 from utils.season import SEASON_YEAR
@@ -35,6 +35,14 @@ def format_game_date(date_str):
 
     return date_str_formatted
 
+def show_data_error():
+    '''
+        Show error message and stop the page run when the data couldn't be received from NBA API
+    '''
+
+    st.error('Couldn`t get the data from NBA API. Please try again in a few minutes.')
+    st.stop()
+
 def main_controls():
     '''
         Returns ui container with widgets used across multiple pages
@@ -54,20 +62,37 @@ def main_controls():
             horizontal=True
         )
 
-        # st.divider()
-
-        # st.toggle(label='Include Date Range', key='toggle_date_range', value=False)
-        
-        # if st.session_state.toggle_date_range:
-        #     st.session_state.date_range = [
-        #         datetime.today().date() - relativedelta(days=30),
-        #         datetime.today().date()
-        #     ]
-            
-        #     st.date_input(
-        #         label='Date', key='date_range',
-        #         max_value=datetime.today().date(),
-        #         help='Use to filter by game dates. By default last 30 days interval is selected.'
-        #     )
-        # else:
-        #     st.session_state.date_range = None
\ No newline at end of file
+        st.divider()
+
+        st.toggle(label='Include Date Range', key='toggle_date_range', value=False)
+
+        if st.session_state.toggle_date_range:
+            # default range is set once, then the widget keeps the selected dates
+            if not st.session_state.get('date_range'):
+                st.session_state.date_range = [
+                    datetime.today().date() - timedelta(days=30),
+                    datetime.today().date()
+                ]
+
+            st.date_input(
+                label='Date', key='date_range',
+                max_value=datetime.today().date(),
+                help='Use to filter by game dates. By default last 30 days interval is selected.'
+            )
+
+def selected_date_range():
+    '''
+        Return start and end dates of the selected date range
+
+        Returns
+        -------
+        Result tuple: (start, end), None means no limit
+    '''
+
+    if not st.session_state.get('toggle_date_range') or not st.session_state.get('date_range'):
+        return None, None
+
+    date_range = st.session_state.date_range
+
+    # the end date is not selected yet while the range is being picked
+    return date_range[0], (date_range[1] if len(date_range) > 1 else None)
@@ -0,0 +1,81 @@
+import streamlit as st
+
+import pandas as pd
+
+from utils.transport import get_transport_stats
+from utils.keys import list_cached_keys, get_cached_keys, invalidate_key, format_key
+from utils.profiler import get_last_profile
+from utils.memory import build_memory_report, dump_memory_report, MB
+
+
+def diagnostics_panel():
+    '''
+        Returns ui container with server diagnostics
+
+        Panel is shown only if the page is opened with `?diagnostics` query parameter
+    '''
+
+    if 'diagnostics' not in st.query_params:
+        return
+
+    with st.sidebar.expander('Diagnostics'):
+        transport_stats = get_transport_stats()
+
+        st.caption('NBA API requests')
+        st.dataframe(
+            pd.DataFrame.from_dict(transport_stats['single_flight']['groups'], orient='index'),
+            use_container_width=True
+        )
+        st.caption(f'Requests in flight: {transport_stats["single_flight"]["in_flight"]}')
+
+        st.caption('Circuit breakers')
+        st.dataframe(
+            pd.DataFrame.from_dict(transport_stats['circuits'], orient='index'),
+            use_container_width=True
+        )
+
+        cached = list_cached_keys()
+
+        st.caption('Cached data')
+        st.dataframe(cached, use_container_width=True, hide_index=True)
+
+        # drop cached values of one key, for example after the game data was corrected
+        st.selectbox(
+            label='Cache Key', key='diagnostics_cache_key',
+            options=get_cached_keys(),
+            format_func=format_key,
+            index=None
+        )
+
+        if st.button('Invalidate', disabled=st.session_state.diagnostics_cache_key is None):
+            dropped = invalidate_key(st.session_state.diagnostics_cache_key)
+            st.caption(f'Dropped values: {dropped}')
+
+        # memory of the server process by cached function and by session
+        memory_report = build_memory_report(cached)
+
+        st.caption(
+            f'Memory: {memory_report["rss"]:.0f} MB, '
+            f'cached values: {memory_report["cached_size"] / MB:.1f} MB, '
+            f'session state: {memory_report["session_size"] / MB:.1f} MB'
+        )
+        st.dataframe(pd.DataFrame(memory_report['functions']), use_container_width=True, hide_index=True)
+        st.dataframe(pd.DataFrame(memory_report['sessions']), use_container_width=True, hide_index=True)
+        st.download_button(
+            label='Memory Report', key='diagnostics_memory_report',
+            data=dump_memory_report(memory_report),
+            file_name=f'memory-{memory_report["created"]}.json',
+            mime='application/json'
+        )
+
+        # previous rerun of the session, shown with ?diagnostics&profile query parameters
+        last_profile = get_last_profile()
+
+        if last_profile is not None:
+            st.caption('Previous rerun')
+            st.dataframe(
+                pd.DataFrame(last_profile).style.apply(
+                    lambda row: ['color: red' if row.OVER_BUDGET else '' for _ in row], axis=1
+                ),
+                use_container_width=True, hide_index=True
+            )
@@ -7,10 +7,13 @@ import numpy as np
 from math import floor, ceil
 from datetime import datetime, timedelta
 
-from PIL import Image
-
-from utils.params import STATISTICS_TYPE, StatisticsTypeCode, OutcomeName, GraphTypeCode
+from utils.params import STATISTICS_TYPE, OutcomeName, GraphTypeCode
 from utils.teams import find_team_info_by_id, find_team_info_by_abbreviation
+from utils.assets import get_team_logo
+from utils.timeframes import format_bucket
+from utils.profiler import profiled
+from utils.distributions import summarise_distribution
+from utils.statistics import STATISTICS
 
 # set default template for all graphs
 pio.templates.default = "plotly_white"
@@ -24,6 +27,10 @@ COLOR_HIGHLIGHT = 'orangered'
 COLOR_PRIMARY = 'blue'
 COLOR_HLINE = 'magenta'
 COLOR_HLINE_FONT = 'white'
+COLOR_TRANSPARENT = 'rgba(0, 0, 0, 0)'
+
+# box plot from the summary shows only the last games over the box
+MAX_BOX_POINTS = 100
 
 
 def make_team_statistics_graph_outcome(df, matchup_team):
@@ -235,7 +242,114 @@ def make_team_statistics_graph_type_box(df, recent_game, statistics_type, matchu
 
     return box_plot
 
-def make_team_statistics_graph(df, statistics_type, graph_type, matchup_team):
+def make_game_points_trace(df, statistics_type, color):
+    '''
+        Return box trace that shows only the games as points, box itself is transparent
+    '''
+
+    return go.Box(
+        x=[''] * len(df),
+        y=df[statistics_type],
+        boxpoints='all', jitter=0.5, pointpos=0,
+        fillcolor=COLOR_TRANSPARENT,
+        line=dict(color=COLOR_TRANSPARENT),
+        marker_color=color,
+        hoveron='points',
+        customdata=df[['GAME_DATE', 'SEASON_TYPE', 'MATCHUP_TEAM_ABBREVIATION', 'GAME_LOCATION', 'GAME_OUTCOME']],
+        hovertemplate=
+            '<b>%{customdata[0]|%b %d, %Y}</b><br>' +
+            '<b>%{customdata[1]}</b><br><br>' +
+            'Matchup: <b>%{customdata[2]}</b><br>' +
+            'Location: <b>%{customdata[3]}</b><br>' +
+            'Outcome: <b>%{customdata[4]}</b><br><br>' +
+            STATISTICS_TYPE[statistics_type] + ': <b>%{y}</b>' +
+            '<extra></extra>',
+        name=''
+    )
+
+def make_team_statistics_graph_type_box_summary(df, distribution, recent_game, statistics_type, matchup_team, show_games):
+    '''
+        Return figure
+
+        Box is drawn from the summary statistics, so the games are not sent to the browser:
+        only outliers, games with the matchup team and, if show_games is set, the last MAX_BOX_POINTS games
+
+        Parameters
+        ----------
+        distribution
+            result of the summarise_distribution() function for the games, None if there are no games
+    '''
+
+    # games are sorted starting from the last game
+    matchup_games = df[df.MATCHUP_TEAM_ID == matchup_team]
+    other_games = df[df.MATCHUP_TEAM_ID != matchup_team].head(MAX_BOX_POINTS)
+
+    box_plot = go.Figure()
+
+    # add graph component
+    if distribution is not None:
+        box_plot.add_trace(
+            go.Box(
+                x=[''],
+                q1=[distribution['Q1']], median=[distribution['MEDIAN']], q3=[distribution['Q3']],
+                lowerfence=[distribution['LOWER_FENCE']], upperfence=[distribution['UPPER_FENCE']],
+                mean=[distribution['MEAN']], sd=[distribution['SD']],
+                boxpoints=False,
+                marker_color=COLOR_PRIMARY,
+                name='',
+                hoverinfo='y'
+            )
+        )
+
+    if show_games:
+        box_plot.add_trace(make_game_points_trace(other_games, statistics_type, color=COLOR_PRIMARY))
+    elif distribution is not None and len(distribution['OUTLIERS']) > 0:
+        box_plot.add_scatter(
+            x=[''] * len(distribution['OUTLIERS']),
+            y=distribution['OUTLIERS'],
+            mode='markers',
+            marker=dict(color=COLOR_PRIMARY, symbol='circle-open'),
+            name='Outliers',
+            hoverinfo='y'
+        )
+
+    if len(matchup_games) > 0:
+        box_plot.add_trace(make_game_points_trace(matchup_games, statistics_type, color=COLOR_HIGHLIGHT))
+
+    # add last game as a line if it is today or if it was yesterday
+    if recent_game is not None:
+        box_plot.add_hline(
+            y=recent_game[statistics_type],
+            line=dict(
+                color=COLOR_HLINE
+            ),
+            annotation_position='bottom right',
+            annotation_text='<b>-> Recent Game</b>',
+            annotation=dict(
+                font_size=14,
+                font_color=COLOR_HLINE,
+                hovertext=
+                    '<b>' + datetime.strptime(recent_game.GAME_DATE, '%Y-%m-%d').strftime('%b %d, %Y') + '</b><br>' +
+                    '<b>' + recent_game.SEASON_TYPE + '</b><br><br>' +
+                    'Matchup: <b>' + recent_game.MATCHUP_TEAM_ABBREVIATION + '</b><br>' +
+                    'Location: <b>' + recent_game.GAME_LOCATION + '</b><br>' +
+                    'Outcome: <b>' + recent_game.GAME_OUTCOME + '</b><br><br>' +
+                    STATISTICS_TYPE[statistics_type] + ': <b>' + str(recent_game[statistics_type]) + '</b>',
+                hoverlabel=dict(
+                    bgcolor=COLOR_HLINE,
+                    font_color=COLOR_HLINE_FONT,
+                    font_size=13
+                )
+            )
+        )
+
+    # points of all traces are drawn over the same box
+    box_plot.update_layout(boxmode='overlay')
+
+    return box_plot
+
+@profiled('graph')
+def make_team_statistics_graph(df, statistics_type, graph_type, matchup_team, distribution=None, show_games=False):
     '''
         Return figure
 
@@ -249,6 +363,11 @@ def make_team_statistics_graph(df, statistics_type, graph_type, matchup_team):
             bar chart, box plot, etc.
         matchup team
             can be None
+        distribution
+            precomputed box plot summary of the games, see summarise_distribution(),
+            it is calculated from the games if it is None
+        show_games
+            show the last games over the box plot from the summary
 
         Returns
         -------
@@ -272,6 +391,8 @@ def make_team_statistics_graph(df, statistics_type, graph_type, matchup_team):
         # otherwise - set recent_game to None to use it in make_*_graph functions
         if is_recent_game_today | is_recent_game_yesterday:
             df = df[df.GAME_DATE != recent_game.GAME_DATE]
+            # precomputed summary includes the recent game
+            distribution = None
         else:
             recent_game = None
     else:
@@ -290,6 +411,13 @@ def make_team_statistics_graph(df, statistics_type, graph_type, matchup_team):
             df=df, recent_game=recent_game,
             statistics_type=statistics_type, matchup_team=matchup_team
         )
+    elif graph_type == GraphTypeCode.BOX_SUMMARY.value:
+        fig = make_team_statistics_graph_type_box_summary(
+            df=df,
+            distribution=summarise_distribution(df[statistics_type]) if distribution is None else distribution,
+            recent_game=recent_game, statistics_type=statistics_type,
+            matchup_team=matchup_team, show_games=show_games
+        )
     elif graph_type == GraphTypeCode.BAR.value:
         fig = make_team_statistics_graph_type_bar(
             df=df, recent_game=recent_game,
@@ -308,6 +436,7 @@ def make_team_statistics_graph(df, statistics_type, graph_type, matchup_team):
 
     return fig
 
+@profiled('graph')
 def make_game_statistics_graph(df, statistics_type, league, matchup):
     '''
         Return figure
@@ -328,50 +457,28 @@ def make_game_statistics_graph(df, statistics_type, league, matchup):
     # sort values
     df = df.sort_values(by=['period', 'periodTime'], ascending=[True, True])
 
-    # init figure
-    if statistics_type == StatisticsTypeCode.SCORE_DIFF.value:
-        fig = px.scatter(
-            data_frame=df,
-            x='periodTime', y='scoreDiff',
-            # markers=True,
-            color='scoreDiff'
-        )
-        # fig.update_traces(connectgaps=True)
-    if statistics_type == StatisticsTypeCode.PTS.value:
-        fig = px.scatter(
-            data_frame=df,
-            x='periodTime', y='points',
-            # markers=True,
-            color='teamTricode'
-        )
-    elif statistics_type == StatisticsTypeCode.FG2M.value:
-        fig = px.scatter(
-            data_frame=df,
-            x='periodTime', y='fg2m',
-            color='teamTricode',
-        )
-    elif statistics_type == StatisticsTypeCode.FG3M.value:
-        fig = px.scatter(
-            data_frame=df,
-            x='periodTime', y='fg3m',
-            color='teamTricode',
-        )
-    elif statistics_type == StatisticsTypeCode.REB.value:
-        fig = px.scatter(
-            data_frame=df,
-            x='periodTime', y='rebounds',
-            color='teamTricode',
-        )
-    elif statistics_type == StatisticsTypeCode.AST.value:
-        fig = px.scatter(
-            data_frame=df,
-            x='periodTime', y='assists',
-            color='teamTricode'
+    # init figure from the registered statistic, see utils.statistics.STATISTICS
+    statistic = STATISTICS[statistics_type]
+    make_figure = px.line if statistic.graph == 'line' else px.scatter
+
+    fig = make_figure(
+        data_frame=df,
+        x='periodTime', y=statistic.column,
+        color=statistic.color
+    )
+
+    if statistic.y_range or statistic.y_format or statistic.y_title:
+        fig.update_yaxes(
+            range=statistic.y_range, tickformat=statistic.y_format,
+            title=statistic.y_title.format(home_team=home_team['abbreviation']) if statistic.y_title else None
         )
 
+    if statistic.reference_line is not None:
+        fig.add_hline(y=statistic.reference_line, line_dash='dot', line_color='gray')
+
     fig.update_layout(
         title=dict(
-            text=f'{home_team['full_name']} vs. {road_team['full_name']}',
+            text=f'{home_team["full_name"]} vs. {road_team["full_name"]}',
             x=0.4, y=0.95
         ),
         coloraxis_showscale=False,
@@ -379,14 +486,23 @@ def make_game_statistics_graph(df, statistics_type, league, matchup):
     )
     fig.update_xaxes(tickformat='%M:%S')
 
-    # add images
-    # logo_paths = [
-    #     'streamlit_app/static/league_team_logo/' + league + '/' + str(home_team_id) + '.svg',
-    #     'streamlit_app/static/league_team_logo/' + league + '/' + str(road_team_id) + '.svg'
-    # ]
+    # add team logos from the preloaded index: home team on the left, road team on the right
+    for team, x, xanchor in [(home_team, 0, 'left'), (road_team, 1, 'right')]:
+        logo = get_team_logo(league=league, team_id=team['id'])
+
+        if logo:
+            fig.add_layout_image(
+                source=logo,
+                xref='paper', yref='paper',
+                x=x, y=1.12,
+                sizex=0.12, sizey=0.12,
+                xanchor=xanchor, yanchor='top',
+                layer='above'
+            )
 
     return fig
 
+@profiled('graph')
 def make_league_rating_graph(df, league):
     '''
         Return figure
@@ -410,7 +526,8 @@ def make_league_rating_graph(df, league):
         df.E_DEF_RATING.agg({'min', 'max'}).loc['max']
     ))
 
-    axes_range = [min_range, max_range]
+    # team logos from the preloaded index, abbreviation is used as a text label if logo doesn't exist
+    logos = [get_team_logo(league=league, team_id=id) for id in df.TEAM_ID]
 
     fig = go.Figure()
 
@@ -424,8 +541,8 @@ def make_league_rating_graph(df, league):
                 axis=-1
             ),
             text=[
-                find_team_info_by_id(team_id=id, league=league, value='abbreviation')
-                for id in df.TEAM_ID
+                find_team_info_by_id(team_id=id, league=league, value='abbreviation') if logo is None else ''
+                for id, logo in zip(df.TEAM_ID, logos)
             ],
             textfont=dict(
                 color='gray'
@@ -440,19 +557,115 @@ def make_league_rating_graph(df, league):
     )
 
     # add team images
-    # for team_id in df.TEAM_ID.unique():
-    #     fig.add_layout_image(
-    #         source=Image.open(f'streamlit_app/static/league_team_logo/{league}/{team_id}.png'),
-    #         sizex=1.5,
-    #         sizey=1.5,
-    #         name=find_team_info_by_id(team_id=team_id, league=league, value='abbreviation'),
-    #         xref='x',
-    #         yref='y',
-    #         # x=games.loc[(games["GAME_NUM"] == game_num) & (games["TEAM"]==t), "CUME_OFF_RATING"].values[0],
-    #         # y=games.loc[(games["GAME_NUM"] == game_num) & (games["TEAM"]==t), "CUME_DEF_RATING"].values[0],
-    #         layer='above',
-    #         opacity=1, xanchor='center', yanchor='middle'
-    #     )
+    for logo, x, y in zip(logos, df.E_OFF_RATING, df.E_DEF_RATING):
+        if logo:
+            fig.add_layout_image(
+                source=logo,
+                sizex=1.5,
+                sizey=1.5,
+                xref='x',
+                yref='y',
+                x=x,
+                y=y,
+                layer='above',
+                opacity=1, xanchor='center', yanchor='middle'
+            )
+
+    return update_league_rating_layout(fig=fig, min_range=min_range, max_range=max_range)
+
+@profiled('graph')
+def make_league_elo_graph(df, league):
+    '''
+        Return figure with Elo rating and strength of schedule of each team
+
+        Parameters
+        ----------
+        df - result of the summarise_elo() function
+
+        Returns
+        -------
+        Result figure
+    '''
+
+    # team logos from the preloaded index, abbreviation is used as a text label if logo doesn't exist
+    logos = [get_team_logo(league=league, team_id=id) for id in df.TEAM_ID]
+
+    # ratings and schedules have different spreads, logos are sized to each axis range
+    x_range = [floor(df.SOS.min()) - 5, ceil(df.SOS.max()) + 5]
+    y_range = [floor(df.ELO.min()) - 25, ceil(df.ELO.max()) + 25]
+
+    fig = go.Figure()
+
+    fig.add_trace(
+        go.Scatter(
+            x=df.SOS,
+            y=df.ELO,
+            mode='text',
+            customdata=np.stack(
+                arrays=(df.TEAM_ABBREVIATION, df.GAMES, df.ELO_CHANGE),
+                axis=-1
+            ),
+            text=[
+                abbreviation if logo is None else ''
+                for abbreviation, logo in zip(df.TEAM_ABBREVIATION, logos)
+            ],
+            textfont=dict(
+                color='gray'
+            ),
+            hovertemplate=
+                "<b>%{customdata[0]}</b><br>"
+                "Elo: %{y:.0f} (%{customdata[2]:+.1f})<br>"
+                "Strength of Schedule: %{x:.0f}<br>"
+                "Games: %{customdata[1]}<br>"
+                "<extra></extra>"
+        )
+    )
+
+    for logo, x, y in zip(logos, df.SOS, df.ELO):
+        if logo:
+            fig.add_layout_image(
+                source=logo,
+                sizex=(x_range[1] - x_range[0]) / 15,
+                sizey=(y_range[1] - y_range[0]) / 15,
+                xref='x',
+                yref='y',
+                x=x,
+                y=y,
+                layer='above',
+                opacity=1, xanchor='center', yanchor='middle'
+            )
+
+    fig.update_layout(
+        height=800,
+        width=800,
+        margin_t=0
+    )
+    fig.update_xaxes(
+        title='Strength of Schedule',
+        range=x_range
+    )
+    fig.update_yaxes(
+        title='Elo Rating',
+        range=y_range
+    )
+
+    return fig
+
+def update_league_rating_layout(fig, min_range, max_range):
+    '''
+        Return figure with the rating chart layout: axes, arrows and annotations
+
+        Parameters
+        ----------
+        fig - figure with rating traces
+        min_range, max_range - ratings range for both axes
+
+        Returns
+        -------
+        Result figure
+    '''
+
+    axes_range = [min_range, max_range]
 
     base_color = '#F4F3EE'
 
@@ -593,4 +806,211 @@ def make_league_rating_graph(df, league):
         textangle=0
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+@profiled('graph')
+def make_league_rating_progression_graph(df, league):
+    '''
+        Return animated figure with cumulative ratings of the teams for each game date
+
+        Every game date is a precomputed frame, so the slider and the play button
+        switch frames in the browser without recalculations
+
+        Parameters
+        ----------
+        df - result of the get_team_rating_frames() function
+
+        Returns
+        -------
+        Result figure
+    '''
+
+    # the same axes range for all frames, so teams move on a fixed chart
+    min_range = floor(min(df.CUME_OFF_RATING.min(), df.CUME_DEF_RATING.min()))
+    max_range = ceil(max(df.CUME_OFF_RATING.max(), df.CUME_DEF_RATING.max()))
+
+    def make_frame_trace(frame_df):
+        return go.Scatter(
+            x=frame_df.CUME_OFF_RATING,
+            y=frame_df.CUME_DEF_RATING,
+            mode='text',
+            text=frame_df.TEAM_ABBREVIATION,
+            customdata=np.stack(
+                arrays=(frame_df.CUME_NET_RATING, frame_df.TEAM_ABBREVIATION, frame_df.GAME_NUM),
+                axis=-1
+            ),
+            textfont=dict(
+                color='gray'
+            ),
+            hovertemplate=
+                "<b>%{customdata[1]}</b><br>"
+                "Games Played: %{customdata[2]}<br>"
+                "Net Rating: %{customdata[0]:.1f}<br>"
+                "Offensive Rating: %{x:.1f}<br>"
+                "Defensive Rating: %{y:.1f}<br>"
+                "<extra></extra>"
+        )
+
+    game_dates = sorted(df.GAME_DATE.unique())
+    frames_by_date = dict(tuple(df.groupby('GAME_DATE')))
+
+    # start from the last game date
+    fig = go.Figure(
+        data=[make_frame_trace(frames_by_date[game_dates[-1]])],
+        frames=[
+            go.Frame(data=[make_frame_trace(frames_by_date[game_date])], name=game_date)
+            for game_date in game_dates
+        ]
+    )
+
+    fig.update_layout(
+        sliders=[dict(
+            active=len(game_dates) - 1,
+            currentvalue=dict(prefix='Date: '),
+            pad=dict(t=30),
+            steps=[
+                dict(
+                    method='animate',
+                    label=game_date,
+                    args=[[game_date], dict(mode='immediate', frame=dict(duration=0, redraw=False), transition=dict(duration=0))]
+                )
+                for game_date in game_dates
+            ]
+        )],
+        updatemenus=[dict(
+            type='buttons',
+            showactive=False,
+            x=0, y=0, xanchor='right', yanchor='top',
+            pad=dict(t=30, r=10),
+            buttons=[
+                dict(
+                    label='Play',
+                    method='animate',
+                    args=[None, dict(frame=dict(duration=150, redraw=False), transition=dict(duration=100), fromcurrent=True)]
+                ),
+                dict(
+                    label='Pause',
+                    method='animate',
+                    args=[[None], dict(mode='immediate', frame=dict(duration=0, redraw=False), transition=dict(duration=0))]
+                )
+            ]
+        )]
+    )
+
+    return update_league_rating_layout(fig=fig, min_range=min_range, max_range=max_range)
+
+def add_court_shapes(fig):
+    '''
+        Add half court lines to the shot chart, coordinates are in tenths of feet with the basket at (0, 0)
+    '''
+
+    line = dict(color=COLOR_FONT, width=1)
+
+    # basket, backboard, paint, free throw circle, restricted area
+    fig.add_shape(type='circle', x0=-7.5, y0=-7.5, x1=7.5, y1=7.5, line=line)
+    fig.add_shape(type='line', x0=-30, y0=-7.5, x1=30, y1=-7.5, line=line)
+    fig.add_shape(type='rect', x0=-80, y0=-47.5, x1=80, y1=142.5, line=line)
+    fig.add_shape(type='circle', x0=-60, y0=82.5, x1=60, y1=202.5, line=line)
+    fig.add_shape(type='path', path='M -40 0 A 40 40 0 0 1 40 0', line=line)
+
+    # three-point line: corners and arc
+    fig.add_shape(type='line', x0=-220, y0=-47.5, x1=-220, y1=92.5, line=line)
+    fig.add_shape(type='line', x0=220, y0=-47.5, x1=220, y1=92.5, line=line)
+    fig.add_shape(type='path', path='M -220 92.5 A 237.5 237.5 0 0 1 220 92.5', line=line)
+
+    # baseline, sidelines and half court line
+    fig.add_shape(type='rect', x0=-250, y0=-47.5, x1=250, y1=422.5, line=line)
+
+    return fig
+
+@profiled('graph')
+def make_shot_chart_graph(df, title):
+    '''
+        Return figure
+
+        Parameters
+        ----------
+        df - hexagon bins, result of the summarise_shot_bins() function with by='HEX'
+        title - graph title
+
+        Returns
+        -------
+        Result figure
+    '''
+
+    fig = go.Figure(
+        go.Scatter(
+            x=df.X, y=df.Y,
+            mode='markers',
+            marker=dict(
+                symbol='hexagon',
+                # the most frequent bins are drawn in full size
+                size=6 + 16 * np.sqrt(df.FGA / df.FGA.max()),
+                color=df.FG_PCT,
+                colorscale='RdYlGn',
+                cmin=0.2, cmax=0.7,
+                colorbar=dict(title='FG%', tickformat='.0%'),
+                line=dict(width=0)
+            ),
+            customdata=df[['FGM', 'FGA', 'FG_PCT']],
+            hovertemplate='FGM/FGA: <b>%{customdata[0]}/%{customdata[1]}</b><br>FG%: <b>%{customdata[2]:.1%}</b><extra></extra>'
+        )
+    )
+
+    add_court_shapes(fig)
+
+    fig.update_layout(
+        title=dict(text=title, x=0.4, y=0.95),
+        height=600,
+        showlegend=False
+    )
+    fig.update_xaxes(range=[-250, 250], visible=False)
+    fig.update_yaxes(range=[-47.5, 422.5], visible=False, scaleanchor='x', scaleratio=1)
+
+    return fig
+
+@profiled('graph')
+def make_timeframe_statistics_graph(df, statistics_type, timeframe, league):
+    '''
+        Return figure
+
+        Parameters
+        ----------
+        df - statistics by time buckets: result of the get_game_timeframe_stats() function (both teams)
+            or calc_team_timeframe_averages() function (one team)
+        statistics_type - type of statistics to vizualize
+        timeframe - PERIOD or MINUTE
+
+        Returns
+        -------
+        Result figure
+    '''
+
+    df = df.assign(BUCKET_LABEL=[format_bucket(bucket, timeframe) for bucket in df.BUCKET])
+
+    if 'TEAM_ID' in df.columns:
+        df['TEAM_ABBREVIATION'] = [
+            find_team_info_by_id(league=league, team_id=team_id, value='abbreviation')
+            for team_id in df.TEAM_ID
+        ]
+        fig = px.bar(
+            data_frame=df,
+            x='BUCKET_LABEL', y=statistics_type,
+            color='TEAM_ABBREVIATION',
+            barmode='group'
+        )
+    else:
+        fig = px.bar(
+            data_frame=df,
+            x='BUCKET_LABEL', y=statistics_type,
+            color_discrete_sequence=[COLOR_PRIMARY]
+        )
+
+    fig.update_layout(
+        xaxis_title=None,
+        yaxis_title=STATISTICS_TYPE[statistics_type],
+        legend_title=None
+    )
+    fig.update_xaxes(type='category')
+
+    return fig
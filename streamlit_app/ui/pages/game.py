@@ -1,47 +1,80 @@
 import streamlit as st
 
+import pandas as pd
 from datetime import datetime
 
-from utils.params import STATISTICS_TYPE, StatisticsTypeCode, format_statistics_type_options
+from utils.params import STATISTICS_TYPE, StatisticsTypeCode, format_statistics_type_options, TIMEFRAME, TimeframeCode, format_timeframe_options
 from utils.league import LEAGUE, LeagueCode
 from utils.season import SEASON_YEAR, SEASON_TYPE, SeasonTypeCode
-from utils.teams import get_league_teams
-from utils.games import find_games, get_play_by_play_data
-
-from ui.graphs import make_game_statistics_graph
-
-games = find_games(
-    league=st.session_state.league,
-    season_year=st.session_state.season_year
-)
+from utils.teams import get_league_teams, find_team_info_by_abbreviation
+from utils.games import find_games, define_game_key, get_play_by_play_data
+from utils.keys import season_key
+from utils.dates import filter_date_range
+from utils.lineups import get_game_stints, aggregate_lineups, format_lineup
+from utils.winprob import get_game_win_probability
+from utils.timeframes import get_game_timeframe_stats, TIMEFRAME_STATISTICS
+from utils.transport import TransportError
+
+from ui.controls import show_data_error, selected_date_range
+from ui.graphs import make_game_statistics_graph, make_timeframe_statistics_graph
+
+# columns of the season games the page uses, see define_game_key()
+GAME_COLUMNS = ['SEASON_ID', 'GAME_ID', 'GAME_DATE', 'GAME_DAY', 'MATCHUP']
+
+try:
+    games = find_games(season_key(st.session_state.league, st.session_state.season_year), columns=GAME_COLUMNS)
+except TransportError:
+    show_data_error()
+
+# filter by selected dates
+games = filter_date_range(games, *selected_date_range())
+
+if len(games) == 0:
+    st.write('There are no games in the selected date range.')
+    st.stop()
+
+# games are sorted by date: the first and the last rows are the date limits
+first_date = games.GAME_DAY.iloc[0].date()
+last_date = games.GAME_DAY.iloc[-1].date()
+
+# the last date is selected by default and when the selected date is out of the new date range,
+# the widget gets its value from the session state only
+if 'game_date' not in st.session_state or not first_date <= st.session_state.game_date <= last_date:
+    st.session_state.game_date = last_date
 
 with st.sidebar:
     st.date_input(
         label='Game Date', key='game_date',
-        min_value=datetime.strptime(games.GAME_DATE.min(), '%Y-%m-%d'),
-        max_value=datetime.strptime(games.GAME_DATE.max(), '%Y-%m-%d'),
-        value=datetime.strptime(games.GAME_DATE.max(), '%Y-%m-%d'),
+        min_value=first_date,
+        max_value=last_date,
         format='YYYY-MM-DD'
     )
 
+    date_games = filter_date_range(games, st.session_state.game_date, st.session_state.game_date)
+
     st.selectbox(
         label='Matchup', key='matchup',
-        options=games.loc[games.GAME_DATE == str(st.session_state.game_date), 'MATCHUP']
+        options=date_games.MATCHUP
     )
 
 cols = st.columns([3, 9])
 
 if st.session_state.matchup:
-    selected_game = games[(games.GAME_DATE == str(st.session_state.game_date)) & (games.MATCHUP == st.session_state.matchup)]
+    selected_game = date_games[date_games.MATCHUP == st.session_state.matchup]
     selected_game = selected_game.reset_index(drop=True)
 
     selected_game_season_type_id = selected_game.SEASON_ID[0][:1]
-    selected_game_id = selected_game.GAME_ID[0]
 
-    play_by_play = get_play_by_play_data(
-        game=selected_game,
-        league=st.session_state.league
-    )
+    # one key for all cached data of the game
+    selected_game_key = define_game_key(selected_game, league=st.session_state.league)
+
+    try:
+        play_by_play = get_play_by_play_data(selected_game_key)
+        # model inference runs once for all events of the game and is cached with it
+        win_probability = get_game_win_probability(selected_game_key)
+        play_by_play['winProbability'] = play_by_play.actionNumber.map(win_probability)
+    except TransportError:
+        show_data_error()
 
     st.write(
         f'Final Score {play_by_play.iloc[-1].scoreHome.astype(int)} : {play_by_play.iloc[-1].scoreAway.astype(int)}'
@@ -54,17 +87,63 @@ if st.session_state.matchup:
         format_func=format_statistics_type_options
     )
 
-    game_graph = make_game_statistics_graph(
-        df=play_by_play,
-        statistics_type=st.session_state.statistics_type,
-        league=st.session_state.league,
-        matchup=selected_game.MATCHUP[0]
+    # win probability is a game state and is shown for the whole game only
+    st.radio(
+        label='Timeframe', key='timeframe',
+        options=TIMEFRAME.keys(),
+        horizontal=True, label_visibility='collapsed',
+        format_func=format_timeframe_options,
+        disabled=st.session_state.statistics_type not in TIMEFRAME_STATISTICS
     )
 
+    if st.session_state.timeframe == TimeframeCode.GAME.value or st.session_state.statistics_type not in TIMEFRAME_STATISTICS:
+        game_graph = make_game_statistics_graph(
+            df=play_by_play,
+            statistics_type=st.session_state.statistics_type,
+            league=st.session_state.league,
+            matchup=selected_game.MATCHUP[0]
+        )
+    else:
+        game_graph = make_timeframe_statistics_graph(
+            df=get_game_timeframe_stats(selected_game_key, timeframe=st.session_state.timeframe),
+            statistics_type=st.session_state.statistics_type,
+            timeframe=st.session_state.timeframe,
+            league=st.session_state.league
+        )
+
     st.plotly_chart(
         game_graph
     )
 
+    # five-man units of both teams and their results in the game
+    with st.expander('Lineups'):
+        game_lineups = aggregate_lineups(
+            get_game_stints(
+                league=selected_game_key.league,
+                season_year=selected_game_key.season_year,
+                game_id=selected_game_key.game_id
+            )
+        )
+
+        players = play_by_play.dropna(subset=['personId', 'playerName'])
+        player_names = dict(zip(players.personId.astype(int), players.playerName))
+
+        cols_lineups = st.columns(2)
+
+        for col, abbreviation in zip(cols_lineups, [selected_game.MATCHUP[0][:3], selected_game.MATCHUP[0][-3:]]):
+            team_id = find_team_info_by_abbreviation(league=st.session_state.league, abbreviation=abbreviation, value='id')
+            team_lineups = game_lineups[game_lineups.TEAM_ID == team_id]
+
+            col.dataframe(
+                pd.DataFrame({
+                    abbreviation: [format_lineup(lineup, player_names) for lineup in team_lineups.LINEUP],
+                    'Minutes': (team_lineups.SECONDS / 60).round(1),
+                    '+/-': team_lineups.PLUS_MINUS
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+
     # st.write(
     #     selected_game
     # )
@@ -1,19 +1,94 @@
 import streamlit as st
 
-from ui.graphs import make_league_rating_graph
+from ui.controls import show_data_error, selected_date_range
+from ui.graphs import make_league_rating_graph, make_league_rating_progression_graph, make_league_elo_graph
 
+from utils.params import RATING_VIEW, RatingViewCode, format_rating_view_options
 from utils.teams import get_team_rating
+from utils.ratings import get_team_rating_frames
+from utils.standings import get_season_standings, CONFERENCES
+from utils.elo import get_season_elo_history, summarise_elo
+from utils.dates import filter_date_range
+from utils.keys import season_key
+from utils.transport import TransportError
 
-team_rating = get_team_rating(
-    league=st.session_state.league,
-    season=st.session_state.season_year
+st.radio(
+    label='Rating View', key='rating_view',
+    options=RATING_VIEW,
+    horizontal=True, label_visibility='collapsed',
+    format_func=format_rating_view_options
 )
 
-st.plotly_chart(
-    make_league_rating_graph(df=team_rating, league=st.session_state.league),
-    config={'displayModeBar': False}
-)
+if st.session_state.rating_view == RatingViewCode.PROGRESSION.value:
+    # cumulative ratings after every game date
+    try:
+        rating_frames = get_team_rating_frames(season_key(st.session_state.league, st.session_state.season_year))
+    except TransportError:
+        show_data_error()
+
+    # cumulative ratings stay as of each date, the range limits the animation frames
+    rating_frames = filter_date_range(rating_frames, *selected_date_range())
+
+    if len(rating_frames) == 0:
+        st.write('There are no games in the selected date range.')
+    else:
+        st.plotly_chart(
+            make_league_rating_progression_graph(df=rating_frames, league=st.session_state.league),
+            config={'displayModeBar': False}
+        )
+elif st.session_state.rating_view == RatingViewCode.ELO.value:
+    try:
+        elo_history = get_season_elo_history(season_key(st.session_state.league, st.session_state.season_year))
+    except TransportError:
+        show_data_error()
+
+    # ratings as of the end of the range, schedule strength over the games in the range
+    elo_history = filter_date_range(elo_history, *selected_date_range())
+
+    if len(elo_history) == 0:
+        st.write('There are no games in the selected date range.')
+    else:
+        st.plotly_chart(
+            make_league_elo_graph(df=summarise_elo(elo_history), league=st.session_state.league),
+            config={'displayModeBar': False}
+        )
+else:
+    try:
+        team_rating = get_team_rating(season_key(st.session_state.league, st.session_state.season_year))
+    except TransportError:
+        show_data_error()
+
+    st.plotly_chart(
+        make_league_rating_graph(df=team_rating, league=st.session_state.league),
+        config={'displayModeBar': False}
+    )
+
+# standings are calculated from the whole season game log, the date range isn't applied
+st.subheader('Standings')
+
+try:
+    standings = get_season_standings(season_key(st.session_state.league, st.session_state.season_year))
+except TransportError:
+    show_data_error()
+
+standings_columns = {
+    'TEAM_ABBREVIATION': 'Team', 'W': 'W', 'L': 'L', 'WIN_PCT': 'PCT', 'GB': 'GB',
+    'HOME': 'Home', 'ROAD': 'Road', 'CONF': 'Conf', 'DIV': 'Div', 'L10': 'L10', 'STRK': 'Strk'
+}
+# WNBA has no divisions
+if standings.DIVISION.isna().all():
+    del standings_columns['DIV']
+
+cols_standings = st.columns(len(CONFERENCES))
+
+for col, conference in zip(cols_standings, CONFERENCES):
+    col.caption(conference)
+    col.dataframe(
+        standings[standings.CONFERENCE == conference].set_index('CONF_RANK')[list(standings_columns)].rename(columns=standings_columns),
+        column_config={'PCT': st.column_config.NumberColumn(format='%.3f'), 'GB': st.column_config.NumberColumn(format='%.1f')},
+        use_container_width=True
+    )
 
 # st.write(
 #     team_rating
-# )
\ No newline at end of file
+# )
@@ -1,10 +1,20 @@
 import streamlit as st
 
-from utils.params import LocationName, OutcomeName, STATISTICS_TYPE, GRAPH_TYPE, format_graph_type_options, format_statistics_type_options, StatisticsTypeCode
-from utils.games import one_team_game_set, combine_team_games
+from utils.params import LocationName, OutcomeName, STATISTICS_TYPE, GRAPH_TYPE, format_graph_type_options, format_statistics_type_options, StatisticsTypeCode, GraphTypeCode, TimeframeCode, format_timeframe_options
+from utils.pipeline import get_season_team_games, get_season_team_records, get_matchup_matrix, get_season_team_distributions
+from utils.shots import get_season_shot_bins, summarise_shot_bins
+from utils.players import get_season_player_totals, calc_player_averages
+from utils.timeframes import get_season_timeframe_stats, calc_team_timeframe_averages
+from utils.dates import filter_date_range, filter_last_games
+from utils.keys import season_key
 from utils.teams import define_team_options, format_team_options
+from utils.transport import TransportError
 
-from ui.graphs import make_team_statistics_graph
+from ui.controls import show_data_error, selected_date_range
+from ui.graphs import make_team_statistics_graph, make_shot_chart_graph, make_timeframe_statistics_graph, MAX_BOX_POINTS
+
+# win probability is calculated for the play-by-play events only, game logs don't have it
+TEAM_STATISTICS_TYPE = [key for key in STATISTICS_TYPE if key != StatisticsTypeCode.WIN_PROB.value]
 
 st.sidebar.selectbox(
     label='Base Team', key='team_base',
@@ -21,19 +31,38 @@ st.sidebar.selectbox(
     help='The second team can only be selected after the first team has been selected.'
 )
 
+st.sidebar.number_input(
+    label='Last Games', key='last_games',
+    min_value=0, value=0, step=1,
+    help='Use to show only the last games of the team. 0 means all games.'
+)
+
 
 
 
 
 
-# fetch data from NBA API for selected league and season
-game_set = one_team_game_set(
-    league=st.session_state.league,
-    season_year=st.session_state.season_year
-)
-game_set = combine_team_games(df=game_set, keep_method=None)
+# one key for all cached data of the selected league and season
+selected_season_key = season_key(st.session_state.league, st.session_state.season_year)
+
+# fetch data from NBA API for selected league and season,
+# combined game log is updated with the new games only
+try:
+    game_set = get_season_team_games(selected_season_key)
+    team_records = get_season_team_records(selected_season_key)
+except TransportError:
+    show_data_error()
 # filter by selected team
 game_set = game_set[game_set.TEAM_ID == st.session_state.team_base]
+# head-to-head summary covers the whole season, its meetings are looked up before the date filters
+season_game_set = game_set
+# filter by selected dates and the number of the last games
+game_set = filter_date_range(game_set, *selected_date_range())
+game_set = filter_last_games(game_set, st.session_state.last_games)
+
+if len(game_set) == 0:
+    st.write('There are no games of the team in the selected date range.')
+    st.stop()
 # filter by selected season type
 # if st.session_state.season_type:
     # game_set = game_set[game_set.SEASON_CODE.isin(st.session_state.season_type)]
@@ -44,24 +73,36 @@ game_set = game_set[game_set.TEAM_ID == st.session_state.team_base]
 # )
 
 
+# season record and box plot summaries are precomputed, they are calculated only for the filtered set
+is_full_season = selected_date_range() == (None, None) and not st.session_state.last_games
+
+if is_full_season:
+    team_record = team_records.loc[st.session_state.team_base]
+else:
+    team_record = {
+        'GAMES': game_set.GAME_ID.nunique(),
+        'WINS': game_set.loc[game_set.GAME_OUTCOME == OutcomeName.WIN.value, 'GAME_ID'].nunique(),
+        'LOSSES': game_set.loc[game_set.GAME_OUTCOME == OutcomeName.LOSS.value, 'GAME_ID'].nunique()
+    }
+
 cols_metrics = st.columns([1, 1, 1, 3, 3])
 cols_metrics[0].metric(
     label='Games Played',
-    value=game_set.GAME_ID.nunique()
+    value=team_record['GAMES']
 )
 cols_metrics[1].metric(
     label='Wins',
-    value=game_set.loc[game_set.GAME_OUTCOME == OutcomeName.WIN.value, 'GAME_ID'].nunique()
+    value=team_record['WINS']
 )
 cols_metrics[2].metric(
     label='Losses',
-    value=game_set.loc[game_set.GAME_OUTCOME == OutcomeName.LOSS.value, 'GAME_ID'].nunique()
+    value=team_record['LOSSES']
 )
 cols_metrics[3].selectbox(
     label='Statistics Type', key='statistics_type',
     options=[
         key
-        for key in STATISTICS_TYPE.keys()
+        for key in TEAM_STATISTICS_TYPE
         if key != StatisticsTypeCode.SCORE_DIFF.value
     ],
     format_func=format_statistics_type_options
@@ -71,6 +112,19 @@ cols_metrics[4].selectbox(
     options=GRAPH_TYPE,
     format_func=format_graph_type_options
 )
+
+distribution = None
+
+if st.session_state.graph_type == GraphTypeCode.BOX_SUMMARY.value:
+    cols_metrics[4].checkbox(
+        label='Show Games', key='box_show_games',
+        help=f'Shows the last {MAX_BOX_POINTS} games over the box plot. Games against the matchup team are always shown.'
+    )
+
+    if is_full_season:
+        distribution = get_season_team_distributions(selected_season_key).loc[
+            (st.session_state.team_base, st.session_state.statistics_type)
+        ].to_dict()
     
 
 st.plotly_chart(
@@ -78,6 +132,116 @@ st.plotly_chart(
         df=game_set,
         statistics_type=st.session_state.statistics_type,
         graph_type=st.session_state.graph_type,
-        matchup_team=st.session_state.team_matchup
+        matchup_team=st.session_state.team_matchup,
+        distribution=distribution,
+        show_games=st.session_state.get('box_show_games', False)
     )
-)
\ No newline at end of file
+)
+
+# season averages of the selected statistics by periods or minutes of the game
+with st.expander('Statistics by Time'):
+    st.radio(
+        label='Timeframe', key='team_timeframe',
+        options=[TimeframeCode.PERIOD.value, TimeframeCode.MINUTE.value],
+        horizontal=True, label_visibility='collapsed',
+        format_func=format_timeframe_options
+    )
+
+    timeframe_averages = calc_team_timeframe_averages(
+        get_season_timeframe_stats(
+            selected_season_key,
+            timeframe=st.session_state.team_timeframe
+        ),
+        team_id=st.session_state.team_base
+    )
+
+    if len(timeframe_averages) == 0:
+        st.write('Statistics by time are built from the saved play-by-play of finished games, there are no saved games for the team yet.')
+    else:
+        st.plotly_chart(
+            make_timeframe_statistics_graph(
+                df=timeframe_averages,
+                statistics_type=st.session_state.statistics_type,
+                timeframe=st.session_state.team_timeframe,
+                league=st.session_state.league
+            )
+        )
+
+# head-to-head summary for the selected pair of teams
+if st.session_state.team_matchup is not None:
+    matchup_matrix = get_matchup_matrix(selected_season_key)
+    head_to_head = matchup_matrix.get((st.session_state.team_base, st.session_state.team_matchup))
+    head_to_head_matchup = matchup_matrix.get((st.session_state.team_matchup, st.session_state.team_base))
+
+    st.subheader(
+        f'Head-to-Head: {format_team_options(st.session_state.team_base)} vs. {format_team_options(st.session_state.team_matchup)}'
+    )
+
+    if head_to_head is None:
+        st.write('Teams have not played each other this season.')
+    else:
+        cols_head_to_head = st.columns(2 + len(TEAM_STATISTICS_TYPE))
+        cols_head_to_head[0].metric(label='Wins', value=head_to_head['WINS'])
+        cols_head_to_head[1].metric(label='Losses', value=head_to_head['LOSSES'])
+
+        # average values compared with the matchup team's averages in the same games
+        for col, statistics_type in zip(cols_head_to_head[2:], TEAM_STATISTICS_TYPE):
+            col.metric(
+                label=STATISTICS_TYPE[statistics_type],
+                value=f'{head_to_head[statistics_type]:.1f}',
+                delta=f'{head_to_head[statistics_type] - head_to_head_matchup[statistics_type]:.1f}'
+            )
+
+        # last meetings
+        st.dataframe(
+            season_game_set.set_index('GAME_ID').loc[
+                head_to_head['GAME_IDS'],
+                ['GAME_DATE', 'SEASON_TYPE', 'GAME_LOCATION', 'GAME_OUTCOME'] + TEAM_STATISTICS_TYPE
+            ].rename(columns=STATISTICS_TYPE),
+            hide_index=True,
+            use_container_width=True
+        )
+
+# season shot chart of the base team, against the matchup team if it is selected
+with st.expander('Shot Chart'):
+    shot_bins = get_season_shot_bins(selected_season_key)
+    shot_filters = dict(team_id=st.session_state.team_base, opp_team_id=st.session_state.team_matchup)
+
+    shot_chart = summarise_shot_bins(shot_bins, by='HEX', **shot_filters)
+
+    if len(shot_chart) == 0:
+        st.write('Shot chart is built from the saved play-by-play of finished games, there are no saved games for the team yet.')
+    else:
+        st.plotly_chart(
+            make_shot_chart_graph(
+                df=shot_chart,
+                title=format_team_options(st.session_state.team_base)
+            )
+        )
+
+        st.dataframe(
+            summarise_shot_bins(shot_bins, by='ZONE', **shot_filters).rename(columns={
+                'ZONE': 'Zone', 'FG_PCT': 'FG%', 'FGA_SHARE': 'Share of FGA'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+
+# season averages of the base team's players
+with st.expander('Players'):
+    player_averages = calc_player_averages(
+        get_season_player_totals(selected_season_key)
+    )
+    team_players = player_averages[player_averages.TEAM_ID == st.session_state.team_base]
+
+    if len(team_players) == 0:
+        st.write('Player statistics are built from the saved play-by-play of finished games, there are no saved games for the team yet.')
+    else:
+        st.dataframe(
+            team_players.drop(columns='TEAM_ID').rename(columns={
+                'PLAYER_NAME': 'Player', 'GAMES': 'Games',
+                'FG_PCT': 'FG%', 'FG3_PCT': '3P%', 'FT_PCT': 'FT%'
+            }).round(3),
+            hide_index=True,
+            use_container_width=True
+        )
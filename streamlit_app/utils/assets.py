@@ -0,0 +1,81 @@
+import streamlit as st
+
+import base64
+from pathlib import Path
+
+from utils.league import LeagueCode
+
+# static files are located in the app's folder: streamlit_app/static
+STATIC_PATH = Path(__file__).resolve().parent.parent / 'static'
+LEAGUE_LOGO_PATH = STATIC_PATH / 'league_logo'
+LEAGUE_TEAM_LOGO_PATH = STATIC_PATH / 'league_team_logo'
+
+
+def encode_svg(path):
+    '''
+        Return svg file content as a base64 data uri that can be used as an image source in Plotly figures
+
+        Parameters
+        ----------
+        path
+            path to the svg file
+
+        Returns
+        -------
+        Result string
+    '''
+
+    return 'data:image/svg+xml;base64,' + base64.b64encode(path.read_bytes()).decode('ascii')
+
+@st.cache_resource(show_spinner=False)
+def load_logo_index():
+    '''
+        Return in-memory index with all league and team logos
+
+        Files are read and encoded only once per server process,
+        graph builders use the index instead of opening files on every render
+
+        Returns
+        -------
+        Result dict
+
+        league - {league: data uri}
+        team - {league: {team_id: data uri}}
+    '''
+
+    index = {
+        'league': {},
+        'team': {}
+    }
+
+    for league in LeagueCode:
+        league_logo = LEAGUE_LOGO_PATH / (league.value + '.svg')
+        if league_logo.is_file():
+            index['league'][league.value] = encode_svg(league_logo)
+
+        # team logos are stored as {league}/{team_id}.svg
+        index['team'][league.value] = {
+            int(team_logo.stem): encode_svg(team_logo)
+            for team_logo in sorted((LEAGUE_TEAM_LOGO_PATH / league.value).glob('*.svg'))
+        }
+
+    print(
+        'Logo index loaded successfully: ',
+        {league: len(logos) for league, logos in index['team'].items()}
+    )
+
+    return index
+
+def get_team_logo(league, team_id):
+    '''
+        Return team logo data uri or None if the logo doesn't exist
+    '''
+
+    return load_logo_index()['team'].get(league, {}).get(int(team_id))
+
+def get_league_logo(league):
+    '''
+        Return league logo data uri or None if the logo doesn't exist
+    '''
+
+    return load_logo_index()['league'].get(league)
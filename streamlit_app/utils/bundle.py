@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import zipfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+
+from nba_api.stats.endpoints import leaguegamefinder, teamestimatedmetrics
+
+from utils.store import RESPONSE_FOLDER, list_files, read_file, save_file, make_temp_path
+from utils.transport import define_request_key
+
+# season bundle: one zip file with all data of the league's season from the local data store,
+# it is imported on a new server or a developer machine instead of rebuilding the data from NBA API
+#
+#   manifest.json - bundle version, league, season, files with their sizes and sha256 checksums
+#   {league}/{season_year}/... - season tables: play-by-play, rosters, precomputed datasets
+#   {league}/_/... - league tables: win probability model
+#   responses/{request key}.json - season game log and team ratings responses
+#
+# run from the streamlit_app folder:
+#   python -m utils.data_parser --export-bundle bundles/00-2024-25.zip --league 00 --season 2024-25
+#   python -m utils.data_parser --import-bundle bundles/00-2024-25.zip
+#   NBA_STATS_OFFLINE=1 streamlit run app.py
+BUNDLE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+CHUNK_SIZE = 2 ** 20
+
+
+class BundleError(Exception):
+    '''
+        Bundle can't be imported: unknown version, missing or corrupted files
+    '''
+
+
+def define_season_requests(league, season_year):
+    '''
+        Return list of NBA API requests of the season that are served from the saved responses:
+        (endpoint class, parameters) with the same parameters as the fetchers send them
+
+        find_games(), one_team_game_set(), get_team_rating()
+    '''
+
+    return [
+        (leaguegamefinder.LeagueGameFinder, dict(league_id_nullable=league, season_nullable=season_year)),
+        (leaguegamefinder.LeagueGameFinder, dict(
+            league_id_nullable=league, season_nullable=season_year,
+            season_type_nullable=None, team_id_nullable=None
+        )),
+        (teamestimatedmetrics.TeamEstimatedMetrics, dict(league_id=league, season=season_year))
+    ]
+
+def list_season_files(league, season_year):
+    '''
+        Return paths of the files of the season in the local data store, relative to the store
+    '''
+
+    response_files = [
+        f'{RESPONSE_FOLDER}/{define_request_key(endpoint_class(**parameters, get_request=False))}.json'
+        for endpoint_class, parameters in define_season_requests(league, season_year)
+    ]
+
+    return (
+        list_files(f'{league}/{season_year}')
+        + list_files(f'{league}/_')
+        # responses that weren't received yet are not bundled
+        + [path for path in response_files if read_file(path) is not None]
+    )
+
+def export_season_bundle(path, league, season_year):
+    '''
+        Save all data of the season from the local data store to the bundle file
+
+        Parameters
+        ----------
+        path
+            bundle file path, for example bundles/00-2024-25.zip
+
+        Returns
+        -------
+        Result dict, bundle manifest
+    '''
+
+    # without the season only the league tables would be bundled
+    if not season_year:
+        raise ValueError('Season year is required to export the season bundle')
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        'version': BUNDLE_VERSION,
+        'league': league,
+        'season_year': season_year,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'files': []
+    }
+
+    # write to the temporary file first, so the bundle is never half-written
+    temp_path = make_temp_path(path)
+
+    with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        for file_path in list_season_files(league, season_year):
+            contents = read_file(file_path)
+
+            # file was removed after it was listed
+            if contents is None:
+                continue
+
+            bundle.writestr(file_path, contents)
+            manifest['files'].append({
+                'path': file_path,
+                'size': len(contents),
+                'sha256': hashlib.sha256(contents).hexdigest()
+            })
+
+        bundle.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+    os.replace(temp_path, path)
+
+    print(
+        f'Season bundle is exported: {path}, {len(manifest["files"])} files, '
+        f'{sum(file["size"] for file in manifest["files"]) / 2 ** 20:.1f} MB -> {path.stat().st_size / 2 ** 20:.1f} MB'
+    )
+
+    return manifest
+
+def read_manifest(bundle):
+    '''
+        Return manifest of the opened bundle, raise BundleError if the bundle can't be imported
+    '''
+
+    try:
+        manifest = json.loads(bundle.read(MANIFEST_NAME))
+    except (KeyError, ValueError) as error:
+        raise BundleError(f'Bundle doesn`t have a valid manifest: {error}')
+
+    if manifest.get('version') != BUNDLE_VERSION:
+        raise BundleError(f'Bundle version {manifest.get("version")} is not supported, expected version {BUNDLE_VERSION}')
+
+    for file in manifest['files']:
+        file_path = PurePosixPath(file['path'])
+
+        # files are written only inside the local data store
+        if file_path.is_absolute() or '..' in file_path.parts:
+            raise BundleError(f'Bundle file path is not allowed: {file["path"]}')
+
+    return manifest
+
+def verify_bundle_file(bundle, file):
+    '''
+        Raise BundleError if the bundled file is missing or its checksum doesn't match the manifest
+    '''
+
+    checksum = hashlib.sha256()
+
+    try:
+        with bundle.open(file['path']) as contents:
+            for chunk in iter(lambda: contents.read(CHUNK_SIZE), b''):
+                checksum.update(chunk)
+    except KeyError:
+        raise BundleError(f'Bundle file is missing: {file["path"]}')
+
+    if checksum.hexdigest() != file['sha256']:
+        raise BundleError(f'Bundle file is corrupted: {file["path"]}')
+
+def import_season_bundle(path):
+    '''
+        Save all data of the season from the bundle file to the local data store
+
+        All files are verified before the first one is saved, so the store isn't changed
+        by a corrupted bundle. Files of the season that are saved already are replaced
+
+        Returns
+        -------
+        Result dict, bundle manifest
+    '''
+
+    with zipfile.ZipFile(path) as bundle:
+        manifest = read_manifest(bundle)
+
+        for file in manifest['files']:
+            verify_bundle_file(bundle, file)
+
+        for file in manifest['files']:
+            save_file(bundle.read(file['path']), file['path'])
+
+    print(
+        f'Season bundle is imported: {manifest["league"]} {manifest["season_year"]}, '
+        f'{len(manifest["files"])} files, created {manifest["created"]}'
+    )
+
+    return manifest
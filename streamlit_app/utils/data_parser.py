@@ -1,28 +1,173 @@
-import urllib
-
-from teams import get_league_teams
-from league import LeagueCode
-
-# parse teams logo
-for league in LeagueCode:
-    # # parse league logos
-    # if league.value == '00':
-    #     # source_path = 'https://logocdn.com/nba/'
-    #     source_path = 'https://cdn.nba.com/logos/leagues/logo-nba.svg'
-    # elif league.value == '10':
-    #     source_path = 'https://cdn.nba.com/logos/leagues/logo-wnba.svg'
-
-    # target_path = 'streamlit_app/static/league_logo/' + league.value + '.svg'
-    # urllib.request.urlretrieve(source_path, target_path)
-
-    # parse league logos
-    teams = get_league_teams(league=league.value)
-
-    for team in teams.id:
-        if league.value == '00':
-            source_path = 'https://cdn.nba.com/logos/nba/' + str(team) + '/primary/L/logo.svg'
-        elif league.value == '10':
-            source_path = 'https://cdn.nba.com/logos/wnba/' + str(team) + '/primary/L/logo.svg'
-
-        target_path = 'streamlit_app/static/league_team_logo/' + league.value + '/' + str(team) + '.svg'
-        urllib.request.urlretrieve(source_path, target_path)
\ No newline at end of file
+import argparse
+import os
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+from utils.assets import LEAGUE_LOGO_PATH, LEAGUE_TEAM_LOGO_PATH
+from utils.teams import get_league_teams, ingest_league_rosters
+from utils.games import ingest_season_play_by_play
+from utils.possessions import build_season_possessions
+from utils.shots import update_season_shot_bins
+from utils.players import update_season_player_totals
+from utils.winprob import fit_win_probability_model
+from utils.elo import replay_league_elo
+from utils.bundle import export_season_bundle, import_season_bundle
+from utils.league import LeagueCode
+from utils.season import SEASON_YEAR
+
+# run from the streamlit_app folder:
+#   python -m utils.data_parser             - download all logos
+#   python -m utils.data_parser --refresh   - download only changed logos
+#   python -m utils.data_parser --rosters --league 00 --season 2024-25
+#                                           - ingest rosters and coaches for all teams of the league
+#   python -m utils.data_parser --play-by-play --league 00 --season 2024-25
+#                                           - ingest play-by-play for all finished games of the season
+#   python -m utils.data_parser --elo --league 00
+#                                           - replay Elo ratings of all seasons from scratch
+#   python -m utils.data_parser --export-bundle bundles/00-2024-25.zip --league 00 --season 2024-25
+#                                           - save all data of the season to one bundle file
+#   python -m utils.data_parser --import-bundle bundles/00-2024-25.zip
+#                                           - load the season bundle into the local data store
+
+LEAGUE_LOGO_SOURCE = {
+    LeagueCode.NBA.value : 'https://cdn.nba.com/logos/leagues/logo-nba.svg',
+    LeagueCode.WNBA.value : 'https://cdn.nba.com/logos/leagues/logo-wnba.svg'
+}
+
+LEAGUE_TEAM_LOGO_SOURCE = {
+    LeagueCode.NBA.value : 'https://cdn.nba.com/logos/nba/{team_id}/primary/L/logo.svg',
+    LeagueCode.WNBA.value : 'https://cdn.nba.com/logos/wnba/{team_id}/primary/L/logo.svg'
+}
+
+
+def define_logo_tasks():
+    '''
+        Return list of (source url, target path) pairs for all league and team logos
+    '''
+
+    tasks = []
+
+    for league in LeagueCode:
+        # league logo
+        tasks.append((LEAGUE_LOGO_SOURCE[league.value], LEAGUE_LOGO_PATH / (league.value + '.svg')))
+
+        # team logos
+        teams = get_league_teams(league=league.value)
+
+        for team in teams.id:
+            tasks.append((
+                LEAGUE_TEAM_LOGO_SOURCE[league.value].format(team_id=team),
+                LEAGUE_TEAM_LOGO_PATH / league.value / (str(team) + '.svg')
+            ))
+
+    return tasks
+
+def download_logo(source_path, target_path, refresh=False):
+    '''
+        Download logo to the target path
+
+        In refresh mode request is conditional (If-Modified-Since) and the file
+        is rewritten only if its content was changed, so the run can be repeated safely
+
+        Returns
+        -------
+        Result string: downloaded, updated, unchanged or failed
+    '''
+
+    request = urllib.request.Request(source_path)
+    if refresh and target_path.is_file():
+        request.add_header('If-Modified-Since', formatdate(target_path.stat().st_mtime, usegmt=True))
+
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            content = response.read()
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return 'unchanged'
+        print(f'Couldn`t download {source_path}: {error}')
+        return 'failed'
+    except (urllib.error.URLError, TimeoutError) as error:
+        print(f'Couldn`t download {source_path}: {error}')
+        return 'failed'
+
+    if target_path.is_file():
+        if target_path.read_bytes() == content:
+            return 'unchanged'
+        status = 'updated'
+    else:
+        status = 'downloaded'
+
+    # write to the temporary file first, so the app never reads half-written logo
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target_path.with_suffix('.tmp')
+    temp_path.write_bytes(content)
+    os.replace(temp_path, target_path)
+
+    return status
+
+def parse_logos(refresh=False, max_workers=8):
+    '''
+        Download league and team logos concurrently
+
+        Parameters
+        ----------
+        refresh
+            skip logos that were not changed
+        max_workers
+            number of concurrent downloads
+
+        Returns
+        -------
+        Result dict with the number of logos for each status
+    '''
+
+    tasks = define_logo_tasks()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        statuses = list(executor.map(
+            lambda task: download_logo(source_path=task[0], target_path=task[1], refresh=refresh),
+            tasks
+        ))
+
+    summary = {status: statuses.count(status) for status in sorted(set(statuses))}
+    print('Logos parsed: ', summary)
+
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Download league and team logos')
+    parser.add_argument('--refresh', action='store_true', help='download only changed logos')
+    parser.add_argument('--workers', type=int, default=8, help='number of concurrent downloads')
+    parser.add_argument('--rosters', action='store_true', help='ingest rosters and coaches instead of logos')
+    parser.add_argument('--play-by-play', action='store_true', help='ingest play-by-play, build possessions, shot charts and player totals instead of logos')
+    parser.add_argument('--win-probability', action='store_true', help='fit win probability model on the saved play-by-play instead of logos')
+    parser.add_argument('--elo', action='store_true', help='replay Elo ratings of all seasons from the game logs instead of logos')
+    parser.add_argument('--export-bundle', metavar='PATH', help='save all data of the season to the bundle file instead of logos')
+    parser.add_argument('--import-bundle', metavar='PATH', help='load the season bundle file into the local data store instead of logos')
+    parser.add_argument('--league', default=LeagueCode.NBA.value, help='league code for ingestion')
+    parser.add_argument('--season', help='season year for ingestion')
+    args = parser.parse_args()
+
+    if args.rosters:
+        ingest_league_rosters(league=args.league, season_year=args.season, max_workers=min(args.workers, 4))
+    elif args.play_by_play:
+        ingest_season_play_by_play(league=args.league, season_year=args.season, max_workers=min(args.workers, 4))
+        # segment the ingested games, so pace and efficiency are served from the saved possessions
+        build_season_possessions(league=args.league, season_year=args.season)
+        update_season_shot_bins(league=args.league, season_year=args.season)
+        update_season_player_totals(league=args.league, season_year=args.season)
+    elif args.win_probability:
+        fit_win_probability_model(league=args.league)
+    elif args.elo:
+        replay_league_elo(league=args.league, season_years=list(SEASON_YEAR[args.league]))
+    elif args.export_bundle:
+        if not args.season:
+            parser.error('--export-bundle requires --season')
+        export_season_bundle(args.export_bundle, league=args.league, season_year=args.season)
+    elif args.import_bundle:
+        import_season_bundle(args.import_bundle)
+    else:
+        parse_logos(refresh=args.refresh, max_workers=args.workers)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+def index_by_date(df, column='GAME_DATE'):
+    '''
+        Return data frame sorted by the native date column GAME_DAY with the range index
+
+        GAME_DAY is parsed once from the `column` strings (YYYY-MM-DD),
+        date filters are binary search slices on it, see filter_date_range()
+    '''
+
+    df = df.assign(GAME_DAY=pd.to_datetime(df[column]))
+
+    return df.sort_values(by='GAME_DAY', kind='stable', ignore_index=True)
+
+def filter_date_range(df, start=None, end=None):
+    '''
+        Return rows with GAME_DAY from start to end, both dates are included
+
+        Parameters
+        ----------
+        df
+            data frame sorted by GAME_DAY, see index_by_date()
+        start, end
+            dates, None means no limit
+
+        Returns
+        -------
+        Result data frame, slice of the input
+    '''
+
+    days = df.GAME_DAY.to_numpy()
+
+    first = 0 if start is None else np.searchsorted(days, pd.Timestamp(start).to_datetime64(), side='left')
+    last = len(df) if end is None else np.searchsorted(days, pd.Timestamp(end).to_datetime64(), side='right')
+
+    return df.iloc[first:last]
+
+def filter_last_games(df, n):
+    '''
+        Return rows of the last n game dates, all rows if n is None or 0
+
+        Parameters
+        ----------
+        df
+            data frame sorted by GAME_DAY, see index_by_date()
+        n
+            number of game dates, for one team's games it is the number of games
+    '''
+
+    if not n or len(df) == 0:
+        return df
+
+    days = df.GAME_DAY.to_numpy()
+
+    # days are sorted, so unique values are the first values of each run
+    unique_days = days[np.concatenate([[True], days[1:] != days[:-1]])]
+
+    if n >= len(unique_days):
+        return df
+
+    return df.iloc[np.searchsorted(days, unique_days[-n], side='left'):]
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from utils.params import STATISTICS_TYPE
+
+# whiskers of the box plot reach the last values within 1.5 IQR from the quartiles, like in Plotly
+WHISKER_IQR = 1.5
+
+
+def summarise_distribution(values):
+    '''
+        Return box plot summary of the values, the same statistics that Plotly calculates for the box
+
+        Parameters
+        ----------
+        values
+            series of the statistic values, missing values are skipped
+
+        Returns
+        -------
+        Result dict
+
+        GAMES, Q1, MEDIAN, Q3, MEAN, SD,
+        LOWER_FENCE, UPPER_FENCE - last values within the whiskers,
+        OUTLIERS - list of the values outside of the whiskers
+    '''
+
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+
+    if len(values) == 0:
+        return None
+
+    # linear interpolation of the quartiles, Plotly's default quartile method
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    low, high = q1 - WHISKER_IQR * (q3 - q1), q3 + WHISKER_IQR * (q3 - q1)
+    is_inside = (values >= low) & (values <= high)
+
+    return {
+        'GAMES': len(values),
+        'Q1': q1,
+        'MEDIAN': median,
+        'Q3': q3,
+        'MEAN': values.mean(),
+        'SD': values.std(ddof=1) if len(values) > 1 else 0.0,
+        'LOWER_FENCE': values[is_inside].min(),
+        'UPPER_FENCE': values[is_inside].max(),
+        'OUTLIERS': np.sort(values[~is_inside]).tolist()
+    }
+
+def summarise_team_distributions(game_set):
+    '''
+        Return box plot summary of each statistic for every team, see summarise_distribution()
+
+        Parameters
+        ----------
+        game_set
+            combined game log, result of the combine_team_games() function with keep_method=None
+
+        Returns
+        -------
+        Result data frame indexed by TEAM_ID and STATISTIC
+
+        GAMES, Q1, MEDIAN, Q3, MEAN, SD, LOWER_FENCE, UPPER_FENCE, OUTLIERS
+    '''
+
+    statistics = [statistics_type for statistics_type in STATISTICS_TYPE if statistics_type in game_set.columns]
+
+    summaries = {
+        (team_id, statistics_type): summarise_distribution(games[statistics_type])
+        for team_id, games in game_set.groupby('TEAM_ID')
+        for statistics_type in statistics
+    }
+
+    summary = pd.DataFrame.from_dict(
+        {index: summary for index, summary in summaries.items() if summary is not None},
+        orient='index'
+    )
+    summary.index = pd.MultiIndex.from_tuples(summary.index, names=['TEAM_ID', 'STATISTIC'])
+
+    return summary
@@ -0,0 +1,285 @@
+import numpy as np
+import pandas as pd
+
+from utils.season import SEASON_YEAR, SeasonTypeCode, define_previous_season_year
+from utils.games import one_team_game_set, combine_team_games
+from utils.standings import define_final_games
+from utils.keys import keyed_cache, season_key
+from utils.store import save_table, load_table
+from utils.transport import TransportError
+
+# FiveThirtyEight NBA Elo parameters
+ELO_INITIAL = 1500
+ELO_K = 20
+ELO_HOME_ADVANTAGE = 100
+# share of the rating that is carried over to the next season, the rest is regressed to the mean
+ELO_SEASON_CARRY = 0.75
+
+ELO_HISTORY_COLUMNS = ['GAME_DAY', 'GAME_ID', 'TEAM_ID', 'TEAM_ABBREVIATION', 'OPP_TEAM_ID', 'ELO_PRE', 'OPP_ELO_PRE', 'ELO_POST']
+
+
+def define_elo_games(game_set):
+    '''
+        Return finished games for the Elo ratings, one row for each game from the home team's side
+
+        Exhibition games are not included
+
+        Parameters
+        ----------
+        game_set
+            league game log, result of the one_team_game_set() function for all teams
+
+        Returns
+        -------
+        Result data frame sorted by GAME_DAY and GAME_ID
+
+        GAME_DAY, GAME_ID, TEAM_ID, TEAM_ABBREVIATION, MATCHUP_TEAM_ID, MATCHUP_TEAM_ABBREVIATION, SCORE_DIFF
+    '''
+
+    final_games = define_final_games(
+        game_set,
+        season_codes=[code.value for code in SeasonTypeCode if code not in [SeasonTypeCode.PRE_SEASON, SeasonTypeCode.ALL_STAR]]
+    )
+
+    games = combine_team_games(df=final_games, keep_method='home')
+
+    return games.sort_values(by=['GAME_DAY', 'GAME_ID'], ignore_index=True)[
+        ['GAME_DAY', 'GAME_ID', 'TEAM_ID', 'TEAM_ABBREVIATION', 'MATCHUP_TEAM_ID', 'MATCHUP_TEAM_ABBREVIATION', 'SCORE_DIFF']
+    ]
+
+def calc_elo_shift(home_elo, road_elo, margin):
+    '''
+        Return home team's rating change for each game, road team's change is the opposite
+
+        Parameters
+        ----------
+        home_elo, road_elo
+            arrays of the ratings before the games
+        margin
+            array of the home team's final score differences
+    '''
+
+    difference = home_elo + ELO_HOME_ADVANTAGE - road_elo
+    expected = 1 / (1 + 10 ** (-difference / 400))
+
+    is_home_win = margin > 0
+
+    # margin of victory multiplier, winner's rating advantage reduces it, so favourites don't inflate
+    winner_difference = np.where(is_home_win, difference, -difference)
+    multiplier = (np.abs(margin) + 3) ** 0.8 / (7.5 + 0.006 * winner_difference)
+
+    return ELO_K * multiplier * (is_home_win - expected)
+
+def replay_elo(games, ratings):
+    '''
+        Return ratings after the games and the rating history
+
+        Games of one day are independent (every team plays once a day),
+        so all games of the day are updated at once with array operations
+
+        Parameters
+        ----------
+        games
+            result of the define_elo_games() function
+        ratings
+            series of the ratings before the games indexed by TEAM_ID,
+            teams without ratings start with ELO_INITIAL
+
+        Returns
+        -------
+        Result tuple: (ratings series indexed by TEAM_ID, history data frame)
+
+        History has two rows for each game (one for each team):
+        GAME_DAY, GAME_ID, TEAM_ID, TEAM_ABBREVIATION, OPP_TEAM_ID, ELO_PRE, OPP_ELO_PRE, ELO_POST
+    '''
+
+    team_ids = ratings.index.union(pd.Index(games.TEAM_ID.unique())).union(pd.Index(games.MATCHUP_TEAM_ID.unique()))
+    elo = ratings.reindex(team_ids, fill_value=ELO_INITIAL).to_numpy(dtype=float)
+
+    home = team_ids.get_indexer(games.TEAM_ID)
+    road = team_ids.get_indexer(games.MATCHUP_TEAM_ID)
+    margin = games.SCORE_DIFF.to_numpy(dtype=float)
+
+    days = games.GAME_DAY.to_numpy()
+    day_starts = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]])) if len(days) > 0 else np.array([], dtype=int)
+    day_ends = np.append(day_starts[1:], len(days))
+
+    home_pre = np.empty(len(games))
+    road_pre = np.empty(len(games))
+    shift = np.empty(len(games))
+
+    for start, end in zip(day_starts, day_ends):
+        day_home, day_road = home[start:end], road[start:end]
+
+        home_pre[start:end] = elo[day_home]
+        road_pre[start:end] = elo[day_road]
+        shift[start:end] = calc_elo_shift(home_pre[start:end], road_pre[start:end], margin[start:end])
+
+        np.add.at(elo, day_home, shift[start:end])
+        np.add.at(elo, day_road, -shift[start:end])
+
+    history = pd.concat(
+        [
+            pd.DataFrame({
+                'GAME_DAY': games.GAME_DAY, 'GAME_ID': games.GAME_ID,
+                'TEAM_ID': games.TEAM_ID, 'TEAM_ABBREVIATION': games.TEAM_ABBREVIATION, 'OPP_TEAM_ID': games.MATCHUP_TEAM_ID,
+                'ELO_PRE': home_pre, 'OPP_ELO_PRE': road_pre, 'ELO_POST': home_pre + shift
+            }),
+            pd.DataFrame({
+                'GAME_DAY': games.GAME_DAY, 'GAME_ID': games.GAME_ID,
+                'TEAM_ID': games.MATCHUP_TEAM_ID, 'TEAM_ABBREVIATION': games.MATCHUP_TEAM_ABBREVIATION, 'OPP_TEAM_ID': games.TEAM_ID,
+                'ELO_PRE': road_pre, 'OPP_ELO_PRE': home_pre, 'ELO_POST': road_pre - shift
+            })
+        ],
+        ignore_index=True
+    ).sort_values(by=['GAME_DAY', 'GAME_ID'], kind='stable', ignore_index=True)
+
+    return pd.Series(elo, index=team_ids), history[ELO_HISTORY_COLUMNS]
+
+def calc_last_ratings(history):
+    '''
+        Return the rating of each team after its last game in the history
+    '''
+
+    return history.drop_duplicates(subset='TEAM_ID', keep='last').set_index('TEAM_ID').ELO_POST
+
+def calc_season_start_ratings(league, season_year):
+    '''
+        Return ratings at the start of the season
+
+        Ratings after the previous season are regressed to the mean with ELO_SEASON_CARRY.
+        Previous season of the app (see SEASON_YEAR) is built from its game log if it isn't saved yet,
+        all teams start with ELO_INITIAL before the oldest season
+    '''
+
+    previous_season_year = define_previous_season_year(league=league, season_year=season_year)
+
+    previous_history = load_table(name='elo_history', league=league, season_year=previous_season_year)
+
+    if previous_history is None and previous_season_year in SEASON_YEAR[league]:
+        try:
+            previous_history = update_season_elo(league=league, season_year=previous_season_year)
+        except TransportError:
+            # the season is replayed with the carried over ratings when the previous season is received
+            print(f'Couldn`t build Elo ratings of the previous season {previous_season_year}, teams start with {ELO_INITIAL}')
+
+    if previous_history is None or len(previous_history) == 0:
+        return pd.Series(dtype=float)
+
+    return ELO_SEASON_CARRY * calc_last_ratings(previous_history) + (1 - ELO_SEASON_CARRY) * ELO_INITIAL
+
+def is_same_ratings(ratings, saved_ratings):
+    '''
+        Return True if the ratings are the same as the saved ones
+
+        Parameters
+        ----------
+        saved_ratings
+            data frame indexed by TEAM_ID with ELO column or None
+    '''
+
+    return saved_ratings is not None and ratings.round(6).to_dict() == saved_ratings.ELO.round(6).to_dict()
+
+def save_season_elo(history, start_ratings, league, season_year):
+    '''
+        Save rating history of the season and the start ratings it was replayed from to the local data store
+    '''
+
+    save_table(history, name='elo_history', league=league, season_year=season_year)
+    save_table(
+        start_ratings.rename('ELO').rename_axis('TEAM_ID').to_frame(),
+        name='elo_start_ratings', league=league, season_year=season_year
+    )
+
+def update_season_elo(league, season_year):
+    '''
+        Return rating history of the season
+
+        History is saved to the local data store with the start ratings, only games that were finished
+        after the last update are replayed starting from the saved ratings. The whole season is replayed
+        when the start ratings have changed: the previous season was built or updated after this one
+
+        Returns
+        -------
+        Result data frame sorted by GAME_DAY, see replay_elo()
+    '''
+
+    games = define_elo_games(one_team_game_set(season_key(league, season_year)))
+    history = load_table(name='elo_history', league=league, season_year=season_year)
+
+    start_ratings = calc_season_start_ratings(league=league, season_year=season_year)
+    saved_start_ratings = load_table(name='elo_start_ratings', league=league, season_year=season_year)
+
+    if history is None or not is_same_ratings(start_ratings, saved_start_ratings):
+        _, history = replay_elo(games, start_ratings)
+        save_season_elo(history, start_ratings, league=league, season_year=season_year)
+
+        print(f'Elo ratings replayed successfully: {season_year}, {len(games)} games')
+
+        return history
+
+    new_games = games[~games.GAME_ID.isin(history.GAME_ID)]
+
+    if len(new_games) == 0:
+        return history
+
+    # teams that haven't played yet start with the season start ratings
+    ratings = calc_last_ratings(history).combine_first(start_ratings) if len(history) > 0 else start_ratings
+
+    _, new_history = replay_elo(new_games, ratings)
+
+    # late results of the earlier days are moved to their dates, date filters need the sorted history
+    history = pd.concat([history, new_history], ignore_index=True) if len(history) > 0 else new_history
+    history = history.sort_values(by=['GAME_DAY', 'GAME_ID'], kind='stable', ignore_index=True)
+    save_season_elo(history, start_ratings, league=league, season_year=season_year)
+
+    print(f'Elo ratings updated successfully: {len(new_games)} new games')
+
+    return history
+
+def replay_league_elo(league, season_years):
+    '''
+        Rebuild rating history of the seasons from scratch, seasons are replayed from the oldest one
+
+        Each season starts from the previous season's ratings, see calc_season_start_ratings()
+    '''
+
+    for season_year in sorted(season_years):
+        games = define_elo_games(one_team_game_set(season_key(league, season_year)))
+        start_ratings = calc_season_start_ratings(league=league, season_year=season_year)
+
+        _, history = replay_elo(games, start_ratings)
+        save_season_elo(history, start_ratings, league=league, season_year=season_year)
+
+        print(f'Elo ratings replayed successfully: {season_year}, {len(games)} games')
+
+@keyed_cache(show_spinner='Calculating Elo ratings...')
+def get_season_elo_history(key):
+    '''
+        Return rating history of the season, see update_season_elo()
+    '''
+
+    return update_season_elo(league=key.league, season_year=key.season_year)
+
+def summarise_elo(history):
+    '''
+        Return rating and strength of schedule of each team after the last game in the history
+
+        Strength of schedule is the mean rating of the opponents before the games against them
+
+        Returns
+        -------
+        Result data frame
+
+        TEAM_ID, TEAM_ABBREVIATION, GAMES, ELO, ELO_CHANGE (change in the last game), SOS
+    '''
+
+    teams = history.groupby('TEAM_ID')
+
+    summary = teams.last()[['TEAM_ABBREVIATION']]
+    summary['GAMES'] = teams.size()
+    summary['ELO'] = teams.ELO_POST.last()
+    summary['ELO_CHANGE'] = summary.ELO - teams.ELO_PRE.last()
+    summary['SOS'] = teams.OPP_ELO_PRE.mean()
+
+    return summary.reset_index().sort_values(by='ELO', ascending=False, ignore_index=True)
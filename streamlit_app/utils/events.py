@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+from utils.params import GAME_TIME
+
+# counting statistics flags for the play-by-play events
+EVENT_FLAG_COLUMNS = ['FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'REB', 'AST', 'TOV']
+
+
+def parse_clock_seconds(clock):
+    '''
+        Return number of seconds left in the period from the `clock` strings like PT11M42.00S
+    '''
+
+    parts = clock.str.extract(r'PT(\d+)M(\d+(?:\.\d+)?)S').astype(float)
+
+    return (parts[0] * 60 + parts[1]).to_numpy()
+
+def calc_elapsed_seconds(period, clock, league):
+    '''
+        Return number of seconds elapsed from the start of the game for each event
+
+        Parameters
+        ----------
+        period
+            series with period numbers, overtimes are periods after the 4th
+        clock
+            series with the `clock` strings
+        league
+            league code to define period and overtime length
+
+        Returns
+        -------
+        Result integer array
+    '''
+
+    period = period.to_numpy()
+    period_length = GAME_TIME[league]['period'] * 60
+    overtime_length = GAME_TIME[league]['overtime'] * 60
+
+    period_start = np.where(
+        period <= 4,
+        (period - 1) * period_length,
+        4 * period_length + (period - 5) * overtime_length
+    )
+    current_period_length = np.where(period <= 4, period_length, overtime_length)
+
+    return (period_start + current_period_length - parse_clock_seconds(clock)).astype(int)
+
+def fill_scores(play_by_play):
+    '''
+        Return home and away scores for every event
+
+        Score is set only for scoring events, other events get the last known score
+
+        Returns
+        -------
+        Result tuple of integer arrays: (home score, away score)
+    '''
+
+    score_home = pd.to_numeric(play_by_play.scoreHome, errors='coerce').ffill().fillna(0)
+    score_away = pd.to_numeric(play_by_play.scoreAway, errors='coerce').ffill().fillna(0)
+
+    return score_home.to_numpy(dtype=int), score_away.to_numpy(dtype=int)
+
+def calc_event_flags(play_by_play):
+    '''
+        Return counting statistics flags (0 or 1) for every event
+
+        All flags belong to the event's team: assists are counted for the team of the made shot
+
+        Returns
+        -------
+        Result data frame with EVENT_FLAG_COLUMNS
+    '''
+
+    action_type = play_by_play.actionType
+    description = play_by_play.description.fillna('')
+
+    is_field_goal = action_type.isin(['Made Shot', 'Missed Shot'])
+    is_three = description.str.contains('3PT', regex=False)
+    is_made_shot = action_type == 'Made Shot'
+    is_free_throw = action_type == 'Free Throw'
+
+    flags = pd.DataFrame({
+        'FGM': is_made_shot,
+        'FGA': is_field_goal,
+        'FG3M': is_made_shot & is_three,
+        'FG3A': is_field_goal & is_three,
+        'FTM': is_free_throw & ~description.str.startswith('MISS'),
+        'FTA': is_free_throw,
+        'REB': action_type == 'Rebound',
+        'AST': is_made_shot & description.str.contains(r'\d AST', regex=True),
+        'TOV': action_type == 'Turnover'
+    }, index=play_by_play.index)
+
+    return flags.astype(int)
+
+def is_final(play_by_play):
+    '''
+        Return True if the game is finished: the last event is the end of the 4th or later period and the score is not tied
+    '''
+
+    if len(play_by_play) == 0:
+        return False
+
+    score_home, score_away = fill_scores(play_by_play)
+    last_event = play_by_play.iloc[-1]
+
+    return (
+        last_event.actionType == 'period'
+        and last_event.subType == 'end'
+        and last_event.period >= 4
+        and score_home[-1] != score_away[-1]
+    )
+
+def define_home_road_teams(play_by_play):
+    '''
+        Return home and road team ids from the events location
+    '''
+
+    teams = play_by_play.loc[play_by_play.teamId != 0, ['teamId', 'location']].drop_duplicates(subset='teamId')
+
+    home_team = teams.loc[teams.location == 'h', 'teamId']
+    road_team = teams.loc[teams.location == 'v', 'teamId']
+
+    return int(home_team.iloc[0]), int(road_team.iloc[0])
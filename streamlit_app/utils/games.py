@@ -1,46 +1,54 @@
-import streamlit as st
-
 import pandas as pd
-import re
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 from nba_api.stats.endpoints import leaguegamefinder, playbyplayv3
 
 from utils.params import LocationName, OutcomeName, GAME_TIME
-from utils.season import SEASON_TYPE
-from utils.teams import get_league_teams, find_team_info_by_abbreviation, find_team_info_by_id
+from utils.season import SEASON_TYPE, define_season_year
+from utils.events import calc_elapsed_seconds, is_final, define_home_road_teams
+from utils.store import save_table, load_table, map_table, table_to_frame, table_age, list_table_keys
+from utils.dates import index_by_date
+from utils.keys import keyed_cache, season_key, game_key
+from utils.teams import get_league_teams, find_team_info_by_id
+from utils.transport import fetch, TransportError
+from utils.statistics import calc_statistics
+
+# season game logs are saved to the local data store and fetched from NBA API again
+# when they are older than GAME_LOG_TTL: games of the current season are added every day
+GAME_LOG_TTL = 3600
+
 
-@st.cache_data(ttl=3600, show_spinner='Fetching data from NBA API...')
-def find_games(league, season_year):
+def fetch_season_games(key):
     '''
-        Return data frame with the list of games for the selected league and season
+        Fetch the list of games for the selected league and season and save it to the local data store
 
         Parameters
         ----------
-        league
-        season_year
+        key
+            SeasonKey
 
         Returns
         -------
-        Result data frame
-
-        SEASON_ID, GAME_DATE, MATCHUP
+        Result data frame, see find_games()
     '''
 
     # get data from nba api
     # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/endpoints/leaguegamefinder.md
     try:
-        games = leaguegamefinder.LeagueGameFinder(
-            league_id_nullable=league,
-            season_nullable=season_year,
+        games = fetch(
+            leaguegamefinder.LeagueGameFinder,
+            league_id_nullable=key.league,
+            season_nullable=key.season_year,
         ).league_game_finder_results.get_data_frame()
-    except ConnectionError:
+    except TransportError:
         print(
             "Couldn't get the data from leaguegamefinder endpoint, league_game_finder_results dataset\n",
             "Parameters:\n",
-            f"League Code: {league}\n",
-            f"Season Year Code: {season_year}\n",
+            f"League Code: {key.league}\n",
+            f"Season Year Code: {key.season_year}\n",
         )
+        raise
     else:
         print("leaguegamefinder data received successfully")
 
@@ -52,44 +60,174 @@ def find_games(league, season_year):
     # 'vs. ' - means the home game, otherwse ('@') - away game
     games = games.query('MATCHUP.str.contains("vs.")', engine='python')
 
-    # sort games by game date
-    games = games.sort_values(by='GAME_DATE', ascending=False)
+    # sort games by game date, date filters are binary search slices
+    games = index_by_date(games)
+
+    save_table(games, name='games', league=key.league, season_year=key.season_year)
 
     return games
 
-@st.cache_data(ttl=3600, show_spinner='Fetching data from NBA API...')
-def get_play_by_play_data(game, league):
+@keyed_cache(show_spinner='Fetching data from NBA API...', resource=True)
+def map_season_games(key):
     '''
-        Return data frame with the play-by-play events for the selected game
+        Return memory-mapped table with the list of games for the selected league and season,
+        the list is fetched again if it doesn't exist or is older than GAME_LOG_TTL
+    '''
+
+    age = table_age(name='games', league=key.league, season_year=key.season_year)
+
+    if age is None or age > GAME_LOG_TTL:
+        fetch_season_games(key)
+
+    return map_table(name='games', league=key.league, season_year=key.season_year)
+
+def find_games(key, columns=None):
+    '''
+        Return data frame with the list of games for the selected league and season
 
         Parameters
         ----------
-        game - selected row from the find_games() function results
+        key
+            SeasonKey
+        columns
+            list of columns to convert from the mapped table, None for all columns
 
         Returns
         -------
         Result data frame
 
-        SEASON_ID, GAME_DATE, MATCHUP
+        SEASON_ID, GAME_DATE, GAME_DAY, MATCHUP
+    '''
+
+    return table_to_frame(map_season_games(key), columns=columns)
+
+def fetch_play_by_play(league, season_year, game_id):
+    '''
+        Return raw play-by-play events for the game
+
+        Finished games are saved to the local data store and never requested from NBA API again
+
+        Parameters
+        ----------
+        league
+        season_year
+        game_id
+
+        Returns
+        -------
+        Result data frame, PlayByPlayV3 play_by_play dataset
     '''
 
+    play_by_play = load_table(name='play_by_play', league=league, season_year=season_year, key=game_id)
+
+    if play_by_play is not None:
+        return play_by_play
+
     # get data from nba api
     # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/endpoints/playbyplayv3.md
     try:
-        play_by_play = playbyplayv3.PlayByPlayV3(
-            game_id=game.GAME_ID
+        play_by_play = fetch(
+            playbyplayv3.PlayByPlayV3,
+            game_id=game_id
         ).play_by_play.get_data_frame()
-    except ConnectionError:
+    except TransportError:
         print(
             "Couldn't get the data from playbyplayv3 endpoint, play_by_play dataset\n",
             "Parameters:\n",
-            f"GAME_ID: {game.GAME_ID}\n"
+            f"GAME_ID: {game_id}\n"
         )
+        raise
     else:
         print("playbyplayv3 data received successfully")
 
-    home_team = find_team_info_by_abbreviation(league=league, abbreviation=game.MATCHUP[0][:3])
-    road_team = find_team_info_by_abbreviation(league=league, abbreviation=game.MATCHUP[0][-3:])
+    if is_final(play_by_play):
+        save_table(play_by_play, name='play_by_play', league=league, season_year=season_year, key=game_id)
+
+    return play_by_play
+
+def ingest_season_play_by_play(league, season_year, max_workers=4):
+    '''
+        Fetch play-by-play for all finished games of the season that are not saved in the local data store yet
+
+        Parameters
+        ----------
+        league
+        season_year
+        max_workers
+            number of concurrent requests
+
+        Returns
+        -------
+        Result list of ingested game ids
+    '''
+
+    games = find_games(season_key(league, season_year))
+
+    saved_game_ids = set(list_table_keys(name='play_by_play', league=league, season_year=season_year))
+    game_ids = [game_id for game_id in games.GAME_ID.unique() if game_id not in saved_game_ids]
+
+    def fetch_game(game_id):
+        try:
+            fetch_play_by_play(league=league, season_year=season_year, game_id=game_id)
+        except TransportError:
+            return None
+        return game_id
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        ingested = [game_id for game_id in executor.map(fetch_game, game_ids) if game_id is not None]
+
+    print(f'Play-by-play ingested successfully: {len(ingested)} of {len(game_ids)} games')
+
+    return ingested
+
+def define_game_key(game, league):
+    '''
+        Return GameKey of the game
+
+        Parameters
+        ----------
+        game
+            selected row from the find_games() function results
+        league
+    '''
+
+    game = game.iloc[0]
+
+    return game_key(
+        league=league,
+        season_year=define_season_year(league=league, season_id=game.SEASON_ID),
+        game_id=game.GAME_ID
+    )
+
+@keyed_cache(show_spinner='Fetching data from NBA API...')
+def get_play_by_play_data(key):
+    '''
+        Return data frame with the play-by-play events for the selected game
+
+        Parameters
+        ----------
+        key
+            GameKey, see define_game_key()
+
+        Returns
+        -------
+        Result data frame
+
+        SEASON_ID, GAME_DATE, MATCHUP
+    '''
+
+    league = key.league
+
+    play_by_play = fetch_play_by_play(league=league, season_year=key.season_year, game_id=key.game_id)
+
+    # game that hasn't started or doesn't exist has no events and no teams
+    if len(play_by_play) == 0:
+        return play_by_play
+
+    # home and road teams are defined by the events location
+    home_team_id, road_team_id = define_home_road_teams(play_by_play)
+    home_team = find_team_info_by_id(league=league, team_id=home_team_id)
+    road_team = find_team_info_by_id(league=league, team_id=road_team_id)
 
     # fill data in teamId
     play_by_play['teamId'] = [id if id != 0 else None for id in play_by_play.teamId]
@@ -131,6 +269,9 @@ def get_play_by_play_data(game, league):
     period_length = GAME_TIME[league]['period']
     overtime_length = GAME_TIME[league]['overtime']
 
+    # integer game clock: seconds from the start of the game
+    play_by_play['elapsedSeconds'] = calc_elapsed_seconds(period=play_by_play.period, clock=play_by_play.clock, league=league)
+
     play_by_play['periodTime'] = [
         datetime(1970, 1, 1)
             + timedelta(
@@ -145,89 +286,48 @@ def get_play_by_play_data(game, league):
         for i in play_by_play.index
     ]
 
-    # calc score diff
-    play_by_play.scoreHome = [int(sc) if sc else None for sc in play_by_play.scoreHome]
-    play_by_play.scoreAway = [int(sc) if sc else None for sc in play_by_play.scoreAway]
-    play_by_play['scoreDiff'] = play_by_play.scoreHome - play_by_play.scoreAway
-
-    # calc points
-    play_by_play['points'] = [
-        play_by_play.scoreHome[i] if play_by_play.teamId[i] == home_team['id']
-        else play_by_play.scoreAway[i] if play_by_play.teamId[i] == road_team['id']
-        else None
-        for i in play_by_play.index
-    ]
-
-    # calc 2-point field goals
-    play_by_play['fg2m'] = [
-        1 if (play_by_play.actionType[i] == 'Made Shot') & ('3PT' not in play_by_play.description[i])
-        else None
-        for i in play_by_play.index
-    ]
-    play_by_play['fg2m'] = play_by_play.groupby('teamId').fg2m.cumsum()
-
-    # calc 3-point field goals
-    play_by_play['fg3m'] = [
-        1 if (play_by_play.actionType[i] == 'Made Shot') & ('3PT' in play_by_play.description[i])
-        else None
-        for i in play_by_play.index
-    ]
-    play_by_play['fg3m'] = play_by_play.groupby('teamId').fg3m.cumsum()
-
-    # calc revounds
-    play_by_play['rebounds'] = [1 if play_by_play.actionType[i] == 'Rebound' else None for i in play_by_play.index]
-    play_by_play['rebounds'] = play_by_play.groupby('teamId').rebounds.cumsum()
-
-    # cals assists
-    play_by_play['assists'] = [1 if re.search(r'\d AST', desc) else None for desc in play_by_play.description]
-    play_by_play['assists'] = play_by_play.groupby('teamId').assists.cumsum()
+    # score is set only for the scoring events
+    play_by_play['scoreHome'] = pd.to_numeric(play_by_play.scoreHome, errors='coerce')
+    play_by_play['scoreAway'] = pd.to_numeric(play_by_play.scoreAway, errors='coerce')
 
+    # score difference, points, field goals, rebounds and assists, see utils.statistics.STATISTICS
+    play_by_play = calc_statistics(play_by_play, home_team_id=home_team['id'], road_team_id=road_team['id'])
 
     return play_by_play
 
-@st.cache_data(ttl=3600, show_spinner='Fetching data from NBA API...')
-def one_team_game_set(league=None, season_year=None, season_type=None, team_id=None):
+def fetch_season_game_set(key):
     '''
-        Return data frame with team's games info
+        Fetch games info of all teams of the league and save it to the local data store
 
         Parameters
         ----------
-        league
-            league code
-        season_year
-            season year
-        season_type
-            season type
-        team_id
-            team id
+        key
+            SeasonKey
 
         Returns
         -------
-        Result data frame
-
-        SEASON_TYPE, GAME_DATE, GAME_ID,
-        TEAM_ABBREVIATION, MATCHUP_TEAM_ID, MATCHUP_TEAM_ABBREVIATION, MATCHUP_LOCATION, MATCHUP_OUTCOME,
-        PTS, FG2M, FG2A, FG3M, FG3A, REB, AST
+        Result data frame, see one_team_game_set()
     '''
 
     # get data from nba api
     # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/endpoints/leaguegamefinder.md
     try:
-        game_set = leaguegamefinder.LeagueGameFinder(
-            league_id_nullable=league,
-            season_nullable=season_year,
-            season_type_nullable=season_type,
-            team_id_nullable=team_id
+        game_set = fetch(
+            leaguegamefinder.LeagueGameFinder,
+            league_id_nullable=key.league,
+            season_nullable=key.season_year,
+            season_type_nullable=key.season_type,
+            team_id_nullable=None
         ).league_game_finder_results.get_data_frame()
-    except ConnectionError:
+    except TransportError:
         print(
             "Couldn't get the data from leaguegamefinder endpoint, league_game_finder_results dataset\n",
             "Parameters:\n",
-            f"League Code: {league}\n",
-            f"Season Year Code: {season_year}\n",
-            f"Season Type Code: {season_type}\n",
-            f"Team ID: {team_id}\n"
+            f"League Code: {key.league}\n",
+            f"Season Year Code: {key.season_year}\n",
+            f"Season Type Code: {key.season_type}\n"
         )
+        raise
     else:
         print("game_set data received successfully")
 
@@ -236,7 +336,7 @@ def one_team_game_set(league=None, season_year=None, season_type=None, team_id=N
     game_set['SEASON_TYPE'] = [SEASON_TYPE[x[:1]] for x in game_set.SEASON_ID]
 
     # get list of teams from the same league to find matchups teams' info
-    matchup_team = get_league_teams(league)
+    matchup_team = get_league_teams(key.league)
 
     # matchup team's abbreviation is define with the last 3 digits from MATCHUP record
     game_set['MATCHUP_TEAM_ABBREVIATION'] = [x[-3:] for x in game_set.MATCHUP]
@@ -261,16 +361,73 @@ def one_team_game_set(league=None, season_year=None, season_type=None, team_id=N
     game_set['FG2M'] = [game_set.FGM[i] - game_set.FG3M[i] for i in game_set.index]
     game_set['FG2A'] = [game_set.FGA[i] - game_set.FG3A[i] for i in game_set.index]
 
+    # team's plus-minus is the final score difference
+    game_set['SCORE_DIFF'] = game_set.PLUS_MINUS
+
     # define columns for output
     result_columns = [
         'SEASON_ID', 'SEASON_CODE', 'SEASON_TYPE', 'GAME_DATE', 'GAME_ID', 'GAME_LOCATION', 'GAME_OUTCOME',
         'TEAM_ID', 'TEAM_ABBREVIATION',
         'MATCHUP_TEAM_ID', 'MATCHUP_TEAM_ABBREVIATION',
-        'PTS', 'FG2M', 'FG2A', 'FG3M', 'FG3A', 'REB', 'AST'
+        'SCORE_DIFF', 'PTS', 'FG2M', 'FG2A', 'FG3M', 'FG3A', 'REB', 'AST',
+        # columns for possessions estimation
+        'FGA', 'FTA', 'OREB', 'TOV'
     ]
     # select data with defined columns only
     game_set = game_set[result_columns]
 
+    # sort games by game date, date filters are binary search slices
+    game_set = index_by_date(game_set)
+
+    # game log of one season type is saved to its own file
+    save_table(game_set, name='game_set', league=key.league, season_year=key.season_year, key=key.season_type)
+
+    return game_set
+
+@keyed_cache(show_spinner='Fetching data from NBA API...', resource=True)
+def map_season_game_set(key):
+    '''
+        Return memory-mapped table with games info of all teams of the league,
+        the game log is fetched again if it doesn't exist or is older than GAME_LOG_TTL
+    '''
+
+    age = table_age(name='game_set', league=key.league, season_year=key.season_year, key=key.season_type)
+
+    if age is None or age > GAME_LOG_TTL:
+        fetch_season_game_set(key)
+
+    return map_table(name='game_set', league=key.league, season_year=key.season_year, key=key.season_type)
+
+def one_team_game_set(key, team_id=None, columns=None):
+    '''
+        Return data frame with team's games info
+
+        Parameters
+        ----------
+        key
+            SeasonKey
+        team_id
+            team id, None for all teams of the league
+        columns
+            list of columns to convert from the mapped table, None for all columns
+
+        Returns
+        -------
+        Result data frame
+
+        SEASON_TYPE, GAME_DATE, GAME_ID,
+        TEAM_ABBREVIATION, MATCHUP_TEAM_ID, MATCHUP_TEAM_ABBREVIATION, MATCHUP_LOCATION, MATCHUP_OUTCOME,
+        SCORE_DIFF, PTS, FG2M, FG2A, FG3M, FG3A, REB, AST,
+        FGA, FTA, OREB, TOV, GAME_DAY
+
+        Rows are sorted by GAME_DAY, see utils.dates.index_by_date()
+    '''
+
+    game_set = table_to_frame(map_season_game_set(key), columns=columns)
+
+    if team_id is not None:
+        game_set = game_set[game_set.TEAM_ID == team_id].reset_index(drop=True)
+
     return game_set
 
 # source: https://github.com/swar/nba_api/blob/master/docs/examples/Finding%20Games.ipynb
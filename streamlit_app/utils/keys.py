@@ -0,0 +1,253 @@
+import streamlit as st
+
+import functools
+import inspect
+import threading
+import time
+from typing import NamedTuple
+
+import pandas as pd
+
+from utils.profiler import span
+from utils.memory import calc_deep_size
+
+CACHE_TTL = 3600
+
+
+class SeasonKey(NamedTuple):
+    '''
+        Season data: league code, season year (2024-25), season type name or None for all types
+    '''
+
+    league: str
+    season_year: str
+    season_type: str = None
+
+
+class GameKey(NamedTuple):
+    '''
+        Game data: league code, season year (2024-25), 10 digit game id
+    '''
+
+    league: str
+    season_year: str
+    game_id: str
+
+
+class TeamKey(NamedTuple):
+    '''
+        Team data: league code, team id
+    '''
+
+    league: str
+    team_id: int
+
+
+KEY_TYPES = (SeasonKey, GameKey, TeamKey)
+
+
+def season_key(league, season_year, season_type=None):
+    '''
+        Return canonical key of the season data
+    '''
+
+    return SeasonKey(str(league), str(season_year), season_type or None)
+
+def game_key(league, season_year, game_id):
+    '''
+        Return canonical key of the game data, game id keeps leading zeros: 0022400001
+    '''
+
+    return GameKey(str(league), str(season_year), str(game_id).zfill(10))
+
+def team_key(league, team_id):
+    '''
+        Return canonical key of the team data
+    '''
+
+    return TeamKey(str(league), int(team_id))
+
+
+def format_key(key):
+    '''
+        Return key as a string: GameKey 00/2024-25/0022400001
+    '''
+
+    return type(key).__name__ + ' ' + '/'.join(str(value) for value in key if value is not None)
+
+
+# module.function name: (cached function, ttl, {(key, args): time the value was cached}, {(key, args): size of the value in bytes})
+_keyed_caches = {}
+_lock = threading.Lock()
+
+
+def drop_expired_calls(calls, sizes, ttl, now):
+    '''
+        Remove calls with values cached longer than ttl ago: st.cache_data has already dropped them,
+        its ttl counts from the time the value was cached, not from the last call
+
+        Call with the lock acquired
+    '''
+
+    for call, cached_at in list(calls.items()):
+        if now - cached_at > ttl:
+            del calls[call]
+            sizes.pop(call, None)
+
+
+def keyed_cache(ttl=CACHE_TTL, show_spinner=False, resource=False):
+    '''
+        Decorator: st.cache_data for the function with the key object as the first argument
+
+        Key is a small tuple, so it is hashed instantly and the same data is found by the same key
+        from any page. Other arguments are bound to positions, so keyword and positional calls
+        share the cached value. Calls are recorded by key: cached values can be listed
+        and invalidated for one key, see list_cached_keys() and invalidate_key().
+        Size of the value is measured once, after it is cached
+
+        Parameters
+        ----------
+        resource
+            st.cache_resource instead of st.cache_data: the value isn't pickled and all sessions
+            of the process get the same object, for memory-mapped Arrow tables (see utils.store.map_table())
+    '''
+
+    def decorator(function):
+        signature = inspect.signature(function)
+        calls = {}
+        sizes = {}
+
+        # runs only when the cache doesn't have the value, failed calls don't have values and aren't recorded.
+        # Wrapped function keeps its name and source, so the cache keys are the function's own
+        @functools.wraps(function)
+        def compute(*args):
+            value = function(*args)
+
+            with _lock:
+                calls[args] = time.time()
+                # new value is measured by the wrapper
+                sizes.pop(args, None)
+
+            return value
+
+        cache = st.cache_resource if resource else st.cache_data
+        cached_function = cache(ttl=ttl, show_spinner=show_spinner)(compute)
+
+        # functions with the same name from different modules have their own entries
+        with _lock:
+            _keyed_caches[f'{function.__module__}.{function.__qualname__}'] = (cached_function, ttl, calls, sizes)
+
+        @functools.wraps(function)
+        def wrapper(key, *args, **kwargs):
+            if not isinstance(key, KEY_TYPES):
+                raise TypeError(f'{function.__name__}() expects SeasonKey, GameKey or TeamKey, got {type(key).__name__}')
+
+            bound = signature.bind(key, *args, **kwargs)
+            bound.apply_defaults()
+
+            with span(function.__name__, 'data', detail=format_key(key)):
+                value = cached_function(*bound.args)
+
+            with _lock:
+                drop_expired_calls(calls, sizes, ttl, time.time())
+
+                # value is new if it was cached by this call or its size wasn't measured yet
+                is_new = bound.args in calls and bound.args not in sizes
+
+            if is_new:
+                size = calc_deep_size(value)
+
+                with _lock:
+                    # the key could be invalidated while the value was measured
+                    if bound.args in calls:
+                        sizes[bound.args] = size
+
+            return value
+
+        wrapper.clear = cached_function.clear
+
+        return wrapper
+
+    return decorator
+
+def list_cached_keys():
+    '''
+        Return keys of the cached values that are not expired yet
+
+        Returns
+        -------
+        Result data frame
+
+        FUNCTION, KEY, ARGS, AGE (seconds since the value was cached), SIZE (deep size of the value in bytes)
+    '''
+
+    now = time.time()
+    rows = []
+
+    with _lock:
+        for name, (_, ttl, calls, sizes) in _keyed_caches.items():
+            drop_expired_calls(calls, sizes, ttl, now)
+
+            for call, cached_at in calls.items():
+                rows.append({
+                    'FUNCTION': name,
+                    'KEY': format_key(call[0]),
+                    'ARGS': ', '.join(str(value) for value in call[1:]),
+                    'AGE': int(now - cached_at),
+                    'SIZE': sizes.get(call)
+                })
+
+    return pd.DataFrame(rows, columns=['FUNCTION', 'KEY', 'ARGS', 'AGE', 'SIZE'])
+
+def get_cached_keys():
+    '''
+        Return list of unique keys that have cached values
+    '''
+
+    with _lock:
+        keys = {call[0] for _, _, calls, _ in _keyed_caches.values() for call in calls}
+
+    return sorted(keys, key=format_key)
+
+def invalidate_key(key=None, league=None, season_year=None):
+    '''
+        Drop cached values of all keyed functions for the key or for all keys of the season
+
+        Parameters
+        ----------
+        key
+            exact key, values for all other arguments of the key are dropped too
+        league, season_year
+            used if the key isn't set: season and game keys of the season
+
+        Returns
+        -------
+        Result int, number of dropped values
+    '''
+
+    def matches(cached_key):
+        if key is not None:
+            return type(cached_key) is type(key) and cached_key == key
+        return (
+            not isinstance(cached_key, TeamKey)
+            and cached_key.league == league
+            and (season_year is None or cached_key.season_year == season_year)
+        )
+
+    with _lock:
+        dropped = [
+            (cached_function, calls, sizes, call)
+            for cached_function, _, calls, sizes in _keyed_caches.values()
+            for call in calls
+            if matches(call[0])
+        ]
+
+        for cached_function, calls, sizes, call in dropped:
+            cached_function.clear(*call)
+            del calls[call]
+            sizes.pop(call, None)
+
+    if len(dropped) > 0:
+        print(f'Cache invalidated: {len(dropped)} values')
+
+    return len(dropped)
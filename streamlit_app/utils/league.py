@@ -1,7 +1,5 @@
 from enum import Enum
 
-from nba_api.stats.endpoints import leaguestandingsv3
-
 class LeagueName(Enum):
     NBA = 'NBA'
     WNBA = 'WNBA'
@@ -0,0 +1,310 @@
+import numpy as np
+import pandas as pd
+
+from utils.events import EVENT_FLAG_COLUMNS, calc_elapsed_seconds, calc_event_flags, fill_scores, is_final, define_home_road_teams
+from utils.games import fetch_play_by_play
+from utils.store import save_table, load_table, list_table_keys
+from utils.keys import keyed_cache
+
+# substitution description: SUB: {player in} FOR {player out}
+SUBSTITUTION_PATTERN = r'^SUB: (?P<IN_NAME>.+?) FOR (?P<OUT_NAME>.+?)\s*$'
+
+STINT_COLUMNS = [
+    'GAME_ID', 'STINT', 'PERIOD', 'START', 'END', 'SECONDS',
+    'TEAM_ID', 'LINEUP', 'OPP_TEAM_ID', 'OPP_LINEUP',
+    'PTS', 'OPP_PTS', 'PLUS_MINUS'
+] + EVENT_FLAG_COLUMNS
+
+# involvement of the player in the event
+INVOLVEMENT_EVENT = 0
+INVOLVEMENT_SUB_IN = 1
+INVOLVEMENT_SUB_OUT = -1
+
+
+def define_player_ids(play_by_play):
+    '''
+        Return data frame to map player's name to player's id for each team
+
+        Substitution descriptions have names only, ids are taken from the other events of the game
+
+        Returns
+        -------
+        Result data frame
+
+        teamId, playerName, personId
+    '''
+
+    players = play_by_play.loc[
+        (play_by_play.personId != 0) & (play_by_play.teamId != 0) & (play_by_play.playerName != ''),
+        ['teamId', 'playerName', 'personId']
+    ]
+
+    return players.drop_duplicates(subset=['teamId', 'playerName'])
+
+def define_involvements(play_by_play):
+    '''
+        Return all player involvements in the events: regular events, substitutions in and out
+
+        Returns
+        -------
+        Result data frame
+
+        ROW, period, teamId, personId, INVOLVEMENT
+    '''
+
+    rows = play_by_play.assign(ROW=np.arange(len(play_by_play)))
+    is_substitution = rows.actionType == 'Substitution'
+
+    events = rows.loc[
+        ~is_substitution & (rows.personId != 0) & (rows.teamId != 0),
+        ['ROW', 'period', 'teamId', 'personId']
+    ].assign(INVOLVEMENT=INVOLVEMENT_EVENT)
+
+    # both players of the substitution are defined by name
+    substitutions = pd.concat(
+        [rows.loc[is_substitution, ['ROW', 'period', 'teamId']],
+         rows.loc[is_substitution, 'description'].str.extract(SUBSTITUTION_PATTERN)],
+        axis=1
+    )
+    player_ids = define_player_ids(play_by_play)
+
+    substitutions_in = substitutions.merge(
+        player_ids, left_on=['teamId', 'IN_NAME'], right_on=['teamId', 'playerName']
+    ).assign(INVOLVEMENT=INVOLVEMENT_SUB_IN)
+    substitutions_out = substitutions.merge(
+        player_ids, left_on=['teamId', 'OUT_NAME'], right_on=['teamId', 'playerName']
+    ).assign(INVOLVEMENT=INVOLVEMENT_SUB_OUT)
+
+    columns = ['ROW', 'period', 'teamId', 'personId', 'INVOLVEMENT']
+
+    return pd.concat(
+        [events[columns], substitutions_in[columns], substitutions_out[columns]],
+        ignore_index=True
+    ).sort_values(by=['ROW', 'INVOLVEMENT'], ignore_index=True)
+
+def reconstruct_on_court(play_by_play):
+    '''
+        Return on-court matrix: players on the floor after every event
+
+        Players who start the period are the players whose first involvement
+        in the period is not a substitution in. Substitutions are applied
+        as cumulative +1/-1 changes inside each period
+
+        Parameters
+        ----------
+        play_by_play
+            raw PlayByPlayV3 play_by_play dataset sorted by actionNumber
+
+        Returns
+        -------
+        Result tuple: (boolean matrix events x players, players data frame with teamId and personId)
+    '''
+
+    involvements = define_involvements(play_by_play)
+
+    players = involvements[['teamId', 'personId']].drop_duplicates().sort_values(by=['teamId', 'personId'], ignore_index=True)
+    player_index = pd.Series(players.index, index=pd.MultiIndex.from_frame(players))
+    involvements['PLAYER'] = player_index.loc[pd.MultiIndex.from_frame(involvements[['teamId', 'personId']])].to_numpy()
+
+    period = play_by_play.period.to_numpy()
+    periods = np.unique(period)
+
+    # starters of each period
+    first_involvements = involvements.drop_duplicates(subset=['period', 'PLAYER'])
+    starters = first_involvements[first_involvements.INVOLVEMENT != INVOLVEMENT_SUB_IN]
+    starters_matrix = np.zeros((len(periods), len(players)), dtype=np.int16)
+    starters_matrix[np.searchsorted(periods, starters.period.to_numpy()), starters.PLAYER.to_numpy()] = 1
+
+    # substitution changes
+    substitutions = involvements[involvements.INVOLVEMENT != INVOLVEMENT_EVENT]
+    changes = np.zeros((len(play_by_play), len(players)), dtype=np.int16)
+    np.add.at(changes, (substitutions.ROW.to_numpy(), substitutions.PLAYER.to_numpy()), substitutions.INVOLVEMENT.to_numpy())
+
+    state = pd.DataFrame(changes).groupby(period).cumsum().to_numpy() + starters_matrix[np.searchsorted(periods, period)]
+
+    return state > 0, players
+
+def encode_lineups(on_court, players, team_id):
+    '''
+        Return lineup key for each event: sorted player ids of the team joined with `-`
+
+        On-court flags are packed into integer bit masks first, so only unique lineups are decoded
+    '''
+
+    team_players = players.index[players.teamId == team_id].to_numpy()
+    person_ids = players.personId.to_numpy()[team_players]
+
+    bits = np.left_shift(np.int64(1), np.arange(len(team_players), dtype=np.int64))
+    masks = on_court[:, team_players].astype(np.int64) @ bits
+
+    unique_masks, inverse = np.unique(masks, return_inverse=True)
+    unique_lineups = np.array([
+        '-'.join(str(person_id) for person_id in sorted(person_ids[(mask & bits) != 0]))
+        for mask in unique_masks
+    ], dtype=object)
+
+    return unique_lineups[inverse]
+
+def build_stints(play_by_play, league):
+    '''
+        Return stints of the game: periods of time with the same ten players on the floor
+
+        Parameters
+        ----------
+        play_by_play
+            raw PlayByPlayV3 play_by_play dataset
+        league
+            league code
+
+        Returns
+        -------
+        Result data frame, two rows for each stint (one for each team)
+
+        GAME_ID, STINT, PERIOD, START, END, SECONDS,
+        TEAM_ID, LINEUP, OPP_TEAM_ID, OPP_LINEUP,
+        PTS, OPP_PTS, PLUS_MINUS,
+        FGM, FGA, FG3M, FG3A, FTM, FTA, REB, AST, TOV
+    '''
+
+    play_by_play = play_by_play.sort_values(by='actionNumber', ignore_index=True)
+    play_by_play['teamId'] = play_by_play.teamId.fillna(0).astype('int64')
+    play_by_play['personId'] = play_by_play.personId.fillna(0).astype('int64')
+    play_by_play['playerName'] = play_by_play.playerName.fillna('')
+
+    home_team, road_team = define_home_road_teams(play_by_play)
+    on_court, players = reconstruct_on_court(play_by_play)
+
+    events = pd.DataFrame({
+        'PERIOD': play_by_play.period.to_numpy(),
+        'ELAPSED': calc_elapsed_seconds(period=play_by_play.period, clock=play_by_play.clock, league=league),
+        'HOME_LINEUP': encode_lineups(on_court, players, home_team),
+        'ROAD_LINEUP': encode_lineups(on_court, players, road_team)
+    })
+    events['HOME_SCORE'], events['ROAD_SCORE'] = fill_scores(play_by_play)
+
+    # new stint starts when any lineup or the period is changed
+    is_new_stint = (
+        (events.HOME_LINEUP != events.HOME_LINEUP.shift())
+        | (events.ROAD_LINEUP != events.ROAD_LINEUP.shift())
+        | (events.PERIOD != events.PERIOD.shift())
+    )
+    events['STINT'] = is_new_stint.cumsum()
+
+    stints = events.groupby('STINT').agg(
+        PERIOD=('PERIOD', 'first'),
+        START=('ELAPSED', 'first'),
+        HOME_LINEUP=('HOME_LINEUP', 'first'),
+        ROAD_LINEUP=('ROAD_LINEUP', 'first'),
+        HOME_SCORE=('HOME_SCORE', 'last'),
+        ROAD_SCORE=('ROAD_SCORE', 'last')
+    )
+
+    # stint ends when the next stint of the same period starts or when the period ends
+    period_end = events.groupby('PERIOD').ELAPSED.max()
+    next_start = stints.START.shift(-1)
+    stints['END'] = np.where(
+        stints.PERIOD.shift(-1) == stints.PERIOD,
+        next_start,
+        stints.PERIOD.map(period_end)
+    ).astype(int)
+    stints['SECONDS'] = stints.END - stints.START
+
+    # points scored during the stint
+    stints['HOME_PTS'] = stints.HOME_SCORE.diff().fillna(stints.HOME_SCORE).astype(int)
+    stints['ROAD_PTS'] = stints.ROAD_SCORE.diff().fillna(stints.ROAD_SCORE).astype(int)
+
+    # counting statistics of each team during the stint
+    flags = calc_event_flags(play_by_play)
+    team_id = play_by_play.teamId.to_numpy()
+    home_stats = flags.mul(team_id == home_team, axis=0).groupby(events.STINT).sum()
+    road_stats = flags.mul(team_id == road_team, axis=0).groupby(events.STINT).sum()
+
+    common = stints[['PERIOD', 'START', 'END', 'SECONDS']].assign(GAME_ID=play_by_play.gameId.iloc[0])
+
+    home = common.assign(
+        TEAM_ID=home_team, LINEUP=stints.HOME_LINEUP,
+        OPP_TEAM_ID=road_team, OPP_LINEUP=stints.ROAD_LINEUP,
+        PTS=stints.HOME_PTS, OPP_PTS=stints.ROAD_PTS
+    ).join(home_stats)
+    road = common.assign(
+        TEAM_ID=road_team, LINEUP=stints.ROAD_LINEUP,
+        OPP_TEAM_ID=home_team, OPP_LINEUP=stints.HOME_LINEUP,
+        PTS=stints.ROAD_PTS, OPP_PTS=stints.HOME_PTS
+    ).join(road_stats)
+
+    result = pd.concat([home, road]).reset_index().sort_values(by=['STINT', 'TEAM_ID'], ignore_index=True)
+    result['PLUS_MINUS'] = result.PTS - result.OPP_PTS
+
+    return result[STINT_COLUMNS]
+
+def get_game_stints(league, season_year, game_id):
+    '''
+        Return stints of the game, see build_stints()
+
+        Stints of finished games are saved to the local data store and calculated only once
+    '''
+
+    stints = load_table(name='stints', league=league, season_year=season_year, key=game_id)
+
+    if stints is None:
+        play_by_play = fetch_play_by_play(league=league, season_year=season_year, game_id=game_id)
+        stints = build_stints(play_by_play, league=league)
+
+        if is_final(play_by_play):
+            save_table(stints, name='stints', league=league, season_year=season_year, key=game_id)
+
+    return stints
+
+def aggregate_lineups(stints):
+    '''
+        Return totals for each team's lineup
+
+        Returns
+        -------
+        Result data frame sorted by the time on the floor
+
+        TEAM_ID, LINEUP, GAMES, STINTS, SECONDS, PTS, OPP_PTS, PLUS_MINUS,
+        FGM, FGA, FG3M, FG3A, FTM, FTA, REB, AST, TOV
+    '''
+
+    lineups = stints.groupby(['TEAM_ID', 'LINEUP']).agg(
+        GAMES=('GAME_ID', 'nunique'),
+        STINTS=('STINT', 'size'),
+        **{column: (column, 'sum') for column in ['SECONDS', 'PTS', 'OPP_PTS', 'PLUS_MINUS'] + EVENT_FLAG_COLUMNS}
+    )
+
+    return lineups.reset_index().sort_values(by='SECONDS', ascending=False, ignore_index=True)
+
+@keyed_cache(show_spinner='Calculating lineups...')
+def get_season_lineups(key):
+    '''
+        Return lineup totals for all games of the season saved in the local data store, see aggregate_lineups()
+    '''
+
+    league, season_year = key.league, key.season_year
+
+    game_ids = list_table_keys(name='play_by_play', league=league, season_year=season_year)
+
+    if len(game_ids) == 0:
+        return aggregate_lineups(pd.DataFrame(columns=STINT_COLUMNS))
+
+    stints = pd.concat(
+        [get_game_stints(league=league, season_year=season_year, game_id=game_id) for game_id in game_ids],
+        ignore_index=True
+    )
+
+    return aggregate_lineups(stints)
+
+def format_lineup(lineup, player_names):
+    '''
+        Return lineup with player names instead of ids
+
+        Parameters
+        ----------
+        lineup
+            lineup key: player ids joined with `-`
+        player_names
+            dict {personId: playerName}
+    '''
+
+    return ', '.join(player_names.get(int(person_id), person_id) for person_id in lineup.split('-') if person_id)
@@ -0,0 +1,333 @@
+import argparse
+import contextlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+from streamlit import config
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest, app_test
+
+from utils.assets import load_logo_index
+from utils.keys import list_cached_keys
+from utils.memory import read_rss, summarise_cached_sizes, MB
+from utils.league import LEAGUE
+from utils.season import SEASON_YEAR
+from utils.params import STATISTICS_TYPE
+from utils.teams import get_league_teams
+from utils.standin import start_standin
+from utils.transport import use_stats_api
+
+# load test: simulated sessions rerun the real app pages headlessly in one server process
+#
+# run from the streamlit_app folder:
+#   python -m utils.loadtest --sessions 8 --actions 20 --latency 0.2
+#                           - with the stand-in started in the same process
+#   python -m utils.loadtest --sessions 8 --actions 20 --api-url http://127.0.0.1:8503
+#                           - with the stand-in started separately (python -m utils.standin)
+APP_FOLDER = Path(__file__).resolve().parent.parent
+
+PAGES = ['ui/pages/league.py', 'ui/pages/team.py', 'ui/pages/game.py']
+
+# AppTest doesn't run st.navigation pages, so each page is run with the app's main controls like app.py does
+PAGE_SCRIPT = '''
+import runpy
+from ui.controls import main_controls
+from utils.profiler import profile_rerun
+
+with profile_rerun(page={page_title!r}):
+    main_controls()
+    runpy.run_path({page_path!r}, run_name='__main__')
+'''
+
+# state of the main controls that is kept when the user switches pages
+SHARED_STATE = ['league', 'season_year', 'toggle_date_range', 'date_range']
+
+# widget key on each page for the matchup
+MATCHUP_KEY = {
+    'ui/pages/team.py': 'team_matchup',
+    'ui/pages/game.py': 'matchup'
+}
+
+# widgets that get new options when the league or the season is changed, the browser resets them to defaults
+DEPENDENT_STATE = {
+    'league': ['season_year', 'team_base', 'team_matchup', 'game_date', 'matchup'],
+    'season': ['game_date', 'matchup']
+}
+
+# widget key: function that returns option values of the widget from its displayed options
+OPTION_VALUES = {
+    'team_base': lambda at, labels: list(get_league_teams(at.session_state['league']).id),
+    'team_matchup': lambda at, labels: list(get_league_teams(at.session_state['league']).id),
+    'matchup': lambda at, labels: labels,
+    'statistics_type': lambda at, labels: [key for key, label in STATISTICS_TYPE.items() if label in labels]
+}
+
+PERCENTILES = [50, 95, 99]
+
+
+def share_app_test_runtime():
+    '''
+        Set up one mock runtime for all AppTest runs
+
+        AppTest (streamlit 1.38) sets up a mock runtime before each run and removes it after,
+        so concurrent sessions remove each other's runtime in the middle of a run.
+        Runs get a runtime class of their own to set up and remove instead
+    '''
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    app_test.Runtime = type('SessionRuntime', (Runtime,), {})
+
+    # the config option is patched and restored by each run in the same way
+    config.set_option('global.appTest', True)
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+
+def open_page(pages, page, at, timeout):
+    '''
+        Return app test of the page with the main controls' state of the current page
+
+        Parameters
+        ----------
+        pages
+            dict of the session's app tests by page, pages keep their widgets' state like in the browser
+        at
+            app test of the current page, None when the app is opened
+    '''
+
+    if page not in pages:
+        pages[page] = AppTest.from_string(
+            PAGE_SCRIPT.format(page_path=str(APP_FOLDER / page), page_title=Path(page).stem.title()),
+            default_timeout=timeout
+        )
+
+    if at is not None:
+        for key in SHARED_STATE:
+            if key in at.session_state:
+                pages[page].session_state[key] = at.session_state[key]
+
+    return pages[page]
+
+def select_random_option(at, key, rng):
+    '''
+        Select random option of the widget, return False if the page doesn't have it
+
+        Option is set to the session state like the browser sends the widget's value:
+        AppTest widgets call format functions outside of the script run to send their values,
+        format functions that read the session state (team names) fail there
+    '''
+
+    widgets = [widget for widget in list(at.selectbox) + list(at.radio) if widget.key == key]
+
+    if not widgets or not widgets[0].options:
+        return False
+
+    at.session_state[key] = rng.choice(OPTION_VALUES[key](at, list(widgets[0].options)))
+
+    return True
+
+def reset_state(at, keys):
+    '''
+        Remove values of the widgets from the session state, widgets get their default values on the next run
+    '''
+
+    for key in keys:
+        if key in at.session_state:
+            del at.session_state[key]
+
+def apply_random_action(at, page, rng):
+    '''
+        Change one control of the page like a user does
+
+        Returns
+        -------
+        Result tuple: (action name, page after the action), page is switched by the caller
+    '''
+
+    actions = ['page', 'league', 'season', 'team', 'matchup', 'statistics']
+
+    # controls of the page that isn't rendered (data error) are not available, other actions are tried
+    for action in rng.sample(actions, len(actions)):
+        if action == 'page':
+            page = rng.choice([other for other in PAGES if other != page])
+        elif action == 'league':
+            at.session_state['league'] = rng.choice(list(LEAGUE))
+            reset_state(at, DEPENDENT_STATE[action])
+        elif action == 'season':
+            at.session_state['season_year'] = rng.choice(list(SEASON_YEAR[at.session_state['league']]))
+            reset_state(at, DEPENDENT_STATE[action])
+        elif action == 'team':
+            if not select_random_option(at, 'team_base', rng):
+                continue
+        elif action == 'matchup':
+            if page not in MATCHUP_KEY or not select_random_option(at, MATCHUP_KEY[page], rng):
+                continue
+        elif action == 'statistics':
+            if not select_random_option(at, 'statistics_type', rng):
+                continue
+
+        return action, page
+
+def run_session(session, actions, seed, timeout):
+    '''
+        Open the app and rerun it after each random action
+
+        Returns
+        -------
+        Result list of dicts
+
+        SESSION, STEP, PAGE, ACTION, SECONDS, ERROR - the page has an exception or an error message
+    '''
+
+    rng = random.Random(seed + session)
+    pages = {}
+    page, action = PAGES[0], 'load'
+    at = open_page(pages, page, at=None, timeout=timeout)
+    results = []
+
+    for step in range(actions + 1):
+        if step > 0:
+            action, next_page = apply_random_action(at, page, rng)
+
+            if next_page != page:
+                at, page = open_page(pages, next_page, at=at, timeout=timeout), next_page
+
+        start = time.perf_counter()
+        # all widgets of the app have keys, so their values are sent with the session state, see select_random_option()
+        at._run(timeout=timeout)
+
+        results.append({
+            'SESSION': session,
+            'STEP': step,
+            'PAGE': page,
+            'ACTION': action,
+            'SECONDS': time.perf_counter() - start,
+            'ERROR': len(at.exception) > 0 or len(at.error) > 0
+        })
+
+    return results
+
+def summarise_latency(results):
+    '''
+        Return rerun latency percentiles for each page and for all pages
+
+        Returns
+        -------
+        Result data frame indexed by PAGE
+
+        RERUNS, ERRORS, MEAN_MS, P50_MS, P95_MS, P99_MS
+    '''
+
+    def summarise(reruns):
+        milliseconds = reruns.SECONDS.to_numpy() * 1000
+
+        return pd.Series({
+            'RERUNS': len(reruns),
+            'ERRORS': int(reruns.ERROR.sum()),
+            'MEAN_MS': milliseconds.mean(),
+            **{f'P{percentile}_MS': value for percentile, value in zip(PERCENTILES, np.percentile(milliseconds, PERCENTILES))}
+        })
+
+    summary = {page: summarise(reruns) for page, reruns in results.groupby('PAGE')}
+    summary['all'] = summarise(results)
+
+    return pd.DataFrame.from_dict(summary, orient='index').rename_axis('PAGE')
+
+def run_load_test(sessions=4, actions=10, seed=0, timeout=60):
+    '''
+        Run simulated sessions concurrently and report rerun latency, throughput and memory growth
+
+        Sessions share the process like the users of one server process do: cached data,
+        the local data store and NBA API calls. The first rerun of each session opens the app
+
+        Parameters
+        ----------
+        sessions
+            number of concurrent sessions
+        actions
+            number of random actions of each session after the app is opened
+        seed
+            random seed, the same seed repeats the same actions
+        timeout
+            timeout of one rerun in seconds
+
+        Returns
+        -------
+        Result tuple: (reruns data frame, see run_session(), report dict)
+    '''
+
+    share_app_test_runtime()
+    # app.py loads logos once per server process
+    load_logo_index()
+
+    rss_start = read_rss()
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        session_results = list(executor.map(
+            lambda session: run_session(session, actions=actions, seed=seed, timeout=timeout),
+            range(sessions)
+        ))
+
+    duration = time.perf_counter() - start
+    rss_end = read_rss()
+
+    results = pd.DataFrame([result for session_result in session_results for result in session_result])
+
+    report = {
+        'sessions': sessions,
+        'reruns': len(results),
+        'duration': duration,
+        'throughput': len(results) / duration,
+        'rss_start': rss_start,
+        'rss_end': rss_end,
+        'rss_growth': rss_end - rss_start,
+        'latency': summarise_latency(results),
+        # cached values the sessions left in the process, see utils.memory
+        'cached': summarise_cached_sizes(list_cached_keys())
+    }
+
+    print(
+        f'Load test finished: {sessions} sessions, {report["reruns"]} reruns in {duration:.1f} s\n'
+        f'Throughput: {report["throughput"]:.2f} reruns/s\n'
+        f'Memory: {rss_start:.0f} MB -> {rss_end:.0f} MB ({report["rss_growth"]:+.0f} MB), '
+        f'cached values: {report["cached"].SIZE.sum() / MB:.0f} MB\n'
+        f'{report["latency"].round(1).to_string()}\n'
+        f'{(report["cached"][["ENTRIES", "SIZE"]].assign(SIZE=lambda df: df.SIZE / MB)).round(2).rename(columns={"SIZE": "SIZE_MB"}).to_string()}'
+    )
+
+    return results, report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test of the app pages with simulated sessions')
+    parser.add_argument('--sessions', type=int, default=4, help='number of concurrent sessions')
+    parser.add_argument('--actions', type=int, default=10, help='number of actions of each session')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the actions')
+    parser.add_argument('--timeout', type=float, default=60, help='timeout of one rerun in seconds')
+    parser.add_argument('--api-url', help='NBA API stand-in url, the stand-in is started in the same process if it is not set')
+    parser.add_argument('--latency', type=float, default=0, help='response delay of the stand-in started in the same process')
+    parser.add_argument('--output', help='csv file for the reruns')
+    args = parser.parse_args()
+
+    if args.api_url:
+        use_stats_api(args.api_url)
+    else:
+        # port 0 - any free port
+        _, url = start_standin(port=0, latency=args.latency)
+        use_stats_api(url)
+
+    results, _ = run_load_test(sessions=args.sessions, actions=args.actions, seed=args.seed, timeout=args.timeout)
+
+    if args.output:
+        results.to_csv(args.output, index=False)
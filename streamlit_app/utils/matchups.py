@@ -0,0 +1,54 @@
+from utils.params import OutcomeName, STATISTICS_TYPE
+
+
+def summarise_matchups(game_set):
+    '''
+        Return head-to-head summary for every pair of teams
+
+        Parameters
+        ----------
+        game_set
+            combined game log, result of the combine_team_games() function with keep_method=None
+
+        Returns
+        -------
+        Result data frame indexed by TEAM_ID and MATCHUP_TEAM_ID
+
+        GAMES, WINS, LOSSES,
+        mean value for each STATISTICS_TYPE metric,
+        GAME_IDS - list of game ids starting from the last meeting
+    '''
+
+    statistics = [statistics_type for statistics_type in STATISTICS_TYPE if statistics_type in game_set.columns]
+
+    # the last meetings go first in the game ids lists
+    games = game_set.sort_values(by='GAME_DATE', ascending=False).assign(
+        WIN=lambda df: (df.GAME_OUTCOME == OutcomeName.WIN.value).astype(int)
+    )
+
+    grouped = games.groupby(['TEAM_ID', 'MATCHUP_TEAM_ID'], sort=False)
+
+    summary = grouped[statistics].mean()
+    summary['GAMES'] = grouped.size()
+    summary['WINS'] = grouped.WIN.sum()
+    summary['LOSSES'] = summary.GAMES - summary.WINS
+    summary['GAME_IDS'] = grouped.GAME_ID.agg(list)
+
+    return summary
+
+def build_matchup_matrix(summary):
+    '''
+        Return head-to-head summary as a dict, summary for the pair is a dict lookup:
+        matrix.get((team_id, matchup_team_id))
+
+        Parameters
+        ----------
+        summary
+            result of the summarise_matchups() function
+
+        Returns
+        -------
+        Result dict {(TEAM_ID, MATCHUP_TEAM_ID): summary}
+    '''
+
+    return summary.to_dict(orient='index')
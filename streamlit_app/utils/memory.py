@@ -0,0 +1,220 @@
+import streamlit as st
+
+import json
+import resource
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# memory accounting of the server process: cached values by function and key, sessions' state
+#
+# st.cache_data keeps values pickled and returns a new copy on every call,
+# so sizes of the values are sizes of the copies the pages work with,
+# STORED_SIZE is the size of the pickled values in the cache itself.
+# Season datasets are memory-mapped Arrow tables in st.cache_resource, see utils.store.map_table()
+MB = 2 ** 20
+
+
+def read_rss():
+    '''
+        Return resident memory of the process in MB, peak memory if the current one isn't available
+    '''
+
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / MB
+    except OSError:
+        # ru_maxrss is in KB on Linux and in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+def calc_deep_size(value, seen=None):
+    '''
+        Return size of the value with all values it contains in bytes
+
+        Data frames, series and arrays are measured by their buffers (object columns with their strings),
+        containers and objects - with their items and attributes. Shared values are counted once.
+        Arrow tables are memory-mapped from the local data store, their pages are shared by all processes
+        and are not counted
+
+        Parameters
+        ----------
+        seen
+            ids of the values that are already counted
+    '''
+
+    if seen is None:
+        seen = set()
+
+    if id(value) in seen:
+        return 0
+
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+
+    # sys.getsizeof() of the table is the size of its buffers
+    if isinstance(value, pa.Table):
+        return object.__sizeof__(value)
+
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        size += sum(calc_deep_size(key, seen) + calc_deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(calc_deep_size(item, seen) for item in value)
+    elif hasattr(value, '__dict__') and not isinstance(value, type):
+        size += calc_deep_size(vars(value), seen)
+
+    return size
+
+def summarise_cached_sizes(cached):
+    '''
+        Return number and size of the cached values for each function
+
+        Parameters
+        ----------
+        cached
+            result of the list_cached_keys() function
+
+        Returns
+        -------
+        Result data frame indexed by FUNCTION, sorted by SIZE
+
+        ENTRIES, KEYS, SIZE, MAX_SIZE (bytes), MAX_AGE (seconds)
+    '''
+
+    return cached.groupby('FUNCTION').agg(
+        ENTRIES=('KEY', 'size'),
+        KEYS=('KEY', 'nunique'),
+        SIZE=('SIZE', 'sum'),
+        MAX_SIZE=('SIZE', 'max'),
+        MAX_AGE=('AGE', 'max')
+    ).sort_values(by='SIZE', ascending=False)
+
+def list_stored_sizes():
+    '''
+        Return memory of the Streamlit caches as the runtime reports it (see /_stcore/metrics):
+        pickled values of st.cache_data and values of st.cache_resource for each function
+
+        Returns
+        -------
+        Result data frame
+
+        CACHE, FUNCTION, STORED_SIZE (bytes)
+    '''
+
+    rows = []
+
+    if runtime.exists():
+        for stat in runtime.get_instance().stats_mgr.get_stats():
+            if stat.category_name in ('st_cache_data', 'st_cache_resource'):
+                rows.append({'CACHE': stat.category_name, 'FUNCTION': stat.cache_name, 'STORED_SIZE': stat.byte_length})
+
+    return pd.DataFrame(rows, columns=['CACHE', 'FUNCTION', 'STORED_SIZE'])
+
+def read_session_states():
+    '''
+        Return dict of the session states of active sessions: {session id: {key: value}}
+
+        App tests don't track sessions in their runtime, only the current session is returned there
+    '''
+
+    session_manager = getattr(runtime.get_instance(), '_session_mgr', None) if runtime.exists() else None
+
+    if session_manager is None:
+        ctx = get_script_run_ctx()
+        return {} if ctx is None else {ctx.session_id: dict(st.session_state.items())}
+
+    return {
+        session_info.session.id: session_info.session.session_state.filtered_state
+        for session_info in session_manager.list_active_sessions()
+    }
+
+def list_session_sizes():
+    '''
+        Return size of the session state of each active session of the server process
+
+        Returns
+        -------
+        Result data frame sorted by SIZE
+
+        SESSION, CURRENT (the session that requested the report), KEYS, SIZE (bytes), LARGEST_KEY
+    '''
+
+    ctx = get_script_run_ctx()
+    rows = []
+
+    for session_id, state in read_session_states().items():
+        key_sizes = {key: calc_deep_size(value) for key, value in state.items()}
+
+        rows.append({
+            'SESSION': session_id,
+            'CURRENT': ctx is not None and ctx.session_id == session_id,
+            'KEYS': len(state),
+            'SIZE': sum(key_sizes.values()),
+            'LARGEST_KEY': max(key_sizes, key=key_sizes.get) if key_sizes else None
+        })
+
+    return pd.DataFrame(
+        rows, columns=['SESSION', 'CURRENT', 'KEYS', 'SIZE', 'LARGEST_KEY']
+    ).sort_values(by='SIZE', ascending=False, ignore_index=True)
+
+def frame_to_records(df):
+    '''
+        Return rows of the data frame as a list of dicts, missing values are None
+    '''
+
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+def build_memory_report(cached):
+    '''
+        Return memory accounting report of the server process
+
+        Parameters
+        ----------
+        cached
+            result of the list_cached_keys() function
+
+        Returns
+        -------
+        Result dict
+
+        created, rss (MB), cached_size (bytes), session_size (bytes), functions, stored, entries, sessions - lists of dicts
+    '''
+
+    functions = summarise_cached_sizes(cached)
+    sessions = list_session_sizes()
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'rss': round(read_rss(), 1),
+        'cached_size': int(cached.SIZE.sum()),
+        'session_size': int(sessions.SIZE.sum()),
+        'functions': frame_to_records(functions.reset_index()),
+        'stored': frame_to_records(list_stored_sizes()),
+        'entries': frame_to_records(cached.sort_values(by='SIZE', ascending=False)),
+        'sessions': frame_to_records(sessions)
+    }
+
+def dump_memory_report(report):
+    '''
+        Return the report as JSON, see build_memory_report()
+    '''
+
+    # numpy numbers of the aggregates are written as plain numbers, missing values are null (see frame_to_records())
+    return json.dumps(
+        report, indent=2, allow_nan=False,
+        default=lambda value: value.item() if hasattr(value, 'item') else str(value)
+    )
@@ -26,6 +26,7 @@ class StatisticsTypeCode(Enum):
     FG3M = 'FG3M'
     REB = 'REB'
     AST = 'AST'
+    WIN_PROB = 'WIN_PROB'
 
 class StatisticsTypeName(Enum):
     SCORE_DIFF = 'Score Difference'
@@ -35,14 +36,37 @@ class StatisticsTypeName(Enum):
     FG3M = '3-Point Field Goals'
     REB = 'Rebounds'
     AST = 'Assists'
+    WIN_PROB = 'Win Probability'
 
 class GraphTypeCode(Enum):
     BAR = 'BAR'
     BOX = 'BOX'
+    BOX_SUMMARY = 'BOX_SUMMARY'
 
 class GraphTypeName(Enum):
     BAR = 'Bar Chart'
     BOX = 'Box Plot'
+    BOX_SUMMARY = 'Box Plot (Summary)'
+
+class TimeframeCode(Enum):
+    GAME = 'GAME'
+    PERIOD = 'PERIOD'
+    MINUTE = 'MINUTE'
+
+class TimeframeName(Enum):
+    GAME = 'Game'
+    PERIOD = 'Period'
+    MINUTE = 'Minute'
+
+class RatingViewCode(Enum):
+    SNAPSHOT = 'SNAPSHOT'
+    PROGRESSION = 'PROGRESSION'
+    ELO = 'ELO'
+
+class RatingViewName(Enum):
+    SNAPSHOT = 'Season Snapshot'
+    PROGRESSION = 'Season Progression'
+    ELO = 'Elo Ratings'
 
 LOCATION = {
     LocationCode.HOME.value : LocationName.HOME.value,
@@ -61,18 +85,26 @@ STATISTICS_TYPE = {
     StatisticsTypeCode.FG2M.value : StatisticsTypeName.FG2M.value,
     StatisticsTypeCode.FG3M.value : StatisticsTypeName.FG3M.value,
     StatisticsTypeCode.REB.value : StatisticsTypeName.REB.value,
-    StatisticsTypeCode.AST.value : StatisticsTypeName.AST.value
+    StatisticsTypeCode.AST.value : StatisticsTypeName.AST.value,
+    StatisticsTypeCode.WIN_PROB.value : StatisticsTypeName.WIN_PROB.value
 }
 
 TIMEFRAME = {
-    'GAME' : 'Game',
-    'PERIOD' : 'Period'
-    # 'MINUTE' : 'Minute'
+    TimeframeCode.GAME.value : TimeframeName.GAME.value,
+    TimeframeCode.PERIOD.value : TimeframeName.PERIOD.value,
+    TimeframeCode.MINUTE.value : TimeframeName.MINUTE.value
 }
 
 GRAPH_TYPE = {
     GraphTypeCode.BAR.value : GraphTypeName.BAR.value,
-    GraphTypeCode.BOX.value : GraphTypeName.BOX.value
+    GraphTypeCode.BOX.value : GraphTypeName.BOX.value,
+    GraphTypeCode.BOX_SUMMARY.value : GraphTypeName.BOX_SUMMARY.value
+}
+
+RATING_VIEW = {
+    RatingViewCode.SNAPSHOT.value : RatingViewName.SNAPSHOT.value,
+    RatingViewCode.PROGRESSION.value : RatingViewName.PROGRESSION.value,
+    RatingViewCode.ELO.value : RatingViewName.ELO.value
 }
 
 # length of the standard period and overtime in minutes for different leagues
@@ -101,4 +133,20 @@ def format_graph_type_options(key):
         Function is used for the Streamlit's input to modify the display of selected options
     '''
 
-    return GRAPH_TYPE[key]
\ No newline at end of file
+    return GRAPH_TYPE[key]
+
+
+def format_rating_view_options(key):
+    '''
+        Function is used for the Streamlit's input to modify the display of selected options
+    '''
+
+    return RATING_VIEW[key]
+
+
+def format_timeframe_options(key):
+    '''
+        Function is used for the Streamlit's input to modify the display of selected options
+    '''
+
+    return TIMEFRAME[key]
@@ -0,0 +1,302 @@
+import threading
+from typing import NamedTuple
+
+import pandas as pd
+
+from utils.params import OutcomeName
+from utils.games import one_team_game_set, combine_team_games
+from utils.matchups import summarise_matchups, build_matchup_matrix
+from utils.distributions import summarise_team_distributions
+from utils.keys import keyed_cache, season_key
+from utils.store import save_table, load_table, map_table, table_to_frame
+
+# name of the input that is the season game log itself, see one_team_game_set()
+GAME_SET = 'game_set'
+
+SIGNATURE_COLUMNS = ['GAME_ID', 'TEAM_ID', 'SIGNATURE']
+
+# (league, season year, dataset name): lock, sessions of the process don't apply the same delta at once
+_update_locks = {}
+_update_locks_lock = threading.Lock()
+
+
+class GameDelta(NamedTuple):
+    '''
+        Changes of the game log since the last update of the dataset:
+        game ids that are new, changed or removed and team ids of those games
+    '''
+
+    game_ids: pd.Index
+    team_ids: pd.Index
+
+
+def calc_game_signatures(game_set):
+    '''
+        Return signature of each row of the game log, the row changes when any of its values changes
+
+        Returns
+        -------
+        Result data frame
+
+        GAME_ID, TEAM_ID, SIGNATURE
+    '''
+
+    signatures = game_set[['GAME_ID', 'TEAM_ID']].copy()
+    # int64 view of the hash, so the signature is stored as a plain Arrow column
+    signatures['SIGNATURE'] = pd.util.hash_pandas_object(game_set, index=False).to_numpy().view('int64')
+
+    return signatures.reset_index(drop=True)
+
+def define_game_delta(signatures, processed_signatures):
+    '''
+        Return changes between the current game log and the game log the dataset was built from
+
+        Parameters
+        ----------
+        signatures
+            current game log, result of the calc_game_signatures() function
+        processed_signatures
+            game log of the last update, None if the dataset wasn't built yet
+
+        Returns
+        -------
+        Result GameDelta, all games and teams if the dataset wasn't built yet
+    '''
+
+    if processed_signatures is None:
+        return GameDelta(pd.Index(signatures.GAME_ID.unique()), pd.Index(signatures.TEAM_ID.unique()))
+
+    current = pd.MultiIndex.from_frame(signatures[SIGNATURE_COLUMNS])
+    processed = pd.MultiIndex.from_frame(processed_signatures[SIGNATURE_COLUMNS])
+
+    # rows that are new or changed and rows that are changed or removed
+    changed = current.difference(processed).append(processed.difference(current))
+
+    return GameDelta(
+        pd.Index(changed.get_level_values('GAME_ID').unique()),
+        pd.Index(changed.get_level_values('TEAM_ID').unique())
+    )
+
+def update_team_games(previous, inputs, delta):
+    '''
+        Return combined game log with the games of the delta replaced,
+        see combine_team_games() with keep_method=None
+
+        Rows are sorted by GAME_DAY and GAME_ID
+    '''
+
+    game_set = inputs[GAME_SET]
+
+    team_games = combine_team_games(df=game_set[game_set.GAME_ID.isin(delta.game_ids)], keep_method=None)
+
+    if previous is not None:
+        team_games = pd.concat([previous[~previous.GAME_ID.isin(delta.game_ids)], team_games], ignore_index=True)
+
+    return team_games.sort_values(by=['GAME_DAY', 'GAME_ID'], kind='stable', ignore_index=True)
+
+def update_team_records(previous, inputs, delta):
+    '''
+        Return number of games, wins and losses of each team with the records of the delta teams recalculated
+
+        Returns
+        -------
+        Result data frame indexed by TEAM_ID
+
+        GAMES, WINS, LOSSES
+    '''
+
+    game_set = inputs[GAME_SET]
+    games = game_set[game_set.TEAM_ID.isin(delta.team_ids)]
+
+    is_win = (games.GAME_OUTCOME == OutcomeName.WIN.value).astype(int)
+
+    records = is_win.groupby(games.TEAM_ID).agg(['size', 'sum']).rename(columns={'size': 'GAMES', 'sum': 'WINS'})
+    records['LOSSES'] = records.GAMES - records.WINS
+
+    if previous is not None:
+        records = pd.concat([previous.drop(index=delta.team_ids, errors='ignore'), records])
+
+    return records.sort_index()
+
+def update_matchups(previous, inputs, delta):
+    '''
+        Return head-to-head summary with the pairs of the delta teams recalculated, see summarise_matchups()
+    '''
+
+    team_games = inputs['team_games']
+
+    summary = summarise_matchups(team_games[team_games.TEAM_ID.isin(delta.team_ids)])
+
+    if previous is not None:
+        is_dirty = previous.index.get_level_values('TEAM_ID').isin(delta.team_ids)
+        summary = pd.concat([previous[~is_dirty], summary])
+
+    return summary
+
+def update_team_distributions(previous, inputs, delta):
+    '''
+        Return box plot summaries with the statistics of the delta teams recalculated, see summarise_team_distributions()
+    '''
+
+    team_games = inputs['team_games']
+
+    summary = summarise_team_distributions(team_games[team_games.TEAM_ID.isin(delta.team_ids)])
+
+    if previous is not None:
+        is_dirty = previous.index.get_level_values('TEAM_ID').isin(delta.team_ids)
+        summary = pd.concat([previous[~is_dirty], summary])
+
+    return summary
+
+
+# derived dataset name: (input names, function to apply the delta)
+# the function gets the previous dataset (None if it wasn't built yet), inputs by name and GameDelta
+DERIVED_DATASETS = {
+    'team_games': ([GAME_SET], update_team_games),
+    'team_records': ([GAME_SET], update_team_records),
+    'matchups': (['team_games'], update_matchups),
+    'team_distributions': (['team_games'], update_team_distributions)
+}
+
+
+def get_update_lock(name, league, season_year):
+    '''
+        Return lock of the derived dataset of the season
+    '''
+
+    with _update_locks_lock:
+        return _update_locks.setdefault((league, season_year, name), threading.Lock())
+
+def apply_game_delta(name, league, season_year, game_set, signatures, updated):
+    '''
+        Return derived dataset updated to the current game log
+
+        Dataset is saved to the local data store with the signatures of the games it was built from.
+        When the game log changes, only the delta is applied to the saved dataset:
+        rows of the new, changed or removed games and aggregates of their teams.
+        Inputs of the dataset are updated first, but only if the dataset has a delta
+
+        Parameters
+        ----------
+        name
+            dataset name from DERIVED_DATASETS
+        game_set
+            current season game log
+        signatures
+            result of the calc_game_signatures() function for the game log
+        updated
+            dict of the datasets that are already updated in this run
+
+        Returns
+        -------
+        Result data frame
+    '''
+
+    if name == GAME_SET:
+        return game_set
+
+    if name in updated:
+        return updated[name]
+
+    # the dataset is loaded after the lock is acquired: it could be updated by the session that held it
+    with get_update_lock(name, league=league, season_year=season_year):
+        input_names, apply_delta = DERIVED_DATASETS[name]
+
+        previous = load_table(name=name, league=league, season_year=season_year)
+        processed_signatures = load_table(name=name + '_games', league=league, season_year=season_year)
+
+        if previous is None:
+            processed_signatures = None
+
+        delta = define_game_delta(signatures, processed_signatures)
+
+        if previous is not None and len(delta.game_ids) == 0:
+            updated[name] = previous
+            return previous
+
+        inputs = {
+            input_name: apply_game_delta(input_name, league, season_year, game_set, signatures, updated)
+            for input_name in input_names
+        }
+
+        dataset = apply_delta(previous, inputs, delta)
+
+        # dataset goes first: new signatures without the dataset would hide the delta from the next update
+        save_table(dataset, name=name, league=league, season_year=season_year)
+        save_table(signatures, name=name + '_games', league=league, season_year=season_year)
+
+        print(
+            f'{name} updated successfully: '
+            f'{len(delta.game_ids)} games, {len(delta.team_ids)} teams{"" if previous is not None else " (full build)"}'
+        )
+
+        updated[name] = dataset
+
+        return dataset
+
+def update_derived_dataset(key, name):
+    '''
+        Return derived dataset of the season updated to the current game log, see apply_game_delta()
+
+        Parameters
+        ----------
+        key
+            SeasonKey, datasets are built for all season types
+        name
+            dataset name from DERIVED_DATASETS
+    '''
+
+    game_set = one_team_game_set(season_key(key.league, key.season_year))
+
+    return apply_game_delta(
+        name, league=key.league, season_year=key.season_year,
+        game_set=game_set, signatures=calc_game_signatures(game_set), updated={}
+    )
+
+@keyed_cache(show_spinner='Calculating team statistics...', resource=True)
+def map_derived_dataset(key, name):
+    '''
+        Return memory-mapped table of the derived dataset updated to the current game log, see update_derived_dataset()
+
+        All sessions of the process share the table, the game log is checked for the delta once per cache TTL
+    '''
+
+    update_derived_dataset(key, name)
+
+    return map_table(name=name, league=key.league, season_year=key.season_year)
+
+def get_season_team_games(key, columns=None):
+    '''
+        Return combined game log of the season, one row for each team in each game
+
+        Rows are sorted by GAME_DAY, see update_team_games()
+
+        Parameters
+        ----------
+        columns
+            list of columns to convert from the mapped table, None for all columns
+    '''
+
+    return table_to_frame(map_derived_dataset(key, 'team_games'), columns=columns)
+
+def get_season_team_records(key):
+    '''
+        Return number of games, wins and losses of each team in the season, see update_team_records()
+    '''
+
+    return table_to_frame(map_derived_dataset(key, 'team_records'))
+
+@keyed_cache()
+def get_matchup_matrix(key):
+    '''
+        Return head-to-head summary for every pair of teams for the season, see build_matchup_matrix()
+    '''
+
+    return build_matchup_matrix(table_to_frame(map_derived_dataset(key, 'matchups')))
+
+def get_season_team_distributions(key):
+    '''
+        Return box plot summary of each statistic for every team for the season, see update_team_distributions()
+    '''
+
+    return table_to_frame(map_derived_dataset(key, 'team_distributions'))
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+from utils.events import calc_event_flags
+from utils.lineups import define_player_ids, get_game_stints
+from utils.store import save_table, load_table, list_table_keys
+from utils.keys import keyed_cache
+
+PLAYER_INFO_COLUMNS = ['TEAM_ID', 'PLAYER_NAME']
+PLAYER_STAT_COLUMNS = ['GAMES', 'SECONDS', 'PTS', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'REB', 'AST', 'TOV']
+
+# made shot description: ... (Brown 1 AST)
+ASSIST_PATTERN = r'\((?P<playerName>[^()]+?) \d+ AST\)'
+
+# accumulated totals are saved after this number of processed games
+CHECKPOINT_GAMES = 50
+
+
+def calc_player_game_stats(play_by_play, stints):
+    '''
+        Return each player's statistics for one game
+
+        Parameters
+        ----------
+        play_by_play
+            raw PlayByPlayV3 play_by_play dataset
+        stints
+            stints of the game, result of the get_game_stints() function
+
+        Returns
+        -------
+        Result data frame indexed by PERSON_ID
+
+        TEAM_ID, PLAYER_NAME,
+        GAMES, SECONDS, PTS, FGM, FGA, FG3M, FG3A, FTM, FTA, REB, AST, TOV
+    '''
+
+    play_by_play = play_by_play.sort_values(by='actionNumber', ignore_index=True)
+    play_by_play['teamId'] = play_by_play.teamId.fillna(0).astype('int64')
+    play_by_play['personId'] = play_by_play.personId.fillna(0).astype('int64')
+    play_by_play['playerName'] = play_by_play.playerName.fillna('')
+
+    is_player_event = (play_by_play.personId != 0) & (play_by_play.teamId != 0)
+
+    # shots, free throws, rebounds and turnovers belong to the event's player
+    flags = calc_event_flags(play_by_play).drop(columns='AST')
+    stats = flags[is_player_event].groupby(play_by_play.personId[is_player_event]).sum()
+
+    # assists are written in the made shot description with the player's name only
+    player_ids = define_player_ids(play_by_play)
+    assists = play_by_play.loc[play_by_play.actionType == 'Made Shot', ['teamId']].join(
+        play_by_play.description.str.extract(ASSIST_PATTERN)
+    ).merge(player_ids, on=['teamId', 'playerName'])
+    stats['AST'] = assists.groupby('personId').size()
+
+    # time on the floor from the lineups of the stints
+    on_court = stints[['LINEUP', 'SECONDS']].assign(personId=stints.LINEUP.str.split('-')).explode('personId')
+    on_court = on_court[on_court.personId != '']
+    stats = stats.join(on_court.groupby(on_court.personId.astype('int64')).SECONDS.sum(), how='outer')
+
+    stats = stats.fillna(0).astype('int64')
+    stats['PTS'] = 2 * stats.FGM + stats.FG3M + stats.FTM
+    stats['GAMES'] = 1
+
+    # team and short name of the player: J. Tatum
+    players = play_by_play[is_player_event].drop_duplicates(subset='personId').set_index('personId')
+    stats['TEAM_ID'] = players.teamId
+    stats['PLAYER_NAME'] = players.playerNameI
+
+    stats.index.name = 'PERSON_ID'
+
+    return stats[PLAYER_INFO_COLUMNS + PLAYER_STAT_COLUMNS]
+
+def fold_player_stats(totals, game_stats):
+    '''
+        Return totals with the game's statistics added
+
+        Team and name are taken from the latest game, so traded players are shown with their current team
+    '''
+
+    if totals is None:
+        return game_stats
+
+    stats = totals[PLAYER_STAT_COLUMNS].add(game_stats[PLAYER_STAT_COLUMNS], fill_value=0).astype('int64')
+    info = game_stats[PLAYER_INFO_COLUMNS].combine_first(totals[PLAYER_INFO_COLUMNS])
+
+    return info.join(stats)
+
+def update_season_player_totals(league, season_year, checkpoint_games=CHECKPOINT_GAMES):
+    '''
+        Return each player's totals for all games of the season saved in the local data store
+
+        Games are read from the local data store one by one and folded into the totals,
+        so only one game and the totals are kept in memory. Totals are saved with the list
+        of processed games every `checkpoint_games` games: interrupted update is continued
+        from the last checkpoint and next updates process only newly saved games
+
+        Returns
+        -------
+        Result data frame indexed by PERSON_ID, see calc_player_game_stats()
+    '''
+
+    totals = load_table(name='player_totals', league=league, season_year=season_year)
+    processed_games = load_table(name='player_totals_games', league=league, season_year=season_year)
+
+    if totals is None or processed_games is None:
+        totals = None
+        processed_games = pd.DataFrame(columns=['GAME_ID'])
+
+    processed_game_ids = set(processed_games.GAME_ID)
+    game_ids = [
+        game_id
+        for game_id in list_table_keys(name='play_by_play', league=league, season_year=season_year)
+        if game_id not in processed_game_ids
+    ]
+
+    new_game_ids = []
+
+    def save_checkpoint():
+        save_table(totals, name='player_totals', league=league, season_year=season_year)
+        save_table(
+            pd.concat([processed_games, pd.DataFrame({'GAME_ID': new_game_ids})], ignore_index=True),
+            name='player_totals_games', league=league, season_year=season_year
+        )
+
+    for game_id in game_ids:
+        play_by_play = load_table(name='play_by_play', league=league, season_year=season_year, key=game_id)
+        stints = get_game_stints(league=league, season_year=season_year, game_id=game_id)
+
+        totals = fold_player_stats(totals, calc_player_game_stats(play_by_play, stints))
+        new_game_ids.append(game_id)
+
+        if len(new_game_ids) % checkpoint_games == 0:
+            save_checkpoint()
+
+    if len(new_game_ids) % checkpoint_games != 0:
+        save_checkpoint()
+
+    if totals is None:
+        return pd.DataFrame(columns=PLAYER_INFO_COLUMNS + PLAYER_STAT_COLUMNS).rename_axis('PERSON_ID')
+
+    if len(new_game_ids) > 0:
+        print(f'Player totals updated successfully: {len(new_game_ids)} new games, {len(totals)} players')
+
+    return totals
+
+@keyed_cache(show_spinner='Calculating player statistics...')
+def get_season_player_totals(key):
+    '''
+        Return each player's totals for the season, see update_season_player_totals()
+    '''
+
+    league, season_year = key.league, key.season_year
+
+    return update_season_player_totals(league=league, season_year=season_year)
+
+def calc_player_averages(totals):
+    '''
+        Return per game averages and shooting percentages
+
+        Returns
+        -------
+        Result data frame indexed by PERSON_ID
+
+        TEAM_ID, PLAYER_NAME, GAMES, MIN, PTS, REB, AST, TOV, FG_PCT, FG3_PCT, FT_PCT
+    '''
+
+    games = totals.GAMES.replace(0, np.nan)
+
+    averages = totals[PLAYER_INFO_COLUMNS + ['GAMES']].copy()
+    averages['MIN'] = totals.SECONDS / 60 / games
+
+    for column in ['PTS', 'REB', 'AST', 'TOV']:
+        averages[column] = totals[column] / games
+
+    averages['FG_PCT'] = totals.FGM / totals.FGA.replace(0, np.nan)
+    averages['FG3_PCT'] = totals.FG3M / totals.FG3A.replace(0, np.nan)
+    averages['FT_PCT'] = totals.FTM / totals.FTA.replace(0, np.nan)
+
+    return averages.sort_values(by='PTS', ascending=False)
@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+
+from utils.params import GAME_TIME
+from utils.events import calc_elapsed_seconds, fill_scores, is_final
+from utils.games import fetch_play_by_play
+from utils.store import save_table, load_table, list_table_keys
+from utils.keys import keyed_cache
+
+POSSESSION_COLUMNS = [
+    'GAME_ID', 'POSSESSION', 'PERIOD', 'TEAM_ID', 'OPP_TEAM_ID',
+    'START', 'END', 'SECONDS', 'PTS', 'OUTCOME'
+]
+
+# events that end the possession
+OUTCOME_FIELD_GOAL = 'Field Goal'
+OUTCOME_FREE_THROWS = 'Free Throws'
+OUTCOME_TURNOVER = 'Turnover'
+OUTCOME_DEFENSIVE_REBOUND = 'Defensive Rebound'
+OUTCOME_PERIOD_END = 'End of Period'
+
+
+def define_possession_ends(play_by_play, elapsed):
+    '''
+        Return flags of the events that end the possession and the possession outcome for them
+
+        Possession ends with:
+        made field goal (made shot with the and-one free throw ends with the free throw),
+        made last free throw of the trip, turnover, defensive rebound, end of the period
+
+        Returns
+        -------
+        Result tuple: (boolean array, outcome array with None for other events, offensive team id array)
+    '''
+
+    action_type = play_by_play.actionType
+    sub_type = play_by_play.subType.fillna('')
+    description = play_by_play.description.fillna('')
+    team_id = play_by_play.teamId
+    period = play_by_play.period
+
+    is_made_shot = action_type == 'Made Shot'
+    is_free_throw = action_type == 'Free Throw'
+    is_turnover = (action_type == 'Turnover') & (team_id != 0)
+    is_period_end = (action_type == 'period') & (sub_type == 'end')
+
+    # free throw number: Free Throw 1 of 2, technical free throws don't have it
+    free_throw_number = sub_type.str.extract(r'(\d) of (\d)').astype(float)
+    is_last_free_throw = is_free_throw & (free_throw_number[0] == free_throw_number[1])
+    is_made_free_throw = is_last_free_throw & ~description.str.startswith('MISS')
+
+    # and-one: free throw of the same team at the same time after the made shot
+    free_throws = pd.MultiIndex.from_arrays([period[is_free_throw], elapsed[is_free_throw.to_numpy()], team_id[is_free_throw]])
+    is_and_one = is_made_shot & pd.MultiIndex.from_arrays([period, elapsed, team_id]).isin(free_throws)
+
+    # rebound is defensive when the last shot of the period was taken by the other team
+    is_shot = action_type.isin(['Made Shot', 'Missed Shot', 'Free Throw'])
+    shooting_team = team_id.where(is_shot).groupby(period).ffill()
+    is_defensive_rebound = (
+        (action_type == 'Rebound') & (team_id != 0)
+        & shooting_team.notna() & (team_id != shooting_team)
+    )
+
+    conditions = [
+        (is_made_shot & ~is_and_one).to_numpy(),
+        is_made_free_throw.to_numpy(),
+        is_turnover.to_numpy(),
+        is_defensive_rebound.to_numpy(),
+        is_period_end.to_numpy()
+    ]
+    outcomes = np.select(
+        conditions,
+        [OUTCOME_FIELD_GOAL, OUTCOME_FREE_THROWS, OUTCOME_TURNOVER, OUTCOME_DEFENSIVE_REBOUND, OUTCOME_PERIOD_END],
+        default=None
+    )
+
+    # team with the ball: team of the shot, free throw or turnover
+    offensive_team = team_id.where(is_shot | is_turnover).to_numpy()
+
+    return np.logical_or.reduce(conditions), outcomes, offensive_team
+
+def build_possessions(play_by_play, league):
+    '''
+        Return possessions of the game
+
+        Parameters
+        ----------
+        play_by_play
+            raw PlayByPlayV3 play_by_play dataset
+        league
+            league code
+
+        Returns
+        -------
+        Result data frame, one row for each possession
+
+        GAME_ID, POSSESSION, PERIOD, TEAM_ID, OPP_TEAM_ID,
+        START, END, SECONDS - seconds from the start of the game,
+        PTS - points scored by the team during the possession,
+        OUTCOME - event that ended the possession
+    '''
+
+    play_by_play = play_by_play.sort_values(by='actionNumber', ignore_index=True)
+    play_by_play['teamId'] = play_by_play.teamId.fillna(0).astype('int64')
+
+    elapsed = calc_elapsed_seconds(period=play_by_play.period, clock=play_by_play.clock, league=league)
+    is_end, outcomes, offensive_team = define_possession_ends(play_by_play, elapsed)
+
+    events = pd.DataFrame({
+        # event after the possession end starts the next possession
+        'POSSESSION': np.concatenate([[0], np.cumsum(is_end)[:-1]]),
+        'PERIOD': play_by_play.period.to_numpy(),
+        'ELAPSED': elapsed,
+        'TEAM_ID': offensive_team,
+        'OUTCOME': outcomes
+    })
+    events['HOME_SCORE'], events['ROAD_SCORE'] = fill_scores(play_by_play)
+
+    possessions = events.groupby('POSSESSION').agg(
+        PERIOD=('PERIOD', 'first'),
+        PERIOD_START=('ELAPSED', 'first'),
+        END=('ELAPSED', 'last'),
+        TEAM_ID=('TEAM_ID', 'last'),
+        OUTCOME=('OUTCOME', 'last'),
+        HOME_SCORE=('HOME_SCORE', 'last'),
+        ROAD_SCORE=('ROAD_SCORE', 'last')
+    )
+
+    teams = play_by_play.loc[play_by_play.teamId != 0, ['teamId', 'location']].drop_duplicates(subset='teamId')
+    home_team = int(teams.loc[teams.location == 'h', 'teamId'].iloc[0])
+    road_team = int(teams.loc[teams.location == 'v', 'teamId'].iloc[0])
+
+    # possession without shots and turnovers (the clock ran out) belongs to the opponent of the previous possession
+    previous_team = possessions.TEAM_ID.groupby(possessions.PERIOD).shift()
+    possessions['TEAM_ID'] = possessions.TEAM_ID.fillna(
+        previous_team.map({home_team: road_team, road_team: home_team})
+    )
+
+    # possession starts when the previous possession of the period ends
+    possessions['START'] = possessions.END.groupby(possessions.PERIOD).shift().fillna(possessions.PERIOD_START).astype(int)
+    possessions['SECONDS'] = possessions.END - possessions.START
+
+    # points scored during the possession by the team with the ball
+    home_points = possessions.HOME_SCORE.diff().fillna(possessions.HOME_SCORE)
+    road_points = possessions.ROAD_SCORE.diff().fillna(possessions.ROAD_SCORE)
+    possessions['PTS'] = np.where(possessions.TEAM_ID == home_team, home_points, road_points).astype(int)
+
+    # empty possessions: events after the last possession of the period ended at the buzzer
+    possessions = possessions[possessions.TEAM_ID.notna() & ((possessions.SECONDS > 0) | (possessions.OUTCOME != OUTCOME_PERIOD_END))]
+
+    possessions = possessions.assign(
+        GAME_ID=play_by_play.gameId.iloc[0],
+        POSSESSION=np.arange(1, len(possessions) + 1),
+        TEAM_ID=possessions.TEAM_ID.astype('int64'),
+        OPP_TEAM_ID=np.where(possessions.TEAM_ID == home_team, road_team, home_team)
+    )
+
+    return possessions[POSSESSION_COLUMNS].reset_index(drop=True)
+
+def get_game_possessions(league, season_year, game_id):
+    '''
+        Return possessions of the game, see build_possessions()
+
+        Possessions of finished games are saved to the local data store and calculated only once
+    '''
+
+    possessions = load_table(name='possessions', league=league, season_year=season_year, key=game_id)
+
+    if possessions is None:
+        play_by_play = fetch_play_by_play(league=league, season_year=season_year, game_id=game_id)
+        possessions = build_possessions(play_by_play, league=league)
+
+        if is_final(play_by_play):
+            save_table(possessions, name='possessions', league=league, season_year=season_year, key=game_id)
+
+    return possessions
+
+def build_season_possessions(league, season_year):
+    '''
+        Return possessions of all games of the season saved in the local data store
+
+        Games without saved possessions are segmented and saved, see get_game_possessions()
+    '''
+
+    game_ids = list_table_keys(name='play_by_play', league=league, season_year=season_year)
+
+    if len(game_ids) == 0:
+        return pd.DataFrame(columns=POSSESSION_COLUMNS)
+
+    possessions = pd.concat(
+        [get_game_possessions(league=league, season_year=season_year, game_id=game_id) for game_id in game_ids],
+        ignore_index=True
+    )
+
+    print(f'Possessions built successfully: {len(possessions)} possessions in {len(game_ids)} games')
+
+    return possessions
+
+@keyed_cache(show_spinner='Calculating possessions...')
+def get_season_possessions(key):
+    '''
+        Return possessions of all games of the season saved in the local data store, see build_season_possessions()
+    '''
+
+    league, season_year = key.league, key.season_year
+
+    return build_season_possessions(league=league, season_year=season_year)
+
+def aggregate_team_possessions(possessions, league):
+    '''
+        Return pace and efficiency of each team
+
+        Returns
+        -------
+        Result data frame
+
+        TEAM_ID, GAMES, POSSESSIONS, PTS,
+        PPP - points per possession,
+        PACE - possessions per regulation game (48 minutes for NBA, 40 minutes for WNBA)
+    '''
+
+    regulation_seconds = 4 * GAME_TIME[league]['period'] * 60
+
+    # game length includes overtimes
+    game_seconds = possessions.groupby('GAME_ID').END.max()
+
+    teams = possessions.groupby('TEAM_ID').agg(
+        GAMES=('GAME_ID', 'nunique'),
+        POSSESSIONS=('POSSESSION', 'size'),
+        PTS=('PTS', 'sum')
+    )
+    team_games = possessions[['TEAM_ID', 'GAME_ID']].drop_duplicates()
+    teams['SECONDS'] = team_games.GAME_ID.map(game_seconds).groupby(team_games.TEAM_ID).sum()
+
+    teams['PPP'] = teams.PTS / teams.POSSESSIONS
+    teams['PACE'] = teams.POSSESSIONS / teams.SECONDS * regulation_seconds
+
+    return teams.drop(columns='SECONDS').reset_index()
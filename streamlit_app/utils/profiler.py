@@ -0,0 +1,252 @@
+import streamlit as st
+
+import collections
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from utils.store import save_profile
+
+# reruns are profiled for the sessions opened with `?profile` query parameter,
+# PROFILE_RERUNS=1 streamlit run app.py - for all sessions
+PROFILE_ALL_RERUNS = os.environ.get('PROFILE_RERUNS') == '1'
+
+# latency budget of the rerun for each page in seconds
+RERUN_BUDGET = {
+    'League': 1.5,
+    'Team': 1.0,
+    'Game': 1.5
+}
+DEFAULT_RERUN_BUDGET = 1.0
+
+# latency budget of one call for each kind of span in seconds, see profiled()
+SPAN_BUDGET = {
+    'data': 0.5,
+    'graph': 0.3
+}
+
+# interval of the stack samples of the rerun thread in seconds
+SAMPLE_INTERVAL = 0.005
+
+
+class Span:
+    '''
+        Timed call inside the rerun: name, kind (page, data, graph), detail (for example cache key) and nested calls
+    '''
+
+    def __init__(self, name, kind, detail=None):
+        self.name = name
+        self.kind = kind
+        self.detail = detail
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    @property
+    def seconds(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def budget(self):
+        if self.kind == 'page':
+            return RERUN_BUDGET.get(self.name, DEFAULT_RERUN_BUDGET)
+
+        return SPAN_BUDGET.get(self.kind)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.seconds > self.budget
+
+    def to_rows(self, depth=0):
+        '''
+            Return the span and its nested spans as rows in the call order
+
+            Returns
+            -------
+            Result list of dicts
+
+            NAME (indented by depth), KIND, DETAIL, SECONDS, BUDGET, OVER_BUDGET
+        '''
+
+        rows = [{
+            'NAME': '  ' * depth + self.name,
+            'KIND': self.kind,
+            'DETAIL': self.detail,
+            'SECONDS': round(self.seconds, 4),
+            'BUDGET': self.budget,
+            'OVER_BUDGET': self.over_budget
+        }]
+
+        for child in self.children:
+            rows.extend(child.to_rows(depth + 1))
+
+        return rows
+
+
+class StackSampler:
+    '''
+        Samples call stacks of one thread in the background
+
+        Samples are counted by stack in the collapsed format: `file:function;file:function`,
+        so the profile can be viewed as a flame graph (flamegraph.pl, speedscope)
+    '''
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = collections.Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+
+            stack = []
+            while frame is not None:
+                stack.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+                frame = frame.f_back
+
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common())
+
+
+# spans of the rerun that is profiled in the current thread
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def span(name, kind, detail=None):
+    '''
+        Context manager: record the call as a span of the profiled rerun, does nothing if the rerun isn't profiled
+    '''
+
+    stack = getattr(_local, 'stack', None)
+
+    if not stack:
+        yield
+        return
+
+    current = Span(name, kind, detail)
+    stack[-1].children.append(current)
+    stack.append(current)
+
+    try:
+        yield
+    finally:
+        current.end = time.perf_counter()
+        stack.pop()
+
+def profiled(kind):
+    '''
+        Decorator: record each call of the function as a span, see span()
+    '''
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(function.__name__, kind):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+def find_trigger(state, previous_state):
+    '''
+        Return keys of the session state values that were changed since the previous rerun,
+        for the widget's rerun it is the widget's key
+    '''
+
+    changed = []
+
+    for key, value in state.items():
+        try:
+            if key not in previous_state or bool(previous_state[key] != value):
+                changed.append(key)
+        except (TypeError, ValueError):
+            # values that can't be compared, for example arrays
+            continue
+
+    return changed
+
+def read_state():
+    '''
+        Return copy of the session state without the profiler's own values
+    '''
+
+    return {key: value for key, value in st.session_state.items() if not key.startswith('last_rerun_')}
+
+def is_profiled():
+    '''
+        Return True if the reruns of the current session are profiled
+    '''
+
+    return PROFILE_ALL_RERUNS or 'profile' in st.query_params
+
+@contextlib.contextmanager
+def profile_rerun(page):
+    '''
+        Context manager: profile the rerun of the page
+
+        Data and graph calls are recorded as the span tree, the stack of the rerun thread is sampled.
+        The profile is saved to the session state (see get_last_profile()), if the rerun exceeds
+        its budget, the span tree and the sampled stacks are saved to the local data store
+
+        Parameters
+        ----------
+        page
+            page title, see RERUN_BUDGET
+    '''
+
+    if not is_profiled():
+        yield
+        return
+
+    root = Span(page, 'page', detail=', '.join(find_trigger(read_state(), st.session_state.get('last_rerun_state', {}))) or None)
+    _local.stack = [root]
+
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+
+    try:
+        yield
+    finally:
+        root.end = time.perf_counter()
+        _local.stack = None
+        sampler.stop()
+
+        # state at the end of the rerun has the values of all widgets of the page
+        st.session_state.last_rerun_state = read_state()
+        st.session_state.last_rerun_profile = root.to_rows()
+
+        if root.over_budget:
+            name = f'{datetime.now():%Y%m%d-%H%M%S-%f}-{page.lower()}'
+            save_profile(sampler.collapsed(), name=name + '.folded')
+            save_profile(
+                '\n'.join(f'{row["NAME"]}\t{row["KIND"]}\t{row["DETAIL"] or ""}\t{row["SECONDS"]:.4f}' for row in root.to_rows()),
+                name=name + '.spans.tsv'
+            )
+
+            print(f'Slow rerun: {page} {root.seconds:.2f} s, budget {root.budget:.2f} s, profile is saved: {name}')
+
+def get_last_profile():
+    '''
+        Return span rows of the last profiled rerun of the session or None, see Span.to_rows()
+    '''
+
+    return st.session_state.get('last_rerun_profile')
@@ -0,0 +1,119 @@
+from utils.games import one_team_game_set
+from utils.season import SeasonTypeCode
+from utils.store import save_table, load_table
+from utils.dates import index_by_date
+from utils.keys import keyed_cache
+
+RATING_COLUMNS = ['CUME_OFF_RATING', 'CUME_DEF_RATING', 'CUME_NET_RATING']
+
+
+def compute_cumulative_team_ratings(game_set):
+    '''
+        Return cumulative offensive, defensive and net ratings for each team after every game
+
+        Ratings are points per 100 possessions, possessions are estimated as FGA + 0.44 * FTA - OREB + TOV.
+        All teams are calculated at once with grouped cumulative sums
+
+        Parameters
+        ----------
+        game_set
+            league game log, result of the one_team_game_set() function for all teams
+
+        Returns
+        -------
+        Result data frame
+
+        GAME_DATE, GAME_ID, TEAM_ID, TEAM_ABBREVIATION, GAME_NUM,
+        CUME_OFF_RATING, CUME_DEF_RATING, CUME_NET_RATING
+    '''
+
+    games = game_set[['GAME_DATE', 'GAME_ID', 'TEAM_ID', 'TEAM_ABBREVIATION', 'PTS', 'FGA', 'FTA', 'OREB', 'TOV']].copy()
+    games['POSS'] = games.FGA + 0.44 * games.FTA - games.OREB + games.TOV
+
+    # join opponent's points and possessions for the same game
+    opponent = games[['GAME_ID', 'TEAM_ID', 'PTS', 'POSS']].rename(
+        columns={'TEAM_ID': 'OPP_TEAM_ID', 'PTS': 'OPP_PTS', 'POSS': 'OPP_POSS'}
+    )
+    games = games.merge(opponent, on='GAME_ID')
+    games = games[games.TEAM_ID != games.OPP_TEAM_ID]
+
+    # cumulative totals for each team in the game date order
+    games = games.sort_values(by=['GAME_DATE', 'GAME_ID'], ignore_index=True)
+    cume = games.groupby('TEAM_ID')[['PTS', 'POSS', 'OPP_PTS', 'OPP_POSS']].cumsum()
+
+    games['GAME_NUM'] = games.groupby('TEAM_ID').cumcount() + 1
+    games['CUME_OFF_RATING'] = 100 * cume.PTS / cume.POSS
+    games['CUME_DEF_RATING'] = 100 * cume.OPP_PTS / cume.OPP_POSS
+    games['CUME_NET_RATING'] = games.CUME_OFF_RATING - games.CUME_DEF_RATING
+
+    return games[['GAME_DATE', 'GAME_ID', 'TEAM_ID', 'TEAM_ABBREVIATION', 'GAME_NUM'] + RATING_COLUMNS]
+
+def build_rating_frames(ratings):
+    '''
+        Return ratings of every team for each game date of the season
+
+        Teams that didn't play on the date keep the rating after their previous game,
+        so every date is a complete frame for the animated chart
+
+        Parameters
+        ----------
+        ratings
+            result of the compute_cumulative_team_ratings() function
+
+        Returns
+        -------
+        Result data frame
+
+        GAME_DATE, TEAM_ID, TEAM_ABBREVIATION, GAME_NUM,
+        CUME_OFF_RATING, CUME_DEF_RATING, CUME_NET_RATING
+    '''
+
+    # date x team table filled forward with the last known values
+    wide = ratings.pivot_table(
+        index='GAME_DATE', columns='TEAM_ID',
+        values=['GAME_NUM'] + RATING_COLUMNS,
+        aggfunc='last'
+    ).sort_index().ffill()
+
+    frames = wide.stack(future_stack=True).dropna().reset_index()
+    frames['GAME_NUM'] = frames.GAME_NUM.astype(int)
+
+    # add abbreviations back
+    abbreviations = ratings.drop_duplicates(subset='TEAM_ID').set_index('TEAM_ID').TEAM_ABBREVIATION
+    frames['TEAM_ABBREVIATION'] = frames.TEAM_ID.map(abbreviations)
+
+    return frames[['GAME_DATE', 'TEAM_ID', 'TEAM_ABBREVIATION', 'GAME_NUM'] + RATING_COLUMNS]
+
+@keyed_cache(show_spinner='Calculating team ratings...')
+def get_team_rating_frames(key):
+    '''
+        Return precomputed frames of cumulative team ratings for the season
+
+        Frames are saved to the local data store and recalculated only
+        when the game log has games after the last saved game date
+
+        Parameters
+        ----------
+        league
+        season_year
+
+        Returns
+        -------
+        Result data frame sorted by GAME_DAY, see build_rating_frames()
+    '''
+
+    league, season_year = key.league, key.season_year
+
+    game_set = one_team_game_set(key)
+
+    # exhibition games are not included in ratings
+    game_set = game_set[~game_set.SEASON_CODE.isin([SeasonTypeCode.PRE_SEASON.value, SeasonTypeCode.ALL_STAR.value])]
+
+    frames = load_table(name='team_rating_frames', league=league, season_year=season_year)
+
+    if frames is None or len(frames) == 0 or frames.GAME_DATE.max() < game_set.GAME_DATE.max():
+        frames = build_rating_frames(compute_cumulative_team_ratings(game_set))
+        save_table(frames, name='team_rating_frames', league=league, season_year=season_year)
+
+    # sorted by date for the date range filter
+    return index_by_date(frames)
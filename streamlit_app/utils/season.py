@@ -42,4 +42,27 @@ SEASON_YEAR = {
         WnbaSeason.current_season : WnbaSeason.current_season,
         WnbaSeason.previous_season : WnbaSeason.previous_season
     }
-}
\ No newline at end of file
+}
+
+def define_season_year(league, season_id):
+    '''
+        Return season year in the NBA API format from the season id
+
+        Season id is the season type code followed by the year the season starts, for example 22024:
+            NBA - 2024-25
+            WNBA - 2024
+    '''
+
+    year = int(str(season_id)[-4:])
+
+    if league == LeagueCode.WNBA.value:
+        return str(year)
+    else:
+        return f'{year}-{str(year + 1)[-2:]}'
+
+def define_previous_season_year(league, season_year):
+    '''
+        Return the previous season year in the NBA API format: 2024-25 -> 2023-24, 2024 -> 2023
+    '''
+
+    return define_season_year(league=league, season_id=int(str(season_year)[:4]) - 1)
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from utils.league import LeagueCode
+from utils.season import SEASON_YEAR
+from utils.games import one_team_game_set, get_play_by_play_data
+from utils.teams import get_team_rating, get_league_rosters
+from utils.keys import season_key, game_key
+from utils.transport import TransportError
+
+# run from the streamlit_app folder: python -m utils.service --port 8502
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+# parameters are parts of the local data store paths, see utils.store.table_path()
+GAME_ID_PATTERN = re.compile(r'\d{10}')
+
+
+class RequestError(Exception):
+    '''
+        Request can't be served, message is returned to the client with the status code
+    '''
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def filter_team(df, column, team_id):
+    '''
+        Return rows of the team or all rows if team id isn't set
+    '''
+
+    if team_id is None:
+        return df
+
+    if not team_id.isdigit():
+        raise RequestError(400, f'Invalid team_id: {team_id}')
+
+    return df[df[column] == int(team_id)]
+
+def load_seasons(league):
+    return pd.DataFrame({'SEASON_YEAR': list(SEASON_YEAR[league])})
+
+def load_games(league, season, team_id=None):
+    # one cached game log per season is shared by all teams' requests
+    return filter_team(one_team_game_set(season_key(league, season)), 'TEAM_ID', team_id)
+
+def load_play_by_play(league, season, game_id):
+    # same cached events as the Game page: parsed scores, period time and statistics columns
+    play_by_play = get_play_by_play_data(game_key(league, season, game_id))
+
+    if len(play_by_play) == 0:
+        raise RequestError(404, f'Game {game_id} has no play-by-play events')
+
+    return play_by_play
+
+def load_ratings(league, season):
+    return get_team_rating(season_key(league, season))
+
+def load_rosters(league, season, team_id=None):
+    roster, _ = get_league_rosters(season_key(league, season))
+    return filter_team(roster, 'TeamID', team_id)
+
+def load_coaches(league, season, team_id=None):
+    _, coaches = get_league_rosters(season_key(league, season))
+    return filter_team(coaches, 'TEAM_ID', team_id)
+
+# path: (loader, required parameters, optional parameters)
+RESOURCES = {
+    '/seasons': (load_seasons, [], []),
+    '/games': (load_games, ['season'], ['team_id']),
+    '/play-by-play': (load_play_by_play, ['season', 'game_id'], []),
+    '/ratings': (load_ratings, ['season'], []),
+    '/rosters': (load_rosters, ['season'], ['team_id']),
+    '/coaches': (load_coaches, ['season'], ['team_id'])
+}
+
+
+def parse_page(query):
+    '''
+        Return offset and limit of the page from the query parameters
+    '''
+
+    try:
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise RequestError(400, 'offset and limit should be integers')
+
+    if offset < 0 or limit < 1 or limit > MAX_PAGE_SIZE:
+        raise RequestError(400, f'offset should be >= 0, limit should be from 1 to {MAX_PAGE_SIZE}')
+
+    return offset, limit
+
+def select_columns(df, query):
+    '''
+        Return data frame with the columns from the `columns` query parameter (comma separated) or all columns
+    '''
+
+    if 'columns' not in query:
+        return df
+
+    columns = [column for column in query['columns'].split(',') if column]
+    unknown_columns = [column for column in columns if column not in df.columns]
+
+    if unknown_columns:
+        raise RequestError(400, f'Unknown columns: {", ".join(unknown_columns)}. Available columns: {", ".join(df.columns)}')
+
+    return df[columns]
+
+def validate_parameters(league, parameters):
+    '''
+        Raise RequestError if the season isn't a season of the league or the game id isn't a 10 digit id
+    '''
+
+    if 'season' in parameters and parameters['season'] not in SEASON_YEAR[league]:
+        raise RequestError(400, f'Unknown season: {parameters["season"]}. Available seasons: {", ".join(SEASON_YEAR[league])}')
+
+    if 'game_id' in parameters and not GAME_ID_PATTERN.fullmatch(parameters['game_id']):
+        raise RequestError(400, f'Invalid game_id: {parameters["game_id"]}, expected 10 digits: 0022400001')
+
+def handle_request(path, query):
+    '''
+        Return response payload for the resource
+
+        Parameters
+        ----------
+        path
+            resource path, see RESOURCES
+        query
+            dict of query parameters: league (NBA by default), resource parameters,
+            columns - comma separated list of columns, offset and limit - page of rows
+
+        Returns
+        -------
+        Result dict
+
+        resource, total, offset, limit, next_offset (None for the last page), columns, data - list of rows
+    '''
+
+    if path == '/':
+        return {'resources': {name: required + optional for name, (_, required, optional) in RESOURCES.items()}}
+
+    if path not in RESOURCES:
+        raise RequestError(404, f'Unknown resource: {path}')
+
+    loader, required, optional = RESOURCES[path]
+
+    missing = [parameter for parameter in required if not query.get(parameter)]
+    if missing:
+        raise RequestError(400, f'Missing parameters: {", ".join(missing)}')
+
+    league = query.get('league', LeagueCode.NBA.value)
+    if league not in SEASON_YEAR:
+        raise RequestError(400, f'Unknown league: {league}')
+
+    offset, limit = parse_page(query)
+
+    parameters = {parameter: query[parameter] for parameter in required + optional if parameter in query}
+    validate_parameters(league, parameters)
+
+    try:
+        df = loader(league=league, **parameters)
+    except TransportError as error:
+        raise RequestError(502, str(error))
+
+    df = select_columns(df, query)
+    page = df.iloc[offset:offset + limit]
+
+    return {
+        'resource': path,
+        'total': len(df),
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if offset + limit < len(df) else None,
+        'columns': list(df.columns),
+        # data frame's json keeps dates and missing values json compatible
+        'data': json.loads(page.to_json(orient='records', date_format='iso'))
+    }
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    '''
+        Serves GET requests with JSON responses
+
+        Response has ETag (hash of the body): client that sends it back in If-None-Match
+        gets 304 Not Modified without the body while the data is the same
+    '''
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        try:
+            status, payload = 200, handle_request(url.path.rstrip('/') or '/', query)
+        except RequestError as error:
+            status, payload = error.status, {'error': error.message}
+        except Exception as error:
+            # the client gets the error response instead of the closed connection
+            print(f'Request {self.path} failed: {error!r}')
+            status, payload = 500, {'error': 'Internal server error'}
+
+        body = json.dumps(payload).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        if status == 200 and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+            # clients should revalidate: the data is refreshed by the cache ttl
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run_service(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    '''
+        Run the service until it is interrupted
+
+        Requests are served in threads, so concurrent requests for the same data share the cached
+        functions, the local data store and one NBA API call (see utils.transport)
+    '''
+
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    print(f'Data service is running on http://{host}:{port}')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve app data as JSON over HTTP')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='host to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    args = parser.parse_args()
+
+    run_service(host=args.host, port=args.port)
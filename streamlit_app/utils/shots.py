@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+from utils.store import save_table, load_table, list_table_keys
+from utils.keys import keyed_cache
+
+# shot coordinates (xLegacy, yLegacy) are in tenths of feet with the basket at (0, 0)
+# size of the hexagon (center to corner) in the same units
+HEX_SIZE = 15
+
+SHOT_BIN_KEYS = ['TEAM_ID', 'PERSON_ID', 'OPP_TEAM_ID', 'ZONE', 'HEX_Q', 'HEX_R']
+SHOT_BIN_COLUMNS = SHOT_BIN_KEYS + ['FGA', 'FGM']
+
+# play-by-play columns of build_shot_bins(), saved games are converted with these columns only
+SHOT_EVENT_COLUMNS = ['teamId', 'personId', 'actionType', 'description', 'xLegacy', 'yLegacy']
+
+# court zones
+ZONE_RESTRICTED_AREA = 'Restricted Area'
+ZONE_PAINT = 'In The Paint (Non-RA)'
+ZONE_MID_RANGE = 'Mid-Range'
+ZONE_CORNER_3 = 'Corner 3'
+ZONE_ABOVE_THE_BREAK_3 = 'Above the Break 3'
+
+
+def calc_hex_bins(x, y, size=HEX_SIZE):
+    '''
+        Return axial coordinates (q, r) of the pointy-top hexagon that contains each point
+
+        Returns
+        -------
+        Result tuple of integer arrays: (q, r)
+    '''
+
+    q = (np.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+
+    # round cube coordinates and fix the component with the largest rounding error
+    cube = np.stack([q, -q - r, r])
+    rounded = np.round(cube)
+    error = np.abs(rounded - cube)
+
+    fix_q = (error[0] > error[1]) & (error[0] > error[2])
+    fix_r = ~fix_q & (error[2] > error[1])
+
+    hex_q = np.where(fix_q, -rounded[1] - rounded[2], rounded[0])
+    hex_r = np.where(fix_r, -rounded[0] - rounded[1], rounded[2])
+
+    return hex_q.astype(int), hex_r.astype(int)
+
+def calc_hex_centers(hex_q, hex_r, size=HEX_SIZE):
+    '''
+        Return court coordinates (x, y) of the hexagon centers
+    '''
+
+    x = size * np.sqrt(3) * (hex_q + hex_r / 2)
+    y = size * 3 / 2 * hex_r
+
+    return x, y
+
+def define_shot_zones(x, y, is_three):
+    '''
+        Return court zone of each shot
+    '''
+
+    distance = np.hypot(x, y)
+
+    return np.select(
+        [
+            is_three & (np.abs(x) >= 220) & (y <= 92.5),
+            is_three,
+            distance <= 40,
+            (np.abs(x) <= 80) & (y <= 137.5)
+        ],
+        [ZONE_CORNER_3, ZONE_ABOVE_THE_BREAK_3, ZONE_RESTRICTED_AREA, ZONE_PAINT],
+        default=ZONE_MID_RANGE
+    )
+
+def build_shot_bins(play_by_play):
+    '''
+        Return made and attempted field goals of the game aggregated into hexagon bins and zones
+
+        Parameters
+        ----------
+        play_by_play
+            raw PlayByPlayV3 play_by_play dataset
+
+        Returns
+        -------
+        Result data frame
+
+        TEAM_ID, PERSON_ID, OPP_TEAM_ID, ZONE, HEX_Q, HEX_R, FGA, FGM
+    '''
+
+    shots = play_by_play[
+        play_by_play.actionType.isin(['Made Shot', 'Missed Shot'])
+        & play_by_play.xLegacy.notna() & play_by_play.yLegacy.notna()
+    ]
+
+    team_ids = play_by_play.loc[play_by_play.teamId != 0, 'teamId'].unique()
+    opponents = {team_ids[0]: team_ids[1], team_ids[1]: team_ids[0]}
+
+    x = shots.xLegacy.to_numpy(dtype=float)
+    y = shots.yLegacy.to_numpy(dtype=float)
+    hex_q, hex_r = calc_hex_bins(x, y)
+
+    bins = pd.DataFrame({
+        'TEAM_ID': shots.teamId.to_numpy(),
+        'PERSON_ID': shots.personId.to_numpy(),
+        'OPP_TEAM_ID': shots.teamId.map(opponents).to_numpy(),
+        'ZONE': define_shot_zones(x, y, shots.description.str.contains('3PT', regex=False).to_numpy()),
+        'HEX_Q': hex_q,
+        'HEX_R': hex_r,
+        'FGA': 1,
+        'FGM': (shots.actionType == 'Made Shot').astype(int).to_numpy()
+    })
+
+    return bins.groupby(SHOT_BIN_KEYS, as_index=False)[['FGA', 'FGM']].sum()
+
+def update_season_shot_bins(league, season_year):
+    '''
+        Return shot bins of all games of the season saved in the local data store
+
+        Bins are saved to the local data store with the list of processed games,
+        only games that were saved after the last update are added to them
+
+        Returns
+        -------
+        Result data frame, see build_shot_bins()
+    '''
+
+    bins = load_table(name='shot_bins', league=league, season_year=season_year)
+    processed_games = load_table(name='shot_bins_games', league=league, season_year=season_year)
+
+    if bins is None or processed_games is None:
+        bins = pd.DataFrame(columns=SHOT_BIN_COLUMNS).astype({'FGA': int, 'FGM': int})
+        processed_games = pd.DataFrame(columns=['GAME_ID'])
+
+    processed_game_ids = set(processed_games.GAME_ID)
+    game_ids = [
+        game_id
+        for game_id in list_table_keys(name='play_by_play', league=league, season_year=season_year)
+        if game_id not in processed_game_ids
+    ]
+
+    if len(game_ids) == 0:
+        return bins
+
+    new_bins = [
+        build_shot_bins(load_table(
+            name='play_by_play', league=league, season_year=season_year, key=game_id, columns=SHOT_EVENT_COLUMNS
+        ))
+        for game_id in game_ids
+    ]
+
+    # bins of the new games are added to the saved totals
+    bins = pd.concat([bins] + new_bins, ignore_index=True) if len(bins) > 0 else pd.concat(new_bins, ignore_index=True)
+    bins = bins.groupby(SHOT_BIN_KEYS, as_index=False)[['FGA', 'FGM']].sum()
+    processed_games = pd.concat([processed_games, pd.DataFrame({'GAME_ID': game_ids})], ignore_index=True)
+
+    save_table(bins, name='shot_bins', league=league, season_year=season_year)
+    save_table(processed_games, name='shot_bins_games', league=league, season_year=season_year)
+
+    print(f'Shot bins updated successfully: {len(game_ids)} new games, {len(bins)} bins')
+
+    return bins
+
+@keyed_cache(show_spinner='Building shot charts...')
+def get_season_shot_bins(key):
+    '''
+        Return shot bins of the season, see update_season_shot_bins()
+    '''
+
+    league, season_year = key.league, key.season_year
+
+    return update_season_shot_bins(league=league, season_year=season_year)
+
+def summarise_shot_bins(bins, by, team_id=None, person_id=None, opp_team_id=None):
+    '''
+        Return shot bins filtered by team, player and opponent and aggregated
+
+        Parameters
+        ----------
+        bins
+            result of the get_season_shot_bins() function
+        by
+            'HEX' for the hexagon grid or 'ZONE' for the court zones
+        team_id, person_id, opp_team_id
+            filters, None means all values
+
+        Returns
+        -------
+        Result data frame
+
+        HEX_Q, HEX_R, X, Y (for hexagons) or ZONE, FGA, FGM, FG_PCT, FGA_SHARE
+    '''
+
+    for column, value in [('TEAM_ID', team_id), ('PERSON_ID', person_id), ('OPP_TEAM_ID', opp_team_id)]:
+        if value is not None:
+            bins = bins[bins[column] == value]
+
+    keys = ['HEX_Q', 'HEX_R'] if by == 'HEX' else ['ZONE']
+    summary = bins.groupby(keys, as_index=False)[['FGA', 'FGM']].sum()
+
+    summary['FG_PCT'] = summary.FGM / summary.FGA
+    summary['FGA_SHARE'] = summary.FGA / summary.FGA.sum()
+
+    if by == 'HEX':
+        summary['X'], summary['Y'] = calc_hex_centers(summary.HEX_Q.to_numpy(), summary.HEX_R.to_numpy())
+
+    return summary
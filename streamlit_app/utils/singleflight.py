@@ -0,0 +1,94 @@
+import threading
+
+
+class Call:
+    '''
+        In-flight call that is shared by all callers with the same key
+    '''
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    '''
+        Coalesce concurrent calls with the same key into one execution
+
+        The first caller (leader) runs the function, callers that come while it is running
+        wait for the leader and get the same result or the same exception.
+        Calls that come after the leader has finished run the function again
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.metrics = {}
+
+    def do(self, key, group, function, *args, **kwargs):
+        '''
+            Return result of the function, run it only once for concurrent calls with the same key
+
+            Parameters
+            ----------
+            key
+                hashable key of the call
+            group
+                name used to group metrics, for example endpoint name
+            function, args, kwargs
+                function to call
+
+            Returns
+            -------
+            Result of the function
+        '''
+
+        with self.lock:
+            metrics = self.metrics.setdefault(group, {'calls': 0, 'executions': 0, 'coalesced': 0})
+            metrics['calls'] += 1
+
+            call = self.calls.get(key)
+            is_leader = call is None
+
+            if is_leader:
+                call = Call()
+                self.calls[key] = call
+                metrics['executions'] += 1
+            else:
+                metrics['coalesced'] += 1
+
+        if not is_leader:
+            call.done.wait()
+
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+    def stats(self):
+        '''
+            Return copy of the metrics for each group
+
+            calls - all calls
+            executions - calls that ran the function
+            coalesced - calls that waited for the running function and shared its result
+            in_flight - number of functions running now (for all groups)
+        '''
+
+        with self.lock:
+            return {
+                'groups': {group: dict(metrics) for group, metrics in self.metrics.items()},
+                'in_flight': len(self.calls)
+            }
@@ -0,0 +1,113 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+from utils.store import load_response
+from utils.transport import define_parameters_key
+
+# local stand-in for the NBA API: serves the responses saved in the local data store
+# with the same paths and parameters, so the app and load tests don't depend on stats.nba.com
+#
+# run from the streamlit_app folder:
+#   python -m utils.standin --port 8503 --latency 0.2
+#   NBA_STATS_API_URL=http://127.0.0.1:8503 streamlit run app.py
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8503
+
+STATS_PATH = '/stats/'
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    '''
+        Serves GET /stats/{endpoint} with the saved response of the same request,
+        404 if the request wasn't saved
+
+        Latency of the NBA API is emulated with the server's `latency` attribute (seconds)
+    '''
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if not url.path.startswith(STATS_PATH):
+            self.send_body(404, json.dumps({'error': f'Unknown path: {url.path}'}))
+            return
+
+        endpoint_name = url.path[len(STATS_PATH):].strip('/')
+        # empty parameters are sent as `Conference=`, they are a part of the request key
+        request_key = define_parameters_key(endpoint_name, parse_qsl(url.query, keep_blank_values=True))
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        contents = load_response(key=request_key)
+
+        if contents is None:
+            self.send_body(404, json.dumps({'error': f'Response is not saved: {request_key}'}))
+        else:
+            self.send_body(200, contents)
+
+    def send_body(self, status, text):
+        body = text.encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # load tests send thousands of requests, only failed ones are logged
+        if len(args) > 1 and str(args[1]) == '200':
+            return
+
+        super().log_message(format, *args)
+
+
+def start_standin(host=DEFAULT_HOST, port=DEFAULT_PORT, latency=0):
+    '''
+        Start the stand-in in a background thread
+
+        Parameters
+        ----------
+        port
+            port to listen on, 0 for any free port
+        latency
+            delay of each response in seconds
+
+        Returns
+        -------
+        Result tuple: (server, url), server.shutdown() stops it
+    '''
+
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.latency = latency
+    server.daemon_threads = True
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f'http://{host}:{server.server_address[1]}'
+    print(f'NBA API stand-in is running on {url}')
+
+    return server, url
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve saved NBA API responses over HTTP')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='host to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--latency', type=float, default=0, help='delay of each response in seconds')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    server.latency = args.latency
+    print(f'NBA API stand-in is running on http://{args.host}:{args.port}')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
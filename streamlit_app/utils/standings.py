@@ -0,0 +1,269 @@
+import numpy as np
+import pandas as pd
+
+from utils.params import LocationName, OutcomeName
+from utils.league import LeagueCode
+from utils.season import SeasonTypeCode
+from utils.games import one_team_game_set
+from utils.keys import keyed_cache, season_key
+from utils.store import save_table, load_table
+
+EAST = 'East'
+WEST = 'West'
+CONFERENCES = [EAST, WEST]
+
+# conference and division of each team by abbreviation, WNBA has no divisions
+TEAM_CONFERENCE = {
+    LeagueCode.NBA.value : {
+        'BOS': (EAST, 'Atlantic'), 'BKN': (EAST, 'Atlantic'), 'NYK': (EAST, 'Atlantic'), 'PHI': (EAST, 'Atlantic'), 'TOR': (EAST, 'Atlantic'),
+        'CHI': (EAST, 'Central'), 'CLE': (EAST, 'Central'), 'DET': (EAST, 'Central'), 'IND': (EAST, 'Central'), 'MIL': (EAST, 'Central'),
+        'ATL': (EAST, 'Southeast'), 'CHA': (EAST, 'Southeast'), 'MIA': (EAST, 'Southeast'), 'ORL': (EAST, 'Southeast'), 'WAS': (EAST, 'Southeast'),
+        'DEN': (WEST, 'Northwest'), 'MIN': (WEST, 'Northwest'), 'OKC': (WEST, 'Northwest'), 'POR': (WEST, 'Northwest'), 'UTA': (WEST, 'Northwest'),
+        'GSW': (WEST, 'Pacific'), 'LAC': (WEST, 'Pacific'), 'LAL': (WEST, 'Pacific'), 'PHX': (WEST, 'Pacific'), 'SAC': (WEST, 'Pacific'),
+        'DAL': (WEST, 'Southwest'), 'HOU': (WEST, 'Southwest'), 'MEM': (WEST, 'Southwest'), 'NOP': (WEST, 'Southwest'), 'SAS': (WEST, 'Southwest')
+    },
+    LeagueCode.WNBA.value : {
+        'ATL': (EAST, None), 'CHI': (EAST, None), 'CON': (EAST, None), 'IND': (EAST, None), 'NYL': (EAST, None), 'WAS': (EAST, None),
+        'DAL': (WEST, None), 'GSV': (WEST, None), 'LAS': (WEST, None), 'LVA': (WEST, None), 'MIN': (WEST, None), 'PHO': (WEST, None), 'SEA': (WEST, None)
+    }
+}
+
+STANDINGS_COUNT_COLUMNS = ['W', 'L', 'HOME_W', 'HOME_L', 'ROAD_W', 'ROAD_L', 'CONF_W', 'CONF_L', 'DIV_W', 'DIV_L']
+STANDINGS_STATE_COLUMNS = ['TEAM_ABBREVIATION'] + STANDINGS_COUNT_COLUMNS + ['STREAK', 'LAST_GAMES']
+
+STANDINGS_COLUMNS = [
+    'TEAM_ID', 'TEAM_ABBREVIATION', 'CONFERENCE', 'DIVISION', 'CONF_RANK', 'DIV_RANK',
+    'W', 'L', 'WIN_PCT', 'GB', 'HOME', 'ROAD', 'CONF', 'DIV', 'L10', 'STRK'
+]
+
+# number of the last games in the state, enough for the last 10 record
+LAST_GAMES = 10
+
+
+def define_conferences(abbreviations, league):
+    '''
+        Return conference and division of each team, None for unknown teams
+
+        Returns
+        -------
+        Result tuple of series: (conference, division)
+    '''
+
+    conferences = TEAM_CONFERENCE.get(league, {})
+
+    conference = abbreviations.map({team: info[0] for team, info in conferences.items()})
+    division = abbreviations.map({team: info[1] for team, info in conferences.items()})
+
+    return conference, division
+
+def define_final_games(game_set, season_codes=[SeasonTypeCode.REGULAR.value]):
+    '''
+        Return games that are finished
+
+        Game is finished when one of the teams has the win,
+        both teams have losses in the game log while the game is in progress
+
+        Parameters
+        ----------
+        game_set
+            league game log, result of the one_team_game_set() function for all teams
+        season_codes
+            season types of the games, regular season by default
+
+        Returns
+        -------
+        Result data frame, rows of the game log sorted by GAME_DAY and GAME_ID
+    '''
+
+    games = game_set[game_set.SEASON_CODE.isin(season_codes)]
+
+    wins = (games.GAME_OUTCOME == OutcomeName.WIN.value).groupby(games.GAME_ID).transform('sum')
+    games = games[wins == 1]
+
+    return games.sort_values(by=['GAME_DAY', 'GAME_ID'], kind='stable')
+
+def calc_streak(streak, outcomes):
+    '''
+        Return signed streak after the outcomes
+
+        Parameters
+        ----------
+        streak
+            current streak: 3 - three wins in a row, -2 - two losses in a row, 0 - no games
+        outcomes
+            string of the next outcomes in the game order: WWL
+    '''
+
+    for outcome in outcomes:
+        sign = 1 if outcome == 'W' else -1
+        streak = streak + sign if streak * sign > 0 else sign
+
+    return streak
+
+def fold_standings(state, games, league):
+    '''
+        Return standings state with the games applied
+
+        Parameters
+        ----------
+        state
+            previous state indexed by TEAM_ID, None for the empty state
+        games
+            new finished games, result of the define_final_games() function
+        league
+            league code
+
+        Returns
+        -------
+        Result data frame indexed by TEAM_ID
+
+        TEAM_ABBREVIATION, W, L, HOME_W, HOME_L, ROAD_W, ROAD_L, CONF_W, CONF_L, DIV_W, DIV_L,
+        STREAK, LAST_GAMES - string of the last outcomes, the latest game goes last: LWWLW
+    '''
+
+    conference, division = define_conferences(games.TEAM_ABBREVIATION, league)
+    opp_conference, opp_division = define_conferences(games.MATCHUP_TEAM_ABBREVIATION, league)
+
+    is_win = games.GAME_OUTCOME == OutcomeName.WIN.value
+    is_home = games.GAME_LOCATION == LocationName.HOME.value
+    is_conf = conference.notna() & (conference == opp_conference)
+    is_div = division.notna() & (division == opp_division)
+
+    counts = pd.DataFrame({
+        'W': is_win, 'L': ~is_win,
+        'HOME_W': is_home & is_win, 'HOME_L': is_home & ~is_win,
+        'ROAD_W': ~is_home & is_win, 'ROAD_L': ~is_home & ~is_win,
+        'CONF_W': is_conf & is_win, 'CONF_L': is_conf & ~is_win,
+        'DIV_W': is_div & is_win, 'DIV_L': is_div & ~is_win
+    }).astype(int).groupby(games.TEAM_ID).sum()
+
+    # outcomes of each team in the game order
+    outcomes = pd.Series(np.where(is_win, 'W', 'L'), index=games.index).groupby(games.TEAM_ID).agg(''.join)
+
+    if state is None:
+        state = pd.DataFrame(columns=STANDINGS_STATE_COLUMNS).astype(
+            {column: int for column in STANDINGS_COUNT_COLUMNS + ['STREAK']}
+        ).rename_axis('TEAM_ID')
+
+    team_ids = state.index.union(counts.index)
+    state = state.reindex(team_ids)
+    outcomes = outcomes.reindex(team_ids, fill_value='')
+
+    result = state[STANDINGS_COUNT_COLUMNS].fillna(0).add(counts.reindex(team_ids, fill_value=0)).astype(int)
+
+    # abbreviation from the latest game
+    abbreviations = games.drop_duplicates(subset='TEAM_ID', keep='last').set_index('TEAM_ID').TEAM_ABBREVIATION
+    result.insert(0, 'TEAM_ABBREVIATION', abbreviations.reindex(team_ids).fillna(state.TEAM_ABBREVIATION))
+
+    result['STREAK'] = [
+        calc_streak(int(streak), team_outcomes)
+        for streak, team_outcomes in zip(state.STREAK.fillna(0), outcomes)
+    ]
+    result['LAST_GAMES'] = (state.LAST_GAMES.fillna('') + outcomes).str[-LAST_GAMES:]
+
+    return result[STANDINGS_STATE_COLUMNS]
+
+def update_season_standings(league, season_year):
+    '''
+        Return standings state for all finished games of the season
+
+        State is saved to the local data store with the list of applied games,
+        only games that were finished after the last update are applied to it
+
+        Returns
+        -------
+        Result data frame indexed by TEAM_ID, see fold_standings()
+    '''
+
+    final_games = define_final_games(one_team_game_set(season_key(league, season_year)))
+
+    state = load_table(name='standings', league=league, season_year=season_year)
+    processed_games = load_table(name='standings_games', league=league, season_year=season_year)
+
+    if state is None or processed_games is None:
+        state = None
+        processed_games = pd.DataFrame(columns=['GAME_ID'])
+
+    new_games = final_games[~final_games.GAME_ID.isin(processed_games.GAME_ID)]
+
+    if len(new_games) == 0:
+        return state if state is not None else fold_standings(None, new_games, league=league)
+
+    state = fold_standings(state, new_games, league=league)
+    processed_games = pd.concat(
+        [processed_games, pd.DataFrame({'GAME_ID': new_games.GAME_ID.unique()})],
+        ignore_index=True
+    )
+
+    save_table(state, name='standings', league=league, season_year=season_year)
+    save_table(processed_games, name='standings_games', league=league, season_year=season_year)
+
+    print(f'Standings updated successfully: {new_games.GAME_ID.nunique()} new games')
+
+    return state
+
+def format_record(wins, losses):
+    '''
+        Return records as strings: 10-5
+    '''
+
+    return wins.astype(str) + '-' + losses.astype(str)
+
+def build_standings(state, league):
+    '''
+        Return standings table from the standings state
+
+        Teams are ranked by win percentage, ties are kept in the order of wins
+        (NBA tiebreakers like head-to-head record are not applied).
+        Games behind are counted from the conference leader
+
+        Parameters
+        ----------
+        state
+            result of the update_season_standings() function
+        league
+            league code
+
+        Returns
+        -------
+        Result data frame sorted by conference and rank
+
+        TEAM_ID, TEAM_ABBREVIATION, CONFERENCE, DIVISION, CONF_RANK, DIV_RANK,
+        W, L, WIN_PCT, GB, HOME, ROAD, CONF, DIV, L10, STRK
+    '''
+
+    standings = state.reset_index()
+    standings['CONFERENCE'], standings['DIVISION'] = define_conferences(standings.TEAM_ABBREVIATION, league)
+
+    games = standings.W + standings.L
+    standings['WIN_PCT'] = (standings.W / games.replace(0, np.nan)).fillna(0)
+
+    # half a game for each win or loss difference with the leader
+    difference = standings.W - standings.L
+    standings['GB'] = (difference.groupby(standings.CONFERENCE).transform('max') - difference) / 2
+
+    standings = standings.sort_values(by=['CONFERENCE', 'WIN_PCT', 'W'], ascending=[True, False, False], ignore_index=True)
+    standings['CONF_RANK'] = standings.groupby('CONFERENCE').cumcount() + 1
+    standings['DIV_RANK'] = standings.groupby('DIVISION').cumcount() + 1
+
+    standings['HOME'] = format_record(standings.HOME_W, standings.HOME_L)
+    standings['ROAD'] = format_record(standings.ROAD_W, standings.ROAD_L)
+    standings['CONF'] = format_record(standings.CONF_W, standings.CONF_L)
+    standings['DIV'] = format_record(standings.DIV_W, standings.DIV_L)
+    standings['L10'] = format_record(standings.LAST_GAMES.str.count('W'), standings.LAST_GAMES.str.count('L'))
+    standings['STRK'] = [
+        ('W' if streak > 0 else 'L') + str(abs(streak)) if streak != 0 else ''
+        for streak in standings.STREAK
+    ]
+
+    return standings[STANDINGS_COLUMNS]
+
+@keyed_cache(show_spinner='Calculating standings...')
+def get_season_standings(key):
+    '''
+        Return standings of the season, see build_standings()
+    '''
+
+    state = update_season_standings(league=key.league, season_year=key.season_year)
+
+    return build_standings(state, league=key.league)
@@ -0,0 +1,120 @@
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from utils.params import StatisticsTypeCode
+from utils.events import calc_event_flags
+
+# aggregation of the statistic over the game's events
+AGGREGATION_COUNT = 'count'              # running count of the team's events
+AGGREGATION_SCORE = 'score'              # team's score after its scoring events
+AGGREGATION_SCORE_DIFF = 'score_diff'    # home score minus road score after scoring events
+AGGREGATION_MODEL = 'model'              # calculated by its own model, see utils.winprob
+
+
+class Statistic(NamedTuple):
+    '''
+        Statistic of the game's play-by-play events
+
+        column - column of the get_play_by_play_data() result
+        predicate - events of the statistic: function of the event flags (see define_event_flags())
+                    that returns boolean series, None for the model statistics
+        aggregation - AGGREGATION_* value
+        graph - scatter or line, color - column to color the points by
+        y_range, y_format, y_title - y-axis of the graph, y_title can use {home_team} abbreviation
+        reference_line - y value of the dotted line
+    '''
+
+    column: str
+    predicate: Callable = None
+    aggregation: str = AGGREGATION_COUNT
+    graph: str = 'scatter'
+    color: str = 'teamTricode'
+    y_range: list = None
+    y_format: str = None
+    y_title: str = None
+    reference_line: float = None
+
+
+# statistics by StatisticsTypeCode value, a new statistic of the game is registered here once
+STATISTICS = {
+    StatisticsTypeCode.SCORE_DIFF.value: Statistic(
+        column='scoreDiff', predicate=lambda events: events.SCORE,
+        aggregation=AGGREGATION_SCORE_DIFF, color='scoreDiff'
+    ),
+    StatisticsTypeCode.PTS.value: Statistic(
+        column='points', predicate=lambda events: events.SCORE,
+        aggregation=AGGREGATION_SCORE
+    ),
+    StatisticsTypeCode.FG2M.value: Statistic(column='fg2m', predicate=lambda events: events.FGM & ~events.FG3M),
+    StatisticsTypeCode.FG3M.value: Statistic(column='fg3m', predicate=lambda events: events.FG3M),
+    StatisticsTypeCode.REB.value: Statistic(column='rebounds', predicate=lambda events: events.REB),
+    StatisticsTypeCode.AST.value: Statistic(column='assists', predicate=lambda events: events.AST),
+    StatisticsTypeCode.WIN_PROB.value: Statistic(
+        column='winProbability', aggregation=AGGREGATION_MODEL,
+        graph='line', color=None,
+        y_range=[0, 1], y_format='.0%', y_title='{home_team} Win Probability', reference_line=0.5
+    )
+}
+
+
+def define_event_flags(play_by_play):
+    '''
+        Return boolean flags of the events for the statistics' predicates
+
+        Returns
+        -------
+        Result data frame
+
+        EVENT_FLAG_COLUMNS (see calc_event_flags()), SCORE - the score is set for the event
+    '''
+
+    flags = calc_event_flags(play_by_play).astype(bool)
+    flags['SCORE'] = pd.to_numeric(play_by_play.scoreHome, errors='coerce').notna().to_numpy()
+
+    return flags
+
+def calc_statistics(play_by_play, home_team_id, road_team_id):
+    '''
+        Return play-by-play events with the columns of all registered statistics, see STATISTICS
+
+        Event flags are calculated once for all statistics and running counts of all counting
+        statistics are calculated in one pass by team. Values are set only for the events of the statistic
+
+        Parameters
+        ----------
+        play_by_play
+            events with numeric scoreHome and scoreAway, teamId is None for the events without team
+    '''
+
+    events = define_event_flags(play_by_play)
+
+    score_home = pd.to_numeric(play_by_play.scoreHome, errors='coerce')
+    score_away = pd.to_numeric(play_by_play.scoreAway, errors='coerce')
+    team_score = pd.Series(
+        np.select([play_by_play.teamId == home_team_id, play_by_play.teamId == road_team_id], [score_home, score_away], np.nan),
+        index=play_by_play.index
+    )
+
+    counts = {}
+
+    for statistic in STATISTICS.values():
+        if statistic.aggregation == AGGREGATION_MODEL:
+            continue
+
+        is_event = statistic.predicate(events)
+
+        if statistic.aggregation == AGGREGATION_COUNT:
+            counts[statistic.column] = is_event.astype(float).where(is_event)
+        elif statistic.aggregation == AGGREGATION_SCORE:
+            play_by_play[statistic.column] = team_score.where(is_event)
+        elif statistic.aggregation == AGGREGATION_SCORE_DIFF:
+            play_by_play[statistic.column] = (score_home - score_away).where(is_event)
+
+    if counts:
+        # events without team are not counted
+        running_counts = pd.DataFrame(counts, index=play_by_play.index).groupby(play_by_play.teamId).cumsum()
+        play_by_play[list(counts)] = running_counts.reindex(play_by_play.index)
+
+    return play_by_play
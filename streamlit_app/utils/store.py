@@ -0,0 +1,280 @@
+import streamlit as st
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pyarrow as pa
+
+# local data store is located in the app's folder: streamlit_app/data
+# tables are stored as {league}/{season_year}/{name}.arrow or {league}/{season_year}/{name}/{key}.arrow
+DATA_PATH = Path(__file__).resolve().parent.parent / 'data'
+
+# tables are uncompressed Arrow IPC files: they are memory-mapped on load, so all server
+# processes share the same pages of the OS page cache instead of deserializing own copies
+TABLE_SUFFIX = '.arrow'
+
+# mapped tables kept open by each process, replaced files are mapped again by the new mtime
+MAX_MAPPED_TABLES = 4096
+
+# path: mtime of the last mapped table, tables of the replaced files are dropped from the cache
+_mapped_mtimes = {}
+_mapped_lock = threading.Lock()
+
+# raw API responses are stored as responses/{request key}.json
+RESPONSE_FOLDER = 'responses'
+
+
+def table_path(name, league, season_year=None, key=None):
+    '''
+        Return path to the table file in the local data store
+
+        Parameters
+        ----------
+        name
+            table name: roster, coaches, etc.
+        league
+            league code
+        season_year
+            season year, can be None for tables that are not related to the season
+        key
+            key inside the table folder, for example game id
+
+        Returns
+        -------
+        Result path
+    '''
+
+    path = DATA_PATH / league / (season_year or '_')
+
+    if key is None:
+        return path / (name + TABLE_SUFFIX)
+    else:
+        return path / name / (str(key) + TABLE_SUFFIX)
+
+def make_temp_path(path):
+    '''
+        Return path of a new empty temporary file in the folder of the file
+
+        Every write gets its own temporary file: sessions are threads of one process,
+        so concurrent writes of the same file never share it
+    '''
+
+    handle, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    os.close(handle)
+
+    return Path(temp_path)
+
+def save_table(df, name, league, season_year=None, key=None):
+    '''
+        Save data frame to the local data store
+    '''
+
+    path = table_path(name=name, league=league, season_year=season_year, key=key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    table = pa.Table.from_pandas(df)
+
+    # write to the temporary file first, so other processes never read half-written table
+    temp_path = make_temp_path(path)
+    with pa.OSFile(str(temp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+
+@st.cache_resource(max_entries=MAX_MAPPED_TABLES, show_spinner=False)
+def open_mapped_table(path, mtime):
+    '''
+        Return memory-mapped Arrow table of the file
+
+        One table is kept for each path and modification time, so all sessions
+        of the process share it and a replaced file is mapped again
+
+        Parameters
+        ----------
+        path
+            file path as a string
+        mtime
+            file modification time in nanoseconds
+    '''
+
+    # replaced file keeps the old pages mapped until the table is released
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+def map_table(name, league, season_year=None, key=None):
+    '''
+        Return memory-mapped Arrow table from the local data store or None if the table doesn't exist
+
+        Columns are read from the mapped file without copying, pages are loaded by the OS when they are accessed
+    '''
+
+    path = table_path(name=name, league=league, season_year=season_year, key=key)
+
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _mapped_lock:
+        previous_mtime = _mapped_mtimes.get(str(path))
+
+        if previous_mtime is None or mtime > previous_mtime:
+            _mapped_mtimes[str(path)] = mtime
+
+    # the replaced file is unmapped when the sessions release its table
+    if previous_mtime is not None and mtime > previous_mtime:
+        open_mapped_table.clear(str(path), previous_mtime)
+
+    return open_mapped_table(str(path), mtime)
+
+def table_to_frame(table, columns=None):
+    '''
+        Return data frame with the columns of the Arrow table
+
+        Only the selected columns are converted, each column keeps its own block,
+        so numeric columns without nulls can reference the mapped pages instead of being copied
+
+        Parameters
+        ----------
+        table
+            result of the map_table() function
+        columns
+            list of columns to convert, None for all columns
+    '''
+
+    if columns is not None:
+        # index of the saved data frame is stored in its own columns
+        metadata = table.schema.pandas_metadata or {}
+        index_columns = [column for column in metadata.get('index_columns', []) if isinstance(column, str)]
+
+        table = table.select(index_columns + [column for column in columns if column not in index_columns])
+
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+def load_table(name, league, season_year=None, key=None, columns=None):
+    '''
+        Return data frame from the local data store or None if the table doesn't exist, see table_to_frame()
+    '''
+
+    table = map_table(name=name, league=league, season_year=season_year, key=key)
+
+    if table is None:
+        return None
+
+    return table_to_frame(table, columns=columns)
+
+def table_age(name, league, season_year=None, key=None):
+    '''
+        Return number of seconds since the table was saved or None if the table doesn't exist
+    '''
+
+    path = table_path(name=name, league=league, season_year=season_year, key=key)
+
+    if not path.is_file():
+        return None
+
+    return time.time() - path.stat().st_mtime
+
+def list_table_keys(name, league, season_year=None):
+    '''
+        Return sorted list of keys saved for the table
+    '''
+
+    path = DATA_PATH / league / (season_year or '_') / name
+
+    return sorted(file.stem for file in path.glob('*' + TABLE_SUFFIX))
+
+def list_table_seasons(name, league):
+    '''
+        Return sorted list of season years that have keys saved for the table
+    '''
+
+    path = DATA_PATH / league
+
+    return sorted(folder.parent.name for folder in path.glob(f'*/{name}') if any(folder.glob('*' + TABLE_SUFFIX)))
+
+def response_path(key):
+    '''
+        Return path to the raw API response saved in the local data store
+    '''
+
+    return DATA_PATH / RESPONSE_FOLDER / (key + '.json')
+
+def save_response(contents, key):
+    '''
+        Save raw API response text to the local data store
+    '''
+
+    path = response_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    temp_path = make_temp_path(path)
+    temp_path.write_text(contents, encoding='utf-8')
+    os.replace(temp_path, path)
+
+def load_response(key):
+    '''
+        Return raw API response text from the local data store or None if it doesn't exist
+    '''
+
+    path = response_path(key)
+
+    if not path.is_file():
+        return None
+
+    return path.read_text(encoding='utf-8')
+
+def save_profile(contents, name):
+    '''
+        Save profile of the slow rerun to the local data store: streamlit_app/data/profiles/{name}
+    '''
+
+    path = DATA_PATH / 'profiles' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    path.write_text(contents, encoding='utf-8')
+
+def list_files(folder):
+    '''
+        Return sorted list of paths of all files in the folder of the local data store, relative to the store
+
+        Parameters
+        ----------
+        folder
+            folder relative to the store, for example {league}/{season_year}
+    '''
+
+    path = DATA_PATH / folder
+
+    return sorted(
+        file.relative_to(DATA_PATH).as_posix()
+        for file in path.rglob('*')
+        # temporary files of the writes that are not finished
+        if file.is_file() and file.suffix != '.tmp'
+    )
+
+def read_file(relative_path):
+    '''
+        Return file contents (bytes) from the local data store or None if it doesn't exist
+    '''
+
+    path = DATA_PATH / relative_path
+
+    if not path.is_file():
+        return None
+
+    return path.read_bytes()
+
+def save_file(contents, relative_path):
+    '''
+        Save file contents (bytes) to the local data store
+    '''
+
+    path = DATA_PATH / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    temp_path = make_temp_path(path)
+    temp_path.write_bytes(contents)
+    os.replace(temp_path, path)
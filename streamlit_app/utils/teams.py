@@ -1,11 +1,18 @@
 import streamlit as st
 
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
 from nba_api.stats.static import teams
 from nba_api.stats.endpoints import commonteamroster, teamestimatedmetrics
 
 from utils.league import LeagueCode
+from utils.keys import keyed_cache, season_key, team_key
+from utils.store import save_table, load_table, table_age
+from utils.transport import fetch, TransportError
+
+# rosters are re-ingested once a day
+ROSTER_TTL = 24 * 3600
 
 
 # get NBA teams data from nba api
@@ -42,110 +49,218 @@ def get_league_teams(league):
     else:
         print('Unknown league is selected')
 
-# get team's full name based on team id and league
+@keyed_cache()
+def get_team_info(key):
+    '''
+        Return team info dict: id, full_name, abbreviation, nickname, city, state, year_founded
+
+        Parameters
+        ----------
+        key
+            TeamKey
+
+        Returns
+        -------
+        Result dict, None for unknown team
+    '''
+
+    teams = get_league_teams(key.league)
+    team = teams[teams.id == key.team_id]
+
+    if len(team) == 0:
+        print(f'Unknown team id {key.team_id} (league {key.league})')
+        return None
+
+    return team.to_dict(orient='records')[0]
+
+# get team's info based on team id and league
 # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/static/teams.md
-@st.cache_data(ttl=3600, show_spinner=False)
 def find_team_info_by_id(league, team_id, value=None):
-    if team_id:
-        if league == LeagueCode.NBA.value:
-            try:
-                result = teams.find_team_name_by_id(team_id=team_id)
-                result = result[value] if value else result
-            except ConnectionError:
-                print(f'Couldn`t fine team info {value} by id {team_id} (NBA)')
-            else:
-                print(f'Team info (NBA) by id {team_id} was found successfully')
-                return result
-        elif league == LeagueCode.WNBA.value:
-            try:
-                result = teams.find_wnba_team_name_by_id(team_id=team_id)
-                result = result[value] if value else result
-            except ConnectionError:
-                print(f'Couldn`t fine team info {value} by id {team_id} (WNBA)')
-            else:
-                print(f'Team info {value} (WNBA) by id {team_id} was found successfully')
-                return result
-        else:
-            print(f'Unknown league is selected: {league}')
-    else:
+    if not team_id:
         print('None team was selected')
+        return None
 
-# get team's full name based on team id and league
+    # one cached info dict per team for all requested values
+    result = get_team_info(team_key(league, team_id))
+
+    return result[value] if value and result else result
+
+# get team's info based on team abbreviation and league
 # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/static/teams.md
-@st.cache_data(ttl=3600, show_spinner=False)
 def find_team_info_by_abbreviation(league, abbreviation, value=None):
-    if abbreviation:
-        if league == LeagueCode.NBA.value:
-            try:
-                result = teams.find_team_by_abbreviation(abbreviation=abbreviation)
-                result = result[value] if value else result
-            except ConnectionError:
-                print(f'Couldn`t fine team info {value} by abbreviation {abbreviation} (NBA)')
-            else:
-                print(f'Team info {value} (NBA) by abbreviation {abbreviation} was found successfully')
-                return result
-        elif league == LeagueCode.WNBA.value:
-            try:
-                result = teams.find_wnba_team_by_abbreviation(abbreviation=abbreviation)
-                result = result[value] if value else result
-            except ConnectionError:
-                print(f'Couldn`t fine team name by abbreviation {abbreviation} (WNBA)')
-            else:
-                print(f'Team info {value} (WNBA) by abbreviation {abbreviation} was found successfully')
-                return result
-        else:
-            print(f'Unknown league is selected: {league}')
-    else:
+    if not abbreviation:
         print('None team was selected')
+        return None
+
+    teams = get_league_teams(league)
+    team_ids = teams.loc[teams.abbreviation == abbreviation, 'id']
+
+    if len(team_ids) == 0:
+        print(f'Unknown team abbreviation {abbreviation} (league {league})')
+        return None
+
+    return find_team_info_by_id(league=league, team_id=team_ids.iloc[0], value=value)
 
 # get teams rating info
 # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/endpoints/boxscoreadvancedv3.md
 # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/endpoints/teamestimatedmetrics.md
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_team_rating(league, season):
+@keyed_cache()
+def get_team_rating(key):
     try:
-        team_metrics = teamestimatedmetrics.TeamEstimatedMetrics(
-            league_id=league,
-            season=season
+        team_metrics = fetch(
+            teamestimatedmetrics.TeamEstimatedMetrics,
+            league_id=key.league,
+            season=key.season_year
         ).team_estimated_metrics.get_data_frame()
-    except ConnectionError:
+    except TransportError:
         print('Couldn`t get Team Estimated Metrics')
+        raise
     else:
         print('Team Estimated Metrics data received successfully')
         return team_metrics
 
 
-def team_head_coach(team_id, season_year):
+def fetch_team_roster(league, team_id, season_year):
     '''
-        Return one row data frame with head coach info
+        Return roster and coaches data frames for the team from one CommonTeamRoster call
 
         Parameters
         ----------
+        league
         team_id
         season_year
 
         Returns
         -------
-        Result data frame
+        Result tuple: (roster, coaches), None if data couldn't be received
     '''
 
     # get data from nba api
     # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/endpoints/commonteamroster.md
     try:
-        coaches = commonteamroster.CommonTeamRoster(team_id=team_id, season=season_year).coaches.get_data_frame()
-    except ConnectionError:
+        response = fetch(
+            commonteamroster.CommonTeamRoster,
+            league_id_nullable=league,
+            team_id=team_id,
+            season=season_year
+        )
+        roster = response.common_team_roster.get_data_frame()
+        coaches = response.coaches.get_data_frame()
+    except TransportError:
         print(
-            'Couldn`t get the data from commonteamroster endpoint, coaches dataset\n',
+            'Couldn`t get the data from commonteamroster endpoint\n',
             'Parameters:\n',
+            f'League Code: {league}\n',
             f'Season Year Code: {season_year}\n',
             f'Team ID: {team_id}\n'
         )
     else:
-        print('Coaches data received successfully')
-        # select info for head coach only
-        head_coach = coaches.loc[coaches.COACH_TYPE == 'Head Coach', ]
+        return roster, coaches
+
+def ingest_league_rosters(league, season_year, max_workers=4):
+    '''
+        Fetch rosters and coaches for every team of the league and save them to the local data store
+
+        Each team is fetched once, both datasets are taken from the same response.
+        Number of concurrent requests is limited by max_workers to avoid NBA API rate limits
+
+        Parameters
+        ----------
+        league
+        season_year
+        max_workers
+            number of concurrent requests
+
+        Returns
+        -------
+        Result tuple: (roster, coaches)
+    '''
+
+    team_ids = get_league_teams(league).id
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        responses = list(executor.map(
+            lambda team_id: fetch_team_roster(league=league, team_id=team_id, season_year=season_year),
+            team_ids
+        ))
+
+    # teams that couldn't be fetched are skipped
+    responses = [response for response in responses if response is not None]
+
+    if len(responses) == 0:
+        print('Couldn`t ingest rosters for any team')
+        return (
+            pd.DataFrame(columns=commonteamroster.CommonTeamRoster.expected_data['CommonTeamRoster']),
+            pd.DataFrame(columns=commonteamroster.CommonTeamRoster.expected_data['Coaches'])
+        )
+
+    roster = pd.concat([response[0] for response in responses], ignore_index=True)
+    coaches = pd.concat([response[1] for response in responses], ignore_index=True)
+
+    save_table(roster, name='roster', league=league, season_year=season_year)
+    save_table(coaches, name='coaches', league=league, season_year=season_year)
 
-        return head_coach
+    print(f'Rosters ingested successfully: {len(responses)} of {len(team_ids)} teams')
+
+    return roster, coaches
+
+@keyed_cache(show_spinner='Fetching data from NBA API...')
+def get_league_rosters(key):
+    '''
+        Return rosters and coaches for all teams of the league indexed by team id
+
+        Data is read from the local data store, league-wide ingestion runs only
+        if the data doesn't exist or is older than ROSTER_TTL
+
+        Parameters
+        ----------
+        key
+            SeasonKey
+
+        Returns
+        -------
+        Result tuple: (roster, coaches)
+    '''
+
+    league, season_year = key.league, key.season_year
+
+    roster = load_table(name='roster', league=league, season_year=season_year)
+    coaches = load_table(name='coaches', league=league, season_year=season_year)
+    age = table_age(name='roster', league=league, season_year=season_year)
+
+    if roster is None or coaches is None or age > ROSTER_TTL:
+        roster, coaches = ingest_league_rosters(league=league, season_year=season_year)
+
+    # sorted index by team id is used for fast lookups of the team's rows
+    roster.index = pd.Index(roster.TeamID.values)
+    coaches.index = pd.Index(coaches.TEAM_ID.values)
+
+    return roster.sort_index(kind='stable'), coaches.sort_index(kind='stable')
+
+def team_head_coach(team_id, season_year, league_id=LeagueCode.NBA.value):
+    '''
+        Return one row data frame with head coach info
+
+        Parameters
+        ----------
+        team_id
+        season_year
+        league_id
+
+        Returns
+        -------
+        Result data frame
+    '''
+
+    _, coaches = get_league_rosters(season_key(league_id, season_year))
+
+    # select coaches of the team
+    coaches = coaches.loc[[team_id]] if team_id in coaches.index else coaches.iloc[0:0]
+
+    # select info for head coach only
+    head_coach = coaches.loc[coaches.COACH_TYPE == 'Head Coach', ]
+
+    return head_coach
 
 def team_roster(league_id, team_id, season_year):
     '''
@@ -162,24 +277,9 @@ def team_roster(league_id, team_id, season_year):
         Result data frame
     '''
 
-    # get data from nba api
-    # https://github.com/swar/nba_api/blob/master/docs/nba_api/stats/endpoints/commonteamroster.md
-    try:
-        roster = commonteamroster.CommonTeamRoster(
-            league_id_nullable=league_id,
-            team_id=team_id,
-            season=season_year
-        ).common_team_roster.get_data_frame()
-    except ConnectionError:
-        print(
-            'Couldn`t get the data from commonteamroster endpoint, common_team_roster dataset\n',
-            'Parameters:\n',
-            f'Season Year Code: {season_year}\n',
-            f'Team ID: {team_id}\n'
-        )
-    else:
-        print('Roster data received successfully')
-        return roster
+    roster, _ = get_league_rosters(season_key(league_id, season_year))
+
+    return roster.loc[[team_id]] if team_id in roster.index else roster.iloc[0:0]
     
 def define_team_options():
     '''
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+
+from utils.params import GAME_TIME, StatisticsTypeCode, TimeframeCode
+from utils.events import calc_elapsed_seconds, calc_event_flags
+from utils.games import fetch_play_by_play
+from utils.store import load_table, list_table_keys
+from utils.keys import keyed_cache
+
+# counting statistics that can be summed by time buckets, win probability is a game state
+TIMEFRAME_STATISTICS = [
+    StatisticsTypeCode.SCORE_DIFF.value,
+    StatisticsTypeCode.PTS.value,
+    StatisticsTypeCode.FG2M.value,
+    StatisticsTypeCode.FG3M.value,
+    StatisticsTypeCode.REB.value,
+    StatisticsTypeCode.AST.value
+]
+
+TIMEFRAME_COLUMNS = ['GAME_ID', 'TEAM_ID', 'BUCKET'] + TIMEFRAME_STATISTICS
+
+# play-by-play columns of build_timeframe_stats(), saved games are converted with these columns only
+TIMEFRAME_EVENT_COLUMNS = ['gameId', 'actionNumber', 'period', 'clock', 'teamId', 'actionType', 'description']
+
+
+def define_buckets(period, elapsed, timeframe):
+    '''
+        Return time bucket number (starting from 1) for each event
+
+        GAME - one bucket, PERIOD - period number, MINUTE - minute of the game,
+        overtime minutes go after the regulation minutes.
+        Event at the end of the minute (for example, 11:00 in the 1st period) belongs to this minute
+    '''
+
+    if timeframe == TimeframeCode.PERIOD.value:
+        return np.asarray(period)
+    elif timeframe == TimeframeCode.MINUTE.value:
+        return np.maximum(np.asarray(elapsed) - 1, 0) // 60 + 1
+    else:
+        return np.ones(len(elapsed), dtype=int)
+
+def calc_bucket_count(last_period, league, timeframe):
+    '''
+        Return number of time buckets in the game with `last_period` periods
+    '''
+
+    if timeframe == TimeframeCode.PERIOD.value:
+        return last_period
+    elif timeframe == TimeframeCode.MINUTE.value:
+        overtimes = max(last_period - 4, 0)
+        return 4 * GAME_TIME[league]['period'] + overtimes * GAME_TIME[league]['overtime']
+    else:
+        return 1
+
+def format_bucket(bucket, timeframe):
+    '''
+        Return label of the time bucket: Q1, OT1, 12'
+    '''
+
+    if timeframe == TimeframeCode.PERIOD.value:
+        return f'Q{bucket}' if bucket <= 4 else f'OT{bucket - 4}'
+    elif timeframe == TimeframeCode.MINUTE.value:
+        return f"{bucket}'"
+    else:
+        return 'Game'
+
+def build_timeframe_stats(play_by_play, league, timeframe):
+    '''
+        Return statistics of both teams for each time bucket of the game
+
+        Parameters
+        ----------
+        play_by_play
+            raw PlayByPlayV3 play_by_play dataset
+        league
+            league code
+        timeframe
+            TimeframeCode value
+
+        Returns
+        -------
+        Result data frame, one row for each team and bucket (buckets without events have zeros)
+
+        GAME_ID, TEAM_ID, BUCKET, SCORE_DIFF, PTS, FG2M, FG3M, REB, AST
+    '''
+
+    play_by_play = play_by_play.sort_values(by='actionNumber', ignore_index=True)
+    team_id = play_by_play.teamId.fillna(0).astype('int64')
+
+    elapsed = calc_elapsed_seconds(period=play_by_play.period, clock=play_by_play.clock, league=league)
+    flags = calc_event_flags(play_by_play)
+
+    events = pd.DataFrame({
+        'TEAM_ID': team_id,
+        'BUCKET': define_buckets(play_by_play.period, elapsed, timeframe),
+        'FG2M': flags.FGM - flags.FG3M,
+        'FG3M': flags.FG3M,
+        'FTM': flags.FTM,
+        'REB': flags.REB,
+        'AST': flags.AST
+    })[team_id != 0]
+
+    # every team has every bucket of the game
+    team_ids = np.sort(events.TEAM_ID.unique())
+    bucket_count = calc_bucket_count(int(play_by_play.period.max()), league=league, timeframe=timeframe)
+    buckets = pd.MultiIndex.from_product([team_ids, np.arange(1, bucket_count + 1)], names=['TEAM_ID', 'BUCKET'])
+
+    stats = events.groupby(['TEAM_ID', 'BUCKET']).sum().reindex(buckets, fill_value=0)
+
+    stats['PTS'] = 2 * stats.FG2M + 3 * stats.FG3M + stats.FTM
+    # bucket's score difference: own points minus opponent's points
+    stats['SCORE_DIFF'] = 2 * stats.PTS - stats.PTS.groupby(level='BUCKET').transform('sum')
+
+    stats = stats.reset_index().assign(GAME_ID=play_by_play.gameId.iloc[0])
+
+    return stats[TIMEFRAME_COLUMNS]
+
+@keyed_cache()
+def get_game_timeframe_stats(key, timeframe):
+    '''
+        Return statistics of both teams for each time bucket of the game, see build_timeframe_stats()
+    '''
+
+    league, season_year, game_id = key.league, key.season_year, key.game_id
+
+    play_by_play = fetch_play_by_play(league=league, season_year=season_year, game_id=game_id)
+
+    return build_timeframe_stats(play_by_play, league=league, timeframe=timeframe)
+
+@keyed_cache(show_spinner='Calculating statistics by time...')
+def get_season_timeframe_stats(key, timeframe):
+    '''
+        Return statistics for each time bucket of all games of the season saved in the local data store
+    '''
+
+    league, season_year = key.league, key.season_year
+
+    game_ids = list_table_keys(name='play_by_play', league=league, season_year=season_year)
+
+    if len(game_ids) == 0:
+        return pd.DataFrame(columns=TIMEFRAME_COLUMNS)
+
+    return pd.concat(
+        [
+            build_timeframe_stats(
+                load_table(
+                    name='play_by_play', league=league, season_year=season_year, key=game_id,
+                    columns=TIMEFRAME_EVENT_COLUMNS
+                ),
+                league=league, timeframe=timeframe
+            )
+            for game_id in game_ids
+        ],
+        ignore_index=True
+    )
+
+def calc_team_timeframe_averages(season_stats, team_id):
+    '''
+        Return team's average statistics for each time bucket
+
+        Overtime buckets are averaged over the games that had them
+
+        Returns
+        -------
+        Result data frame
+
+        BUCKET, GAMES, SCORE_DIFF, PTS, FG2M, FG3M, REB, AST
+    '''
+
+    team_stats = season_stats[season_stats.TEAM_ID == team_id]
+
+    averages = team_stats.groupby('BUCKET')[TIMEFRAME_STATISTICS].mean()
+    averages.insert(0, 'GAMES', team_stats.groupby('BUCKET').size())
+
+    return averages.reset_index()
@@ -0,0 +1,293 @@
+import hashlib
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nba_api.stats.library.http import NBAStatsHTTP, NBAStatsResponse, STATS_HEADERS
+
+from utils.singleflight import SingleFlight
+from utils.store import save_response, load_response
+
+# request timeout in seconds for each endpoint: (connect, read)
+ENDPOINT_TIMEOUT = {
+    'leaguegamefinder': (3.05, 30),
+    'playbyplayv3': (3.05, 20),
+    'teamestimatedmetrics': (3.05, 20),
+    'commonteamroster': (3.05, 15)
+}
+DEFAULT_TIMEOUT = (3.05, 20)
+
+# retries with exponential backoff and full jitter: sleep is random in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)]
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+
+# circuit is opened after CIRCUIT_FAILURE_THRESHOLD failed calls in a row
+# and the endpoint isn't called for CIRCUIT_RESET_TIMEOUT seconds
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_RESET_TIMEOUT = 60
+
+# 4xx responses except 429 (rate limit) are not retried
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TransportError(Exception):
+    '''
+        Data couldn't be received from NBA API and there is no saved response to fall back to
+    '''
+
+
+class CircuitBreaker:
+    '''
+        Tracks failed calls of one endpoint
+
+        closed - calls are allowed
+        open - calls are not allowed until reset timeout is passed
+        half-open - one trial call is allowed, its result closes or opens the circuit again
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.failures = 0
+        self.opened_at = None
+        self.trial_call = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        elif time.monotonic() - self.opened_at < CIRCUIT_RESET_TIMEOUT:
+            return 'open'
+        else:
+            return 'half-open'
+
+    def allow_request(self):
+        with self.lock:
+            state = self.state
+
+            if state == 'closed':
+                return True
+            elif state == 'half-open' and not self.trial_call:
+                self.trial_call = True
+                return True
+            else:
+                return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_call = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_call = False
+
+            if self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+                if self.opened_at is None:
+                    print(f'Circuit for {self.name} endpoint is opened')
+                self.opened_at = time.monotonic()
+
+
+def create_session():
+    '''
+        Return requests session with keep-alive connection pool shared by all NBA API calls
+    '''
+
+    session = requests.Session()
+    session.headers.update(STATS_HEADERS)
+
+    # retries are handled in request_contents(), adapter only keeps connections alive
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+
+SESSION = create_session()
+CIRCUITS = {}
+CIRCUITS_LOCK = threading.Lock()
+
+# concurrent identical requests (for example, many sessions opening the same game) share one call
+SINGLE_FLIGHT = SingleFlight()
+
+
+def get_circuit(name):
+    '''
+        Return circuit breaker for the endpoint
+    '''
+
+    with CIRCUITS_LOCK:
+        if name not in CIRCUITS:
+            CIRCUITS[name] = CircuitBreaker(name)
+
+        return CIRCUITS[name]
+
+def use_stats_api(url):
+    '''
+        Send all NBA API calls to another server with the same paths, for example
+        the local stand-in (see utils.standin): http://127.0.0.1:8503
+    '''
+
+    NBAStatsHTTP.base_url = url.rstrip('/') + '/stats/{endpoint}'
+    print(f'NBA API calls are sent to {NBAStatsHTTP.base_url}')
+
+# NBA_STATS_API_URL=http://127.0.0.1:8503 streamlit run app.py - run the app against the local stand-in
+if os.environ.get('NBA_STATS_API_URL'):
+    use_stats_api(os.environ['NBA_STATS_API_URL'])
+
+# NBA_STATS_OFFLINE=1 streamlit run app.py - serve only the saved responses, for example
+# after a season bundle was imported (see utils.bundle), NBA API isn't called
+OFFLINE = os.environ.get('NBA_STATS_OFFLINE') == '1'
+
+
+def define_parameters_key(endpoint_name, parameters):
+    '''
+        Return stable key of the request: endpoint name and hash of sorted parameters
+
+        Parameters with None values are not sent with the request, so they are not included
+    '''
+
+    query = '&'.join(f'{key}={value}' for key, value in sorted(parameters) if value is not None)
+
+    return endpoint_name + '-' + hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+
+def define_request_key(endpoint):
+    '''
+        Return stable key of the request, see define_parameters_key()
+    '''
+
+    return define_parameters_key(endpoint.endpoint, endpoint.parameters.items())
+
+def load_endpoint(endpoint, contents, status_code=None, url=None):
+    '''
+        Parse response text into the endpoint's data sets
+    '''
+
+    endpoint.nba_response = NBAStatsResponse(response=contents, status_code=status_code, url=url)
+    endpoint.load_response()
+
+    return endpoint
+
+def request_endpoint(endpoint):
+    '''
+        Send one request for the endpoint through the shared session
+
+        Returns
+        -------
+        Result tuple: (contents, status_code, url)
+    '''
+
+    response = SESSION.get(
+        url=NBAStatsHTTP.base_url.format(endpoint=endpoint.endpoint),
+        params=sorted(endpoint.parameters.items(), key=lambda kv: kv[0]),
+        timeout=ENDPOINT_TIMEOUT.get(endpoint.endpoint, DEFAULT_TIMEOUT)
+    )
+    response.raise_for_status()
+
+    return NBAStatsHTTP().clean_contents(response.text), response.status_code, response.url
+
+def request_contents(endpoint, request_key):
+    '''
+        Return validated response text for the endpoint
+
+        Connections are reused from the shared keep-alive pool, failed calls are retried
+        with jittered exponential backoff, endpoint that keeps failing is not called until
+        its circuit is closed again, last successful response is used if the data couldn't be received
+        or the app runs in offline mode
+    '''
+
+    circuit = get_circuit(endpoint.endpoint)
+
+    if OFFLINE:
+        print(f'{endpoint.endpoint} request is skipped in offline mode')
+    elif circuit.allow_request():
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                contents, status_code, url = request_endpoint(endpoint)
+                # parse response to check that it has expected data sets
+                load_endpoint(endpoint, contents=contents, status_code=status_code, url=url)
+            except requests.HTTPError as error:
+                print(f'{endpoint.endpoint} request failed (attempt {attempt + 1}): {error}')
+                if error.response is not None and error.response.status_code not in RETRY_STATUS_CODES:
+                    break
+            except (requests.RequestException, ValueError, KeyError) as error:
+                # ValueError, KeyError - response is not a valid json or doesn't have expected data sets
+                print(f'{endpoint.endpoint} request failed (attempt {attempt + 1}): {error}')
+            else:
+                circuit.record_success()
+                save_response(contents, key=request_key)
+                return contents
+
+            if attempt < MAX_ATTEMPTS - 1:
+                time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+
+        circuit.record_failure()
+    else:
+        print(f'Circuit for {endpoint.endpoint} endpoint is {circuit.state}, request is skipped')
+
+    # fall back to the last successful response
+    contents = load_response(key=request_key)
+
+    if contents is not None:
+        print(f'{endpoint.endpoint} data is loaded from the last successful response')
+        return contents
+
+    raise TransportError(f'Couldn`t get the data from {endpoint.endpoint} endpoint, parameters: {endpoint.parameters}')
+
+def fetch(endpoint_class, **parameters):
+    '''
+        Return nba_api endpoint object with loaded data sets
+
+        All NBA API calls should be sent through this function, see request_contents().
+        Concurrent calls with the same endpoint and parameters share one request
+
+        Parameters
+        ----------
+        endpoint_class
+            nba_api endpoint class, for example leaguegamefinder.LeagueGameFinder
+        parameters
+            endpoint parameters
+
+        Returns
+        -------
+        Result endpoint object
+    '''
+
+    endpoint = endpoint_class(**parameters, get_request=False)
+    request_key = define_request_key(endpoint)
+
+    contents = SINGLE_FLIGHT.do(request_key, endpoint.endpoint, request_contents, endpoint, request_key)
+
+    # leader's endpoint is already loaded with these contents, other callers parse the shared response
+    if endpoint.nba_response is None or endpoint.nba_response.get_response() is not contents:
+        load_endpoint(endpoint, contents=contents)
+
+    return endpoint
+
+def get_transport_stats():
+    '''
+        Return transport metrics: circuit state of each endpoint and coalesced requests
+
+        Returns
+        -------
+        Result dict
+    '''
+
+    with CIRCUITS_LOCK:
+        circuits = {
+            name: {'state': circuit.state, 'failures': circuit.failures}
+            for name, circuit in CIRCUITS.items()
+        }
+
+    return {
+        'circuits': circuits,
+        'single_flight': SINGLE_FLIGHT.stats()
+    }
@@ -0,0 +1,205 @@
+import streamlit as st
+
+import numpy as np
+import pandas as pd
+
+from utils.params import GAME_TIME
+from utils.events import calc_elapsed_seconds, fill_scores
+from utils.games import fetch_play_by_play
+from utils.possessions import define_possession_ends, OUTCOME_FIELD_GOAL, OUTCOME_FREE_THROWS, OUTCOME_TURNOVER
+from utils.store import save_table, load_table, list_table_keys, list_table_seasons
+from utils.keys import keyed_cache
+
+# features are calculated from the home team's point of view
+FEATURE_COLUMNS = ['INTERCEPT', 'HOME_COURT', 'MARGIN', 'POSSESSION']
+
+# coefficients used until the model is fitted on the local play-by-play archive
+DEFAULT_COEFFICIENTS = pd.Series([0.0, 0.4, 7.0, 3.5], index=FEATURE_COLUMNS)
+
+# L2 regularization: the last events of the game separate wins and losses perfectly
+L2_PENALTY = 1.0
+
+
+def calc_remaining_seconds(period, elapsed, league):
+    '''
+        Return number of seconds left in the regulation time or in the current overtime
+    '''
+
+    period = np.asarray(period)
+    regulation_length = 4 * GAME_TIME[league]['period'] * 60
+    overtime_length = GAME_TIME[league]['overtime'] * 60
+
+    end = np.where(period <= 4, regulation_length, regulation_length + (period - 4) * overtime_length)
+
+    return end - elapsed
+
+def define_ball_possession(play_by_play, elapsed, home_team):
+    '''
+        Return team with the ball after every event: 1 - home team, -1 - road team, 0 - unknown
+
+        Shots, free throws and turnovers keep the ball with the event's team
+        or give it to the opponent if they end the possession, rebounds give the ball
+        to the rebounding team, other events (fouls, substitutions, timeouts) don't change it
+    '''
+
+    _, outcomes, offensive_team = define_possession_ends(play_by_play, elapsed)
+
+    team_id = play_by_play.teamId.to_numpy()
+    side = np.where(team_id == home_team, 1, np.where(team_id != 0, -1, 0))
+
+    is_change = np.isin(outcomes, [OUTCOME_FIELD_GOAL, OUTCOME_FREE_THROWS, OUTCOME_TURNOVER])
+    is_ball_event = (side != 0) & (~np.isnan(offensive_team) | (play_by_play.actionType == 'Rebound').to_numpy())
+
+    ball = pd.Series(np.where(is_change, -side, side), dtype=float).where(is_ball_event)
+
+    # ball is unknown at the start of the period until the first ball event
+    return ball.groupby(play_by_play.period.to_numpy()).ffill().fillna(0).to_numpy()
+
+def build_features(play_by_play, league):
+    '''
+        Return win probability model features for every event of the game
+
+        Parameters
+        ----------
+        play_by_play
+            raw PlayByPlayV3 play_by_play dataset
+        league
+            league code
+
+        Returns
+        -------
+        Result tuple: (features data frame indexed by actionNumber, final home score margin)
+
+        INTERCEPT,
+        HOME_COURT - home court advantage, fades with the time left,
+        MARGIN - home score margin, weighted more as the time runs out,
+        POSSESSION - team with the ball, weighted the same way
+    '''
+
+    play_by_play = play_by_play.sort_values(by='actionNumber', ignore_index=True)
+    play_by_play['teamId'] = play_by_play.teamId.fillna(0).astype('int64')
+
+    teams = play_by_play.loc[play_by_play.teamId != 0, ['teamId', 'location']].drop_duplicates(subset='teamId')
+    home_team = int(teams.loc[teams.location == 'h', 'teamId'].iloc[0])
+
+    elapsed = calc_elapsed_seconds(period=play_by_play.period, clock=play_by_play.clock, league=league)
+    remaining = calc_remaining_seconds(play_by_play.period, elapsed, league=league)
+    time_weight = 1 / np.sqrt(remaining + 1)
+
+    score_home, score_away = fill_scores(play_by_play)
+    margin = score_home - score_away
+
+    features = pd.DataFrame({
+        'INTERCEPT': 1.0,
+        'HOME_COURT': np.sqrt(remaining / (4 * GAME_TIME[league]['period'] * 60)),
+        'MARGIN': margin * time_weight,
+        'POSSESSION': define_ball_possession(play_by_play, elapsed, home_team) * time_weight
+    }, index=play_by_play.actionNumber.to_numpy())
+
+    return features[FEATURE_COLUMNS], int(margin[-1])
+
+def fit_logistic_regression(X, y, l2_penalty=L2_PENALTY, max_iterations=50, tolerance=1e-8):
+    '''
+        Return coefficients of the logistic regression fitted with Newton's method
+
+        Parameters
+        ----------
+        X
+            feature matrix, the first column is the intercept and is not regularized
+        y
+            0/1 target array
+
+        Returns
+        -------
+        Result coefficients array
+    '''
+
+    penalty = np.full(X.shape[1], l2_penalty)
+    penalty[0] = 0
+
+    coefficients = np.zeros(X.shape[1])
+
+    for _ in range(max_iterations):
+        probability = 1 / (1 + np.exp(-X @ coefficients))
+
+        gradient = X.T @ (probability - y) + penalty * coefficients
+        hessian = (X.T * (probability * (1 - probability))) @ X + np.diag(penalty)
+
+        step = np.linalg.solve(hessian, gradient)
+        coefficients -= step
+
+        if np.max(np.abs(step)) < tolerance:
+            break
+
+    return coefficients
+
+def fit_win_probability_model(league):
+    '''
+        Fit the win probability model on all finished games saved in the local data store and save it
+
+        Returns
+        -------
+        Result series with coefficients for FEATURE_COLUMNS, DEFAULT_COEFFICIENTS if there are no saved games
+    '''
+
+    features = []
+    targets = []
+
+    for season_year in list_table_seasons(name='play_by_play', league=league):
+        for game_id in list_table_keys(name='play_by_play', league=league, season_year=season_year):
+            play_by_play = load_table(name='play_by_play', league=league, season_year=season_year, key=game_id)
+            game_features, final_margin = build_features(play_by_play, league=league)
+
+            features.append(game_features.to_numpy())
+            targets.append(np.full(len(game_features), final_margin > 0, dtype=float))
+
+    if len(features) == 0:
+        print('There are no saved games to fit the win probability model')
+        return DEFAULT_COEFFICIENTS
+
+    X = np.concatenate(features)
+    y = np.concatenate(targets)
+
+    coefficients = pd.Series(fit_logistic_regression(X, y), index=FEATURE_COLUMNS)
+    save_table(coefficients.to_frame(name='COEFFICIENT'), name='win_probability_model', league=league)
+
+    print(f'Win probability model fitted successfully: {len(features)} games, {len(y)} events')
+
+    return coefficients
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_win_probability_model(league):
+    '''
+        Return coefficients of the fitted win probability model or DEFAULT_COEFFICIENTS if it isn't fitted yet
+    '''
+
+    model = load_table(name='win_probability_model', league=league)
+
+    return DEFAULT_COEFFICIENTS if model is None else model.COEFFICIENT
+
+def predict_win_probability(features, coefficients):
+    '''
+        Return home team's win probability for every row of the features
+    '''
+
+    return 1 / (1 + np.exp(-features[FEATURE_COLUMNS].to_numpy() @ coefficients[FEATURE_COLUMNS].to_numpy()))
+
+@keyed_cache()
+def get_game_win_probability(key):
+    '''
+        Return home team's win probability after every event of the game
+
+        Returns
+        -------
+        Result series indexed by actionNumber
+    '''
+
+    league, season_year, game_id = key.league, key.season_year, key.game_id
+
+    play_by_play = fetch_play_by_play(league=league, season_year=season_year, game_id=game_id)
+    features, _ = build_features(play_by_play, league=league)
+
+    return pd.Series(
+        predict_win_probability(features, get_win_probability_model(league)),
+        index=features.index
+    )